@@ -0,0 +1,532 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Run from the Source folder: python Benchmarks.py [benchmark name ...]
+
+from __future__ import annotations
+from collections.abc import Callable
+import mmap
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from Grammar import Grammar
+from GrammarAnalysis import GrammarAnalysis
+from GrammarCache import GrammarCache
+from Grid import Grid
+from LALRTableParser import LALRTableParser
+from LR0Automaton import LR0Automaton
+from LR1Automaton import LR1Automaton
+from LL1RecursiveDescentParser import LL1RecursiveDescentParser
+from LL1TableParser import LL1TableParser
+from LR1TableParser import LR1TableParser
+from Parser import Parser
+from ParseTable import ParseTable
+from SLRTableParser import SLRTableParser
+from TokenStream import TokenStream
+from Tree import Tree
+from TreeArena import TreeArena
+from TreeLayout import TreeLayout
+
+
+def time_call(function: Callable[[], object], repeat: int = 5) -> float:
+    best: float = float('inf')
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name: str, seconds: float) -> None:
+    print(f"{name:<60} {seconds * 1000:>10.3f} ms")
+
+
+def read_grammar(file_name: str) -> str:
+    with open('../Grammars/' + file_name, 'r') as f:
+        return f.read()
+
+
+def synthetic_ll_grammar(levels: int) -> str:
+    # an operator precedence ladder like the calculator grammars, with 2 * levels + 2 rules
+    lines: list[str] = ['<program> ::= <e0> "eof"']
+    for i in range(levels):
+        lines.append(f'<e{i}> ::= <e{i+1}> <e{i}_tail>')
+        lines.append(f'<e{i}_tail> ::= "op{i}" <e{i+1}> <e{i}_tail> | ""')
+    lines.append(f'<e{levels}> ::= "(" <e0> ")" | "identifier" | "number_lit"')
+    return '\n'.join(lines)
+
+
+def synthetic_lr_grammar(levels: int) -> str:
+    # the left recursive version of the same ladder, with levels + 2 rules
+    lines: list[str] = ['<program> ::= <e0> "eof"']
+    for i in range(levels):
+        lines.append(f'<e{i}> ::= <e{i}> "op{i}" <e{i+1}> | <e{i+1}>')
+    lines.append(f'<e{levels}> ::= "(" <e0> ")" | "identifier" | "number_lit"')
+    return '\n'.join(lines)
+
+
+def read_code(file_name: str) -> str:
+    with open('../ExampleCode/' + file_name, 'r') as f:
+        return f.read()
+
+
+def step_to_end(parser: Parser, code: str | mmap.mmap) -> None:
+    parser.reset()
+    parser.input_code(code)
+    while not parser.finished_parsing:
+        parser.step()
+
+
+def first_follow() -> None:
+    grammars: dict[str, str] = {
+        'ANSI_C-LR.gr': read_grammar('ANSI_C-LR.gr'),
+        'BMinor-LL.gr': read_grammar('BMinor-LL.gr'),
+        'synthetic LL, 1002 rules': synthetic_ll_grammar(500),
+        'synthetic LL, 4002 rules': synthetic_ll_grammar(2000),
+        'synthetic LR, 1002 rules': synthetic_lr_grammar(1000),
+        'synthetic LR, 4002 rules': synthetic_lr_grammar(4000),
+    }
+    for name, description in grammars.items():
+        grammar: Grammar = Grammar(description)
+        report(f"FIRST/FOLLOW {name}", time_call(lambda: GrammarAnalysis(grammar)))
+        report(f"FIRST/FOLLOW {name} (with dict views)", time_call(
+            lambda: (grammar.generate_first_sets(), grammar.generate_follow_sets())))
+
+
+def conflict_count(parser: SLRTableParser, description: str) -> int:
+    parser.input_grammar(description)
+    return len(parser.conflicts)
+
+
+def lr_states() -> None:
+    # state counts and build times of the LR(0) (SLR and LALR), canonical LR(1), and merged LR(1) automata
+    for file_name in sorted(os.listdir('../Grammars')):
+        description: str = read_grammar(file_name)
+        grammar: Grammar = Grammar(description)
+        lr0_states: int = len(LR0Automaton(grammar))
+        canonical_states: int = len(LR1Automaton(grammar))
+        merged_states: int = len(LR1Automaton(grammar, True))
+
+        print(f"{file_name}: {lr0_states} LR(0) states, {canonical_states} canonical LR(1) states, "
+              f"{merged_states} merged LR(1) states ({canonical_states / merged_states:.2f} canonical states per "
+              f"merged state)")
+        print(f"{file_name}: conflicts SLR {conflict_count(SLRTableParser(), description)}, "
+              f"LALR {conflict_count(LALRTableParser(), description)}, "
+              f"LR(1) {conflict_count(LR1TableParser(), description)}, "
+              f"merged LR(1) {conflict_count(LR1TableParser(True), description)}")
+        report(f"LR(0) automaton {file_name}", time_call(lambda: LR0Automaton(grammar)))
+        report(f"canonical LR(1) automaton {file_name}", time_call(lambda: LR1Automaton(grammar)))
+        report(f"merged LR(1) automaton {file_name}", time_call(lambda: LR1Automaton(grammar, True)))
+
+
+def lr_stepping() -> None:
+    for copies in (1, 100, 1000, 5000):
+        code: str = read_code('SumAverage.cl') * copies
+        parser: SLRTableParser = SLRTableParser()
+        parser.input_grammar(read_grammar('ExtendedCalculator-LR.gr'))
+        report(f"SLR stepping SumAverage.cl x{copies}", time_call(lambda: step_to_end(parser, code), repeat=3))
+
+
+def allocated_bytes(function: Callable[[], object]) -> int:
+    tracemalloc.start()
+    result: object = function()
+    size: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def table_sizes(name: str, tables: list[ParseTable], cell: Callable[[int], object]) -> None:
+    # lists of lists holding one object per filled cell, like the tables were stored before
+    as_lists: int = allocated_bytes(
+        lambda: [[[cell(value) if value != table.empty else None for value in row] for row in table.rows()]
+                 for table in tables])
+    packed: int = sum(table.byte_size() for table in tables)
+    for table in tables:
+        table.compress()
+    compressed: int = sum(table.byte_size() for table in tables)
+    print(f"{name}: {as_lists} bytes as lists, {packed} bytes packed, {compressed} bytes compressed")
+
+
+def parse_tables() -> None:
+    ll_parser: LL1TableParser = LL1TableParser()
+    ll_parser.input_grammar(read_grammar('BMinor-LL.gr'))
+    lalr_parser: LALRTableParser = LALRTableParser()
+    lalr_parser.input_grammar(read_grammar('ANSI_C-LR.gr'))
+    lr1_parser: LR1TableParser = LR1TableParser()
+    lr1_parser.input_grammar(read_grammar('ANSI_C-LR.gr'))
+    table_sizes('LL(1) BMinor-LL.gr', [ll_parser.table], int)
+    table_sizes('LALR ANSI_C-LR.gr', [lalr_parser.action_table, lalr_parser.goto_table], SLRTableParser.TableEntry)
+    table_sizes('LR(1) ANSI_C-LR.gr', [lr1_parser.action_table, lr1_parser.goto_table], SLRTableParser.TableEntry)
+
+    packed_time: float = time_call(lambda: lalr_parser.generate_rules())
+    lalr_parser.compress_tables = True
+    compressed_time: float = time_call(lambda: lalr_parser.generate_rules())
+    report("LALR ANSI_C-LR.gr table generation", packed_time)
+    report("LALR ANSI_C-LR.gr table generation, compressed", compressed_time)
+
+
+def grammar_cache() -> None:
+    parsers: list[tuple[str, Parser, str]] = [
+        ('RD', LL1RecursiveDescentParser(), 'BMinor-LL.gr'),
+        ('LL(1) table', LL1TableParser(), 'BMinor-LL.gr'),
+        ('LALR', LALRTableParser(), 'ANSI_C-LR.gr'),
+        ('LR(1)', LR1TableParser(), 'ANSI_C-LR.gr'),
+    ]
+    GrammarCache.folder = tempfile.mkdtemp() + '/'
+    for name, parser, file_name in parsers:
+        description: str = read_grammar(file_name)
+        GrammarCache.enabled = False
+        built: float = time_call(lambda: parser.input_grammar(description))
+        GrammarCache.enabled = True
+        parser.input_grammar(description)
+        cached: float = time_call(lambda: parser.input_grammar(description))
+        report(f"{name} {file_name} built", built)
+        report(f"{name} {file_name} from the cache", cached)
+    GrammarCache.clear()
+    os.rmdir(GrammarCache.folder)
+
+
+def stored_tokens(grammar: Grammar, code: str) -> TokenStream:
+    stream: TokenStream = TokenStream(grammar.tokens(code))
+    stream.read()
+    return stream
+
+
+def lexer() -> None:
+    # the example programs repeated until they are large, each lexed with the grammar written for its language
+    sources: list[tuple[str, str]] = [
+        ('ExtendedCalculator-LR.gr', 'Primes.cl'), ('BMinor-LL.gr', 'PrintNumbers.bminor')
+    ]
+    for grammar_name, code_name in sources:
+        grammar: Grammar = Grammar(read_grammar(grammar_name))
+        for copies in (10, 100, 1000):
+            code: str = read_code(code_name) * copies
+            report(f"lexing {code_name} x{copies} ({len(code)} characters)", time_call(lambda: grammar.lexer(code), 3))
+        code = read_code(code_name) * 1000
+        token_count: int = len(grammar.lexer(code))
+        print(f"{code_name}: {allocated_bytes(lambda: grammar.lexer(code)) / token_count:.1f} bytes per token in a list, "
+              f"{allocated_bytes(lambda: stored_tokens(grammar, code)) / token_count:.1f} in a TokenStream")
+
+        # the same code lexed with the token pattern, the grammar defining the built-in classes it uses itself
+        definitions: str = ''.join(f'\n"{name}" ::= /{pattern}/' for name, pattern in
+                                   Grammar.default_token_patterns.items() if f'"{name}"' in read_grammar(grammar_name))
+        grammar = Grammar(read_grammar(grammar_name) + definitions)
+        report(f"lexing {code_name} x1000 with token definitions", time_call(lambda: grammar.lexer(code), 3))
+
+
+def peak_bytes(function: Callable[[], object]) -> int:
+    tracemalloc.start()
+    function()
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def streaming_lexer() -> None:
+    # the whole file read and lexed into a list against the tokens pulled one at a time from an mmap of the file
+    grammar: Grammar = Grammar(read_grammar('ExtendedCalculator-LL.gr'))
+    with tempfile.TemporaryFile() as f:
+        f.write(read_code('SumAverage.cl').encode() * 5000)
+        f.flush()
+        size: int = f.tell()
+
+        def read_and_lex() -> list[Grammar.Token]:
+            f.seek(0)
+            return grammar.lexer(f.read().decode())
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            def stream() -> None:
+                mapped.seek(0)
+                for _ in grammar.tokens(mapped):
+                    pass
+
+            report(f"lexing a {size} byte file into a list", time_call(read_and_lex, 3))
+            report(f"streaming a {size} byte file from an mmap", time_call(stream, 3))
+            print(f"peak memory: {peak_bytes(read_and_lex)} bytes as a list, {peak_bytes(stream)} bytes streamed")
+
+            parser: LL1TableParser = LL1TableParser()
+            parser.input_grammar(read_grammar('ExtendedCalculator-LL.gr'))
+            mapped.seek(0)
+            report(f"LL(1) stepping a {size} byte file from an mmap", time_call(lambda: step_to_end(parser, mapped), 1))
+            mapped.seek(0)
+            report(f"LL(1) stepping the same file as a string",
+                   time_call(lambda: step_to_end(parser, mapped.read().decode()), 1))
+
+
+def incremental_parsing() -> None:
+    # one line added to the middle of a short and a long file, parsed again from scratch and with the subtrees of the
+    # last parse reused
+    for parser, grammar in ((SLRTableParser(), 'ExtendedCalculator-LR.gr'), (LL1TableParser(), 'ExtendedCalculator-LL.gr')):
+        parser.input_grammar(read_grammar(grammar))
+        for copies in (10, 1000):
+            code: str = read_code('SumAverage.cl').rstrip('\n') + '\n'
+            code *= copies
+            line: int = code.rfind('\n', 0, len(code) // 2) + 1
+            edits: list[str] = [code[:line] + 'x := 1\n' + code[line:], code]
+            name: str = f"{type(parser).__name__} {code.count(chr(10))} lines"
+            report(f"{name}, parsing from scratch", time_call(lambda: step_to_end(parser, code), 1))
+
+            def edit_and_parse() -> None:
+                parser.edit_code(edits.pop(0))
+                parser.reset()
+                while not parser.finished_parsing:
+                    parser.step()
+
+            report(f"{name}, after adding a line", time_call(edit_and_parse, 1))
+            report(f"{name}, after removing it again", time_call(edit_and_parse, 1))
+
+
+def step_tokens(parser: Parser) -> None:
+    # a parse from scratch, the subtrees of the last timed one would otherwise all be reused
+    parser.forget_subtrees()
+    parser.reset()
+    while not parser.finished_parsing:
+        parser.step()
+
+
+def parse_tokens(parser: Parser) -> None:
+    parser.forget_subtrees()
+    parser.reset()
+    parser.parse_all()
+
+
+def batch_parsing() -> None:
+    # the example programs parsed by stepping and with parse_all(), lexed once up front so only the parse is timed
+    parsers: list[tuple[Parser, str]] = [
+        (LL1RecursiveDescentParser(), 'ExtendedCalculator-LL.gr'),
+        (LL1TableParser(), 'ExtendedCalculator-LL.gr'),
+        (SLRTableParser(), 'ExtendedCalculator-LR.gr'),
+        (LALRTableParser(), 'ExtendedCalculator-LR.gr'),
+        (LR1TableParser(), 'ExtendedCalculator-LR.gr'),
+    ]
+    for parser, grammar in parsers:
+        parser.input_grammar(read_grammar(grammar))
+        for file_name in ('Primes.cl', 'PrintNumbers.cl', 'SumAverage.cl'):
+            parser.input_code(read_code(file_name) * 100)
+            name: str = f"{type(parser).__name__} {file_name} x100"
+            stepping: float = time_call(lambda: step_tokens(parser), 3)
+            batch: float = time_call(lambda: parse_tokens(parser), 3)
+            report(f"{name}, stepping", stepping)
+            report(f"{name}, parse_all ({stepping / batch:.1f}x)", batch)
+
+
+def compiled_recursive_descent() -> None:
+    # the interpreted step() loop against the Python parser compiled from the rules, on code lexed up front
+    parser: LL1RecursiveDescentParser = LL1RecursiveDescentParser()
+    parser.input_grammar(read_grammar('ExtendedCalculator-LL.gr'))
+    report("compiling the ExtendedCalculator-LL.gr parser", time_call(
+        lambda: (LL1RecursiveDescentParser.compiled_parsers.clear(), parser.compile_python_parser()), 3))
+    for file_name in ('Primes.cl', 'PrintNumbers.cl', 'SumAverage.cl'):
+        parser.input_code(read_code(file_name) * 100)
+        name: str = f"recursive descent {file_name} x100"
+        stepping: float = time_call(lambda: step_tokens(parser), 3)
+        parser.compile_parser = True
+        compiled: float = time_call(lambda: parse_tokens(parser), 3)
+        parser.compile_parser = False
+        report(f"{name}, stepping", stepping)
+        report(f"{name}, compiled ({stepping / compiled:.1f}x)", compiled)
+
+
+def compiled_lr_engine() -> None:
+    # stepping, parse_all() interpreting the tables, and parse_all() running the engine generated from them
+    for parser in (SLRTableParser(), LALRTableParser(), LR1TableParser()):
+        parser.input_grammar(read_grammar('ExtendedCalculator-LR.gr'))
+        for file_name in ('Primes.cl', 'SumAverage.cl'):
+            parser.input_code(read_code(file_name) * 100)
+            name: str = f"{type(parser).__name__} {file_name} x100"
+            stepping: float = time_call(lambda: step_tokens(parser), 3)
+            interpreted: float = time_call(lambda: parse_tokens(parser), 3)
+            parser.compile_parser = True
+            compiled: float = time_call(lambda: parse_tokens(parser), 3)
+            parser.compile_parser = False
+            report(f"{name}, stepping", stepping)
+            report(f"{name}, parse_all ({stepping / interpreted:.1f}x)", interpreted)
+            report(f"{name}, compiled engine ({stepping / compiled:.1f}x)", compiled)
+
+    parser: LALRTableParser = LALRTableParser()
+    parser.input_grammar(read_grammar('ANSI_C-LR.gr'))
+    GrammarCache.folder = tempfile.mkdtemp() + '/'
+    report("LALR ANSI_C-LR.gr engine generated", time_call(
+        lambda: (SLRTableParser.engines.clear(), GrammarCache.clear(), parser.python_engine()), 3))
+    report("LALR ANSI_C-LR.gr engine from the cache", time_call(
+        lambda: (SLRTableParser.engines.clear(), parser.python_engine()), 3))
+    GrammarCache.clear()
+    os.rmdir(GrammarCache.folder)
+
+
+def pl0_program(loops: int) -> str:
+    loop: str = """   x := 1;
+   WHILE x <= 10 DO
+   BEGIN
+      CALL square;
+      IF odd z THEN WRITE (z + y) / 2;
+      x := x + 1;
+   END;
+"""
+    return "VAR x, y, z;\nPROCEDURE square;\nBEGIN\n   z := x * x;\nEND;\nBEGIN\n" + loop * loops + "END.\n"
+
+
+def rule_lookup() -> None:
+    # choosing the rule for a descend with the old linear search over the alternatives and with the rule rows, on a
+    # grammar where nearly every step descends
+    parser: LL1RecursiveDescentParser = LL1RecursiveDescentParser()
+    parser.input_grammar(read_grammar('PL0-LL.gr'))
+    parser.input_code(pl0_program(200))
+    descends: list[tuple[str, int, Grammar.Token]] = []
+    parser.reset()
+    while not parser.finished_parsing:
+        if parser.parse_stack and not parser.parse_stack[-1].rule_not_found() and parser.parse_stack[-1].should_descend():
+            action: LL1RecursiveDescentParser.Action = parser.parse_stack[-1].current_action()
+            descends.append((action.name, action.symbol_id, parser.token_stream.peek()))
+        parser.step()
+
+    def linear_search() -> None:
+        for name, _, token in descends:
+            next(filter(lambda rule: token.name in rule, parser.rules[name]), None)
+
+    def rule_rows() -> None:
+        for _, symbol_id, token in descends:
+            parser.rule_rows[symbol_id].get(token.symbol_id)
+
+    report(f"PL0-LL.gr {len(descends)} rule choices, linear search", time_call(linear_search))
+    report(f"PL0-LL.gr {len(descends)} rule choices, rule rows", time_call(rule_rows))
+    same: int = sum(next(filter(lambda rule: token.name in rule, parser.rules[name]), None) is
+                    parser.rule_rows[symbol_id].get(token.symbol_id) for name, symbol_id, token in descends)
+    print(f"PL0-LL.gr rule rows chose the rule the linear search did {same} of {len(descends)} times")
+    report("PL0-LL.gr recursive descent stepping", time_call(lambda: step_tokens(parser), 3))
+
+
+def recursive_descent_code() -> None:
+    # writing the code of each language for a large grammar, then switching back to it once it has been written
+    parser: LL1RecursiveDescentParser = LL1RecursiveDescentParser()
+    parser.input_grammar(synthetic_ll_grammar(500))
+    report("creating a recursive descent parser", time_call(LL1RecursiveDescentParser))
+    for index, language in enumerate(parser.languages):
+        report(f"synthetic LL, 1002 rules, {language.name} written", time_call(
+            lambda: (LL1RecursiveDescentParser.listings.clear(), parser.update_code(index))))
+        report(f"synthetic LL, 1002 rules, {language.name} cached", time_call(lambda: parser.update_code(index)))
+    with tempfile.TemporaryFile('w') as f:
+        report("synthetic LL, 1002 rules, Python exported to a file", time_call(lambda: parser.export_code(f, 1)))
+
+
+def tree_size(tree: Tree) -> int:
+    return sum(1 for _ in tree.preorder())
+
+
+def tree_layout() -> None:
+    # the parse trees of a growing program laid out on the grid and by the tidy tree layout
+    parser: LL1TableParser = LL1TableParser()
+    parser.input_grammar(read_grammar('ExtendedCalculator-LL.gr'))
+    for copies in (1, 4, 100):
+        parser.input_code(read_code('SumAverage.cl') * copies)
+        parser.reset()
+        tree: Tree = parser.parse_all()
+        name: str = f"SumAverage.cl x{copies} ({tree_size(tree)} nodes)"
+        report(f"{name}, grid", time_call(lambda: Grid(tree, False), 3))
+        report(f"{name}, compact grid", time_call(lambda: Grid(tree, True), 3))
+        report(f"{name}, tidy tree layout", time_call(lambda: TreeLayout(tree, False), 3))
+        report(f"{name}, compact tidy tree layout", time_call(lambda: TreeLayout(tree, True), 3))
+
+
+def step_layout(parser: Parser, compact_tree: bool, incremental: bool) -> None:
+    parser.reset()
+    layout: TreeLayout | None = None
+    while not parser.finished_parsing:
+        parser.step()
+        if layout is None or not incremental:
+            layout = TreeLayout(parser.tree, compact_tree)
+        else:
+            layout.update(parser.tree)
+
+
+def incremental_layout() -> None:
+    # Every example stepped through by every parser, with the tree laid out after each step, either from scratch or
+    # by updating the layout from the last step
+    grammars: dict[str, tuple[str, str]] = {
+        '.cl': ('ExtendedCalculator-LL.gr', 'ExtendedCalculator-LR.gr'), '.bminor': ('', 'BMinor-SLR.gr')
+    }
+    parsers: list[Parser] = [
+        LL1RecursiveDescentParser(), LL1TableParser(), SLRTableParser(), LALRTableParser(), LR1TableParser()
+    ]
+    for file_name in sorted(os.listdir('../ExampleCode')):
+        ll_grammar, lr_grammar = grammars[os.path.splitext(file_name)[1]]
+        for parser in parsers:
+            grammar: str = lr_grammar if isinstance(parser, SLRTableParser) else ll_grammar
+            if not grammar:
+                continue
+            parser.input_grammar(read_grammar(grammar))
+            parser.input_code(read_code(file_name) * 4)
+            name: str = f"{type(parser).__name__} {file_name} x4"
+            full: float = time_call(lambda: step_layout(parser, False, False), 3)
+            incremental: float = time_call(lambda: step_layout(parser, False, True), 3)
+            report(f"{name}, full layout per step", full)
+            report(f"{name}, updated layout per step ({full / incremental:.1f}x)", incremental)
+
+
+def build_tree(root: Tree, size: int) -> Tree:
+    # every node gets four children, breadth first
+    nodes: list[Tree] = [root]
+    for i in range(size - 1):
+        nodes.append(nodes[i // 4].add_child(f"node{i % 100}"))
+    return root
+
+
+def tree_memory() -> None:
+    # trees of objects against trees kept in a TreeArena, built directly and by parsing
+    for size in (10000, 1000000):
+        for name, new_root in (("Tree", lambda: Tree('root')), ("TreeArena", lambda: TreeArena().add_root('root'))):
+            report(f"{name} of {size} nodes, built", time_call(lambda: build_tree(new_root(), size), 3))
+            per_node: float = allocated_bytes(lambda: build_tree(new_root(), size)) / size
+            print(f"{name} of {size} nodes, {per_node:.0f} bytes per node")
+    parser: LL1TableParser = LL1TableParser()
+    parser.input_grammar(read_grammar('ExtendedCalculator-LL.gr'))
+    parser.input_code(read_code('SumAverage.cl') * 1000)
+    for arena_trees in (False, True):
+        parser.arena_trees = arena_trees
+        name: str = f"LL(1) parse_all SumAverage.cl x1000, {'TreeArena' if arena_trees else 'Tree'}"
+        report(name, time_call(lambda: parse_tokens(parser), 3))
+        print(f"{name}, {allocated_bytes(lambda: parse_tokens(parser))} bytes")
+
+
+benchmarks: dict[str, Callable[[], None]] = {
+    'first_follow': first_follow,
+    'lr_states': lr_states,
+    'lr_stepping': lr_stepping,
+    'parse_tables': parse_tables,
+    'grammar_cache': grammar_cache,
+    'lexer': lexer,
+    'streaming_lexer': streaming_lexer,
+    'incremental_parsing': incremental_parsing,
+    'batch_parsing': batch_parsing,
+    'compiled_recursive_descent': compiled_recursive_descent,
+    'compiled_lr_engine': compiled_lr_engine,
+    'rule_lookup': rule_lookup,
+    'recursive_descent_code': recursive_descent_code,
+    'tree_layout': tree_layout,
+    'incremental_layout': incremental_layout,
+    'tree_memory': tree_memory,
+}
+
+
+if __name__ == '__main__':
+    for benchmark_name in sys.argv[1:] or benchmarks:
+        benchmarks[benchmark_name]()
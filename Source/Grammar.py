@@ -17,6 +17,15 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 from __future__ import annotations
+import codecs
+from collections.abc import Callable, Generator, Iterator
+from enum import IntEnum
+from functools import partial
+from mmap import mmap
+import re
+from typing import IO
+
+from GrammarAnalysis import GrammarAnalysis
 
 
 class Grammar:
@@ -24,6 +33,7 @@ class Grammar:
         def __init__(self, name: str, terminal: bool) -> None:
             self.name: str = name
             self.terminal: bool = terminal
+            self.symbol_id: int = -1
 
         def __str__(self) -> str:
             return f'"{self.name.replace('\n', '\\n')}"' if self.terminal else f'<{self.name}>'
@@ -32,6 +42,7 @@ class Grammar:
         def __init__(self, name: str, rules: list[Grammar.Production] = None) -> None:
             self.name: str = name
             self.productions: list[Grammar.Production] = [] if rules is None else rules
+            self.symbol_id: int = -1
 
         def is_epsilon(self) -> bool:
             return len(self.productions) == 1 and self.productions[0].name == ''
@@ -39,14 +50,84 @@ class Grammar:
         def make_formatted_str(self, longest_rule_len: int) -> str:
             return '<' + self.name + '>' + ' ' * (longest_rule_len - len(self.name)) + ' ::= ' + ' '.join(map(str, self.productions))
 
-    class Token:
-        def __init__(self, name: str, image: str = None) -> None:
-            self.name = name
-            self.image = name if image is None else image
+    class Token:  # the image is text[start:end], only cut out of the code it was lexed from when it is asked for
+        __slots__ = ('name', 'text', 'symbol_id', 'start', 'end')
+
+        def __init__(self, name: str, text: str = None, symbol_id: int = -1, start: int = 0, end: int = -1) -> None:
+            self.name: str = name
+            self.text: str = name if text is None else text
+            self.symbol_id: int = symbol_id
+            self.start: int = start
+            self.end: int = len(self.text) if end < 0 else end
+
+        @property
+        def image(self) -> str:
+            return self.text[self.start:self.end]
 
         def __str__(self) -> str:
             return self.image
 
+    class SymbolTable:  # nonterminals get the ids [0, n), terminals get [n, n + t), epsilon and unknown tokens get -1
+        def __init__(self, nonterminals: list[str], terminals: list[str]) -> None:
+            self.nonterminals: list[str] = nonterminals
+            self.terminals: list[str] = terminals
+            self.names: list[str] = nonterminals + terminals
+            self.nonterminal_ids: dict[str, int] = {name: i for i, name in enumerate(nonterminals)}
+            self.terminal_ids: dict[str, int] = {name: i for i, name in enumerate(terminals, start=len(nonterminals))}
+
+        def __len__(self) -> int:
+            return len(self.names)
+
+        def symbol_id(self, name: str, terminal: bool) -> int:
+            return (self.terminal_ids if terminal else self.nonterminal_ids).get(name, -1)
+
+        def is_terminal(self, symbol_id: int) -> bool:
+            return symbol_id >= len(self.nonterminals)
+
+        def terminal_index(self, symbol_id: int) -> int:
+            return symbol_id - len(self.nonterminals) if self.is_terminal(symbol_id) else -1
+
+    class TokenTrie:  # every prefix of a token is a state, state 0 is the empty prefix and -1 means no token fits
+        def __init__(self, tokens: list[str]) -> None:
+            self.transitions: list[dict[str, int]] = [{}]
+            self.accepting: list[bool] = [False]
+            for token in tokens:
+                state: int = 0
+                for char in token:
+                    if char not in self.transitions[state]:
+                        self.transitions[state][char] = len(self.transitions)
+                        self.transitions.append({})
+                        self.accepting.append(False)
+                    state = self.transitions[state][char]
+                self.accepting[state] = True
+
+        def step(self, state: int, char: str) -> int:
+            return self.transitions[state].get(char, -1) if state >= 0 else -1
+
+        def walk(self, text: str) -> int:
+            state: int = 0
+            for char in text:
+                state = self.step(state, char)
+            return state
+
+        def accepts(self, state: int) -> bool:
+            return state >= 0 and self.accepting[state]
+
+    class CharClass(IntEnum):  # letters sort before digits so "letter or digit" is a single comparison
+        Letter = 0
+        Digit = 1
+        Space = 2
+        Other = 3
+
+    # patterns for the token classes the built-in lexer knows, used when a grammar with token definitions uses one of
+    # them without defining it
+    default_token_patterns: dict[str, str] = {
+        'identifier': r'[^\W\d]\w*',
+        'number_lit': r'\d+',
+        'string_lit': r'"(?:\\.|[^"\\])*"',
+        'char_lit': r"'(?:\\.|[^\\])'",
+    }
+
     class GrammarParsingException(Exception):
         pass
 
@@ -57,10 +138,13 @@ class Grammar:
         self.description: str = description.strip()
         self.rules: list[Grammar.Rule] = []
         self.tokens_list: list[str] = []
+        # lines like "number" ::= /[0-9]+/, which turn on the pattern lexer, the name "" is for text that gets skipped
+        self.token_definitions: list[tuple[str, str]] = []
 
         current_state: int = 0
         current_string: str = ''
         current_rule_name: str = ''
+        current_pattern: str = ''
 
         for char in self.description:
             match current_state:
@@ -68,6 +152,9 @@ class Grammar:
                     if char == '<':
                         current_string = ''
                         current_state = 1
+                    elif char == '"':
+                        current_string = ''
+                        current_state = 14
                     elif char.isspace():
                         pass
                     else:
@@ -172,10 +259,50 @@ class Grammar:
                         current_state = 0
                     else:
                         pass
+                case 14:
+                    if char == '\n':
+                        raise self.GrammarParsingException("Symbol definition incomplete")
+                    elif char == '"':
+                        current_state = 15
+                    else:
+                        current_string += char
+                case 15:
+                    if char == ':':
+                        current_state = 16
+                    elif char.isspace() and char != '\n':
+                        pass
+                    else:
+                        raise self.GrammarParsingException("Token name must be followed by '::='")
+                case 16:
+                    if char == ':':
+                        current_state = 17
+                    else:
+                        raise self.GrammarParsingException("Token name must be followed by '::='")
+                case 17:
+                    if char == '=':
+                        current_state = 18
+                    else:
+                        raise self.GrammarParsingException("Token name must be followed by '::='")
+                case 18:
+                    if char == '/':
+                        current_pattern = ''
+                        current_state = 19
+                    elif char.isspace() and char != '\n':
+                        pass
+                    else:
+                        raise self.GrammarParsingException("Token patterns must be written between '/' characters")
+                case 19:
+                    if char == '\n':
+                        self.add_token_definition(current_string, current_pattern)
+                        current_state = 0
+                    else:
+                        current_pattern += char
                 case _:
                     raise self.GrammarParsingException("Something went wrong.")
 
-        if current_state != 0 and current_state != 9 and current_state != 13:
+        if current_state == 19:
+            self.add_token_definition(current_string, current_pattern)
+        elif current_state != 0 and current_state != 9 and current_state != 13:
             raise self.GrammarParsingException("Grammar definition is incomplete")
 
         self.tokens_list = list(dict.fromkeys(self.tokens_list))
@@ -185,11 +312,65 @@ class Grammar:
             self.tokens_list.remove('eof')
             self.tokens_list.append('eof')
 
+        self.symbols: Grammar.SymbolTable = Grammar.SymbolTable(
+            list(dict.fromkeys([rule.name for rule in self.rules])), self.tokens_list)
+        for rule in self.rules:
+            rule.symbol_id = self.symbols.nonterminal_ids[rule.name]
+            for production in rule.productions:
+                production.symbol_id = self.symbols.symbol_id(production.name, production.terminal)
+
         self.start_symbol: str = self.rule_names_list[0]
+        self.token_trie: Grammar.TokenTrie = Grammar.TokenTrie(self.tokens_list)
+        self.ascii_classes: list[Grammar.CharClass] = [self.char_class(chr(i)) for i in range(128)]
+        self.token_pattern: re.Pattern[str] | None = None
+        self.group_tokens: list[tuple[str, int] | None] = []  # the token name and id matched by each group
+        self.literal_ids: dict[str, int] = {}
+        if self.token_definitions:
+            self.make_token_pattern()
+        self._analysis: GrammarAnalysis | None = None
 
     def __len__(self):
         return len(self.rules)
 
+    def add_token_definition(self, name: str, line: str) -> None:
+        # the rest of the line after the opening '/', which has to end with the closing one
+        pattern: str = line.rstrip()
+        if not pattern.endswith('/'):
+            raise self.GrammarParsingException("Token patterns must be written between '/' characters")
+        try:
+            re.compile(pattern[:-1])
+        except re.error as e:
+            raise self.GrammarParsingException(f"Invalid pattern for \"{name}\": {e}.")
+        self.token_definitions.append((name, pattern[:-1]))
+
+    def make_token_pattern(self) -> None:
+        # Whitespace followed by one alternation, tried in order: the definitions in the order they were written (plus
+        # the default ones for built-in classes the rules use), the terminals that have no definition longest first so
+        # "<=" wins over "<", and last any other character, which is an error. Text matched by a definition that
+        # spells one of those terminals, like a keyword matched as an identifier, becomes that terminal.
+        defined: set[str] = {name for name, _ in self.token_definitions}
+        definitions: list[tuple[str, str]] = self.token_definitions + [
+            (name, Grammar.default_token_patterns[name]) for name in self.tokens_list
+            if name in Grammar.default_token_patterns and name not in defined
+        ]
+        literals: list[str] = sorted(
+            (name for name in self.tokens_list
+             if name not in defined and name not in Grammar.default_token_patterns and name != 'eof'),
+            key=len, reverse=True
+        )
+
+        alternatives: list[str] = [f'(?P<d{i}>{pattern})' for i, (_, pattern) in enumerate(definitions)]
+        if literals:
+            alternatives.append(f"(?P<literal>{'|'.join(map(re.escape, literals))})")
+        alternatives.append(r'(?P<error>(?s:.))')
+        self.token_pattern = re.compile(r'\s*+(?:' + '|'.join(alternatives) + ')')
+        self.literal_ids = {name: self.symbols.terminal_ids[name] for name in literals}
+
+        # match.lastindex is the group of the alternative that matched, the groups inside a pattern close before it
+        self.group_tokens = [None] * (self.token_pattern.groups + 1)
+        for i, (name, _) in enumerate(definitions):
+            self.group_tokens[self.token_pattern.groupindex[f'd{i}']] = (name, self.symbols.symbol_id(name, True))
+
     def longest_rule_len(self) -> int:
         return max(map(lambda x: len(x.name), self.rules))
 
@@ -198,160 +379,212 @@ class Grammar:
             return str(n).rjust(len(str(len(self.rules)))) + '. ' + rule.make_formatted_str(self.longest_rule_len())
         return [make_str(i, r) for i, r, in enumerate(self.rules, start=1)]
 
+    @property
+    def analysis(self) -> GrammarAnalysis:
+        # built on first use, parsers loaded from the grammar cache never need it
+        if self._analysis is None:
+            self._analysis = GrammarAnalysis(self)
+        return self._analysis
+
     @property
     def rule_names_list(self) -> list[str]:
-        return list(dict.fromkeys([rule.name for rule in self.rules]))
+        return self.symbols.nonterminals
 
-    def generate_first_sets(self) -> dict[str, list[str]]:
-        def remove_epsilon(l: list) -> list:
-            new_l: list = [i for i in l]
-            if '' in new_l:
-                new_l.remove('')
-            return new_l
-
-        first_sets: dict[str, list[str]] = {'': ['']}
-        for rule_name in self.rule_names_list:
-            first_sets[rule_name] = []
-        for token in self.tokens_list:
-            first_sets[token] = [token]
-        for rule in self.rules:
-            if rule.is_epsilon() and len(first_sets[rule.name]) < 1:
-                first_sets[rule.name].append('')
-
-        made_progress: bool = True
-        while made_progress:
-            made_progress = False
-            for rule in self.rules:
-                first_len = len(first_sets[rule.name])
-                for production in rule.productions:
-                    first_sets[rule.name] = list(set(first_sets[rule.name] + remove_epsilon(first_sets[production.name])))
-                    if '' not in first_sets[production.name]:
-                        break
+    def make_token(self, name: str, image: str = None) -> Token:
+        return self.Token(name, image, self.symbols.symbol_id(name, True))
 
-                e_in_all_productions: bool = True
-                for production in rule.productions:
-                    if '' not in first_sets[production.name]:
-                        e_in_all_productions = False
-                        break
-                if e_in_all_productions and '' not in first_sets[rule.name]:
-                    first_sets[rule.name].append('')
-
-                made_progress = made_progress or len(first_sets[rule.name]) > first_len
-
-        if '' in first_sets[self.start_symbol]:
-            first_sets[self.start_symbol].remove('')
-        if 'eof' not in first_sets[self.start_symbol]:
-            first_sets[self.start_symbol].append('eof')
-
-        return first_sets
-
-    def generate_follow_sets(self, first_sets: dict[str, list[str]] = None) -> dict[str, list[str]]:
-        def remove_epsilon(l: list) -> list:
-            new_l: list = [i for i in l]
-            if '' in new_l:
-                new_l.remove('')
-            return new_l
-
-        first_sets: dict[str, list[str]] = self.generate_first_sets() if first_sets is None else first_sets
-        follow_sets: dict[str, list[str]] = {}
-        for key in first_sets:
-            follow_sets[key] = []
-        follow_sets[self.start_symbol].append('')
-        made_progress: bool = True
-        while made_progress:
-            made_progress = False
-            for rule in self.rules:
-                for i, production in enumerate(rule.productions):
-                    first_len = len(follow_sets[production.name])
-                    if i + 1 < len(rule.productions):
-                        follow_sets[production.name] = list(set(follow_sets[production.name] + remove_epsilon(first_sets[rule.productions[i+1].name])))
-                    made_progress = made_progress or len(follow_sets[production.name]) > first_len
-
-                for i, production in enumerate(rule.productions):
-                    first_len = len(follow_sets[production.name])
-                    if i == len(rule.productions)-1 or '' in first_sets[rule.productions[i+1].name]:
-                        follow_sets[production.name] = list(set(follow_sets[production.name] + follow_sets[rule.name]))
-                    made_progress = made_progress or len(follow_sets[production.name]) > first_len
-
-        return follow_sets
+    def generate_first_sets(self) -> dict[str, list[str]]:
+        return self.analysis.first_sets()
 
-    def lexer(self, code: str) -> list[Token]:
-        # TODO: make state machine
+    def generate_follow_sets(self) -> dict[str, list[str]]:
+        return self.analysis.follow_sets()
 
-        def get_potential_tokens(list_: list[str], current_token_: str) -> list[str]:
-            return [item for item in list_ if item.startswith(current_token_)]
+    @staticmethod
+    def char_class(char: str) -> Grammar.CharClass:
+        return (Grammar.CharClass.Letter if char.isidentifier() else Grammar.CharClass.Digit if char.isdigit() else
+                Grammar.CharClass.Space if char.isspace() else Grammar.CharClass.Other)
 
-        token_stream: list[Grammar.Token] = []
-        counter: int = 0
-        current_token: str = ''
+    def lexer(self, code: str) -> list[Token]:
+        return list(self.tokens(code))
+
+    def tokens(self, source: str | IO[str] | IO[bytes] | mmap, chunk_size: int = 1 << 16,
+               position: int = 0) -> Iterator[Token]:
+        # Files and mmaps are read a chunk at a time. A token that runs into the end of a chunk is scanned again once
+        # the next chunk is in, so only the unfinished end of the last chunk is kept between reads, or the last chunk
+        # for grammars with token definitions. A str can be scanned from a position between two tokens on, which is
+        # how edited code gets lexed again.
+        scan: Callable[[str, str, bool, int], Generator[Grammar.Token, None, tuple[int, str]]] = \
+            self.scan if self.token_pattern is None else partial(self.match_tokens, lookahead=chunk_size)
+        if isinstance(source, str):
+            yield from scan(source, '', True, position)
+        else:
+            decoder: codecs.IncrementalDecoder = codecs.getincrementaldecoder('utf-8')()
+            code: str = ''
+            carried: str = ''
+            while True:
+                chunk: str | bytes = source.read(chunk_size)
+                final: bool = not chunk
+                code += decoder.decode(chunk, final) if isinstance(chunk, bytes) else chunk
+                position, carried = yield from scan(code, carried, final, 0)
+                if final:
+                    break
+                code = code[position:]
+        yield self.make_token('eof')
+
+    def scan(self, code: str, current_token: str, final: bool,
+             position: int = 0) -> Generator[Token, None, tuple[int, str]]:
+        # Unless this is the end of the input, stops in front of the first token that reaches the end of the code and
+        # returns where to start again along with the text carried over into that token.
+        counter: int = position
+        start: int
+        symbol_id: int
         code_length: int = len(code)
+        letter, digit, space, other = Grammar.CharClass
+        ascii_classes: list[Grammar.CharClass] = self.ascii_classes
+        char_class: Callable[[str], Grammar.CharClass] = Grammar.char_class
+
+        trie: Grammar.TokenTrie = self.token_trie
+        terminal_ids: dict[str, int] = self.symbols.terminal_ids
+        names: list[str] = self.symbols.names
+        token: type[Grammar.Token] = Grammar.Token
 
         while counter < code_length:
-            if code[counter].isspace():
+            char: str = code[counter]
+            kind: int = ascii_classes[ord(char)] if char < '\x80' else char_class(char)
+            if kind == space:
                 counter += 1
-            elif code[counter].isidentifier():
-                while counter < code_length and (code[counter].isidentifier() or code[counter].isdigit()):
-                    current_token += code[counter]
+            elif kind == letter:
+                start = counter
+                while counter < code_length:
+                    char = code[counter]
+                    if (ascii_classes[ord(char)] if char < '\x80' else char_class(char)) > digit:
+                        break
                     counter += 1
-                token_stream.append(self.Token(current_token) if current_token in self.tokens_list
-                                    else self.Token('identifier', current_token))
-                current_token = ''
-            elif code[counter].isdigit():
-                while counter < code_length and code[counter].isdigit():
-                    current_token += code[counter]
+                else:
+                    if not final:
+                        return start, current_token
+                if current_token:
+                    current_token += code[start:counter]
+                    yield (self.make_token(current_token) if current_token in terminal_ids
+                           else self.make_token('identifier', current_token))
+                    current_token = ''
+                else:
+                    symbol_id = terminal_ids.get(code[start:counter], -1)
+                    yield (token(names[symbol_id], code, symbol_id, start, counter) if symbol_id >= 0
+                           else self.span_token('identifier', code, start, counter))
+            elif kind == digit:
+                start = counter
+                while counter < code_length:
+                    char = code[counter]
+                    if (ascii_classes[ord(char)] if char < '\x80' else char_class(char)) != digit:
+                        break
                     counter += 1
+                else:
+                    if not final:
+                        return start, current_token
                 if counter < code_length and code[counter].isalpha():
-                    raise self.LexingException(f"Invalid token: '{current_token + code[counter]}'.")
-                token_stream.append(self.Token('number_lit', current_token))
+                    raise self.LexingException(f"Invalid token: '{current_token + code[start:counter + 1]}'.")
+                yield self.span_token('number_lit', code, start, counter, current_token)
                 current_token = ''
             elif code[counter] == '"':
-                current_token += code[counter]
+                start = counter
                 counter += 1
                 while counter < code_length:
-                    if code[counter] == '\\' and counter < len(code)-1:
-                        current_token += code[counter]
-                        counter += 1
-                        current_token += code[counter]
-                        counter += 1
+                    if code[counter] == '\\' and counter < code_length - 1:
+                        counter += 2
                     elif code[counter] == '"':
-                        current_token += code[counter]
                         counter += 1
-                        token_stream.append(self.Token('string_lit', current_token))
+                        yield self.span_token('string_lit', code, start, counter, current_token)
                         current_token = ''
                         break
                     else:
-                        current_token += code[counter]
                         counter += 1
+                else:
+                    if not final:
+                        return start, current_token
+                    current_token += code[start:counter]
             elif code[counter] == "'":
-                current_token += code[counter]
+                if not final and counter + 4 > code_length:
+                    return counter, current_token
+                start = counter
                 counter += 1
                 if code[counter] == '\\':
-                    current_token += code[counter]
                     counter += 1
-                current_token += code[counter]
                 counter += 1
                 if code[counter] != "'":
                     raise self.LexingException(f"Chars in single quotes can only have one character.")
-                current_token += code[counter]
                 counter += 1
-                token_stream.append(self.Token('char_lit', current_token))
+                yield self.span_token('char_lit', code, start, counter, current_token)
                 current_token = ''
             else:
-                potential_tokens = get_potential_tokens(self.tokens_list, current_token)
-                while counter < code_length and \
-                        not (code[counter].isidentifier() or code[counter].isdigit() or code[counter].isspace()):
-                    current_token += code[counter]
+                # a token ends once it is complete and adding the next character wouldn't make another token
+                start = counter
+                state: int = trie.walk(current_token)
+                while counter < code_length:
+                    char = code[counter]
+                    if (ascii_classes[ord(char)] if char < '\x80' else char_class(char)) != other:
+                        break
+                    state = trie.step(state, char)
                     counter += 1
-                    potential_tokens = get_potential_tokens(potential_tokens, current_token)
-                    if len(potential_tokens) < 1:
-                        raise self.LexingException(f"Invalid token: '{current_token}'.")
-                    if current_token in potential_tokens and \
-                            (counter >= code_length or current_token + code[counter] not in
-                             get_potential_tokens(potential_tokens, current_token + code[counter])):
-                        token_stream.append(self.Token(current_token))
-                        current_token = ''
+                    if state < 0:
+                        raise self.LexingException(f"Invalid token: '{current_token + code[start:counter]}'.")
+                    if counter >= code_length and not final:
+                        return start, current_token
+                    if trie.accepts(state) and (counter >= code_length or
+                                                not trie.accepts(trie.step(state, code[counter]))):
+                        if current_token:
+                            yield self.make_token(current_token + code[start:counter])
+                            current_token = ''
+                        else:
+                            symbol_id = terminal_ids[code[start:counter]]
+                            yield token(names[symbol_id], code, symbol_id, start, counter)
+                        start = counter
                         break
-        if current_token != '':
-            token_stream.append(self.Token(current_token))
-        token_stream.append(self.Token('eof'))
-        return token_stream
+                current_token += code[start:counter]
+        if final and current_token != '':
+            yield self.make_token(current_token)
+            current_token = ''
+        return code_length, current_token
+
+    def match_tokens(self, code: str, current_token: str, final: bool, position: int = 0,
+                     lookahead: int = 0) -> Generator[Token, None, tuple[int, str]]:
+        # scan() for grammars with token definitions, nothing is ever carried over. Before the end of the input, a
+        # match can come out differently once more code is in: it can run on, or a definition that didn't match for
+        # lack of code, like a comment that isn't closed yet, can match instead. A regex can't tell when that happened,
+        # so only tokens that end lookahead characters before the end of the code are kept, and the code from the next
+        # match on is scanned again with the next chunk. Only a token or a skipped text that spans more than lookahead
+        # characters can still be cut.
+        limit: int = len(code) if final else len(code) - lookahead
+        group_tokens: list[tuple[str, int] | None] = self.group_tokens
+        literal_group: int = self.token_pattern.groupindex.get('literal', -1)
+        error_group: int = self.token_pattern.groupindex['error']
+        literal_ids: dict[str, int] = self.literal_ids
+        names: list[str] = self.symbols.names
+        token: type[Grammar.Token] = Grammar.Token
+
+        for match in self.token_pattern.finditer(code, position):
+            group: int = match.lastindex
+            start, end = match.span(group)
+            if end > limit:
+                return start, ''
+            if group == literal_group:
+                symbol_id: int = literal_ids[code[start:end]]
+                yield token(names[symbol_id], code, symbol_id, start, end)
+            elif group == error_group:
+                if not final:
+                    return start, ''
+                raise self.LexingException(f"Invalid token: '{code[start:end]}'.")
+            else:
+                name, symbol_id = group_tokens[group]
+                if name == '':
+                    continue
+                keyword_id: int = literal_ids.get(code[start:end], -1) if literal_ids else -1
+                yield (token(names[keyword_id], code, keyword_id, start, end) if keyword_id >= 0
+                       else token(name, code, symbol_id, start, end))
+        return len(code), ''
+
+    def span_token(self, name: str, code: str, start: int, end: int, carried: str = '') -> Token:
+        # the token points at its image in the code instead of copying it, unless text was carried over into it
+        if carried:
+            return self.make_token(name, carried + code[start:end])
+        return self.Token(name, code, self.symbols.terminal_ids.get(name, -1), start, end)
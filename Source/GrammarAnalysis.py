@@ -0,0 +1,238 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from Grammar import Grammar
+
+
+class GrammarAnalysis:
+    # Sets are ints used as bitsets: bit i is the terminal with terminal index i, and the bit after the last terminal
+    # stands for epsilon (""). FIRST and FOLLOW are solved with the digraph algorithm, which visits the relation in
+    # strongly connected component order, so every set is final after one traversal instead of a fixpoint loop.
+
+    def __init__(self, grammar: Grammar) -> None:
+        self.grammar: Grammar = grammar
+        self.symbols: Grammar.SymbolTable = grammar.symbols
+        self.nonterminal_count: int = len(self.symbols.nonterminals)
+        self.epsilon: int = 1 << len(self.symbols.terminals)
+        self.nullable: list[bool] = self.find_nullable()
+        self.first: list[int] = self.solve_first()
+        self.follow: list[int] = self.solve_follow()
+        self.corner_relation: list[list[int]] | None = None  # made by left_recursive() when it's first needed
+
+    def symbol_bit(self, symbol_id: int) -> int:
+        return 1 << self.symbols.terminal_index(symbol_id)
+
+    def bitset_to_list(self, bitset: int) -> list[str]:
+        terminals: list[str] = self.symbols.terminals
+        names: list[str] = []
+        while bitset:
+            low_bit: int = bitset & -bitset
+            index: int = low_bit.bit_length() - 1
+            names.append(terminals[index] if index < len(terminals) else '')
+            bitset ^= low_bit
+        return names
+
+    def bitset_to_ids(self, bitset: int) -> list[int]:
+        ids: list[int] = []
+        while bitset & ~self.epsilon:
+            low_bit: int = bitset & -bitset
+            ids.append(low_bit.bit_length() - 1 + self.nonterminal_count)
+            bitset ^= low_bit
+        return ids
+
+    def end_of_input(self, bitset: int) -> int:
+        # epsilon in a follow or predict set means the end of the input, which the lexer marks with an eof token
+        eof: int = self.symbols.symbol_id('eof', True)
+        return (bitset & ~self.epsilon) | self.symbol_bit(eof) if bitset & self.epsilon and eof >= 0 else bitset
+
+    def predict(self, rule: Grammar.Rule) -> int:
+        predict: int = self.first_of_sequence(rule.productions)
+        if predict & self.epsilon:
+            predict = (predict & ~self.epsilon) | self.follow[rule.symbol_id]
+        return self.end_of_input(predict)
+
+    def first_of(self, symbol_id: int) -> int:
+        return self.epsilon if symbol_id < 0 else self.first[symbol_id]
+
+    def first_of_sequence(self, productions: list[Grammar.Production]) -> int:
+        result: int = 0
+        for production in productions:
+            first: int = self.first_of(production.symbol_id)
+            result |= first & ~self.epsilon
+            if not first & self.epsilon:
+                return result
+        return result | self.epsilon
+
+    def left_corners(self, productions: list[Grammar.Production]) -> list[int]:
+        # the nonterminals a sequence can start with, the ones behind nullable nonterminals included
+        corners: list[int] = []
+        for production in productions:
+            if production.symbol_id < 0 or self.symbols.is_terminal(production.symbol_id):
+                break
+            corners.append(production.symbol_id)
+            if not self.nullable[production.symbol_id]:
+                break
+        return corners
+
+    def left_recursive(self, rule: Grammar.Rule) -> bool:
+        # whether the rule can get back to its own nonterminal without reading a token
+        if self.corner_relation is None:
+            self.corner_relation = [[] for _ in range(self.nonterminal_count)]
+            for other in self.grammar.rules:
+                self.corner_relation[other.symbol_id] += self.left_corners(other.productions)
+        seen: set[int] = set()
+        work: list[int] = self.left_corners(rule.productions)
+        while work:
+            symbol_id: int = work.pop()
+            if symbol_id == rule.symbol_id:
+                return True
+            if symbol_id not in seen:
+                seen.add(symbol_id)
+                work += self.corner_relation[symbol_id]
+        return False
+
+    def find_nullable(self) -> list[bool]:
+        nullable: list[bool] = [False] * len(self.symbols)
+        remaining: list[int] = []
+        users: list[list[int]] = [[] for _ in range(self.nonterminal_count)]
+        work: list[int] = []
+
+        for i, rule in enumerate(self.grammar.rules):
+            non_epsilon: list[int] = [p.symbol_id for p in rule.productions if p.name != '']
+            remaining.append(len(non_epsilon))
+            for symbol_id in non_epsilon:
+                if not self.symbols.is_terminal(symbol_id):
+                    users[symbol_id].append(i)
+            if not non_epsilon:
+                work.append(i)
+
+        while work:
+            rule: Grammar.Rule = self.grammar.rules[work.pop()]
+            if nullable[rule.symbol_id]:
+                continue
+            nullable[rule.symbol_id] = True
+            for i in users[rule.symbol_id]:
+                remaining[i] -= 1
+                if remaining[i] == 0:
+                    work.append(i)
+
+        return nullable
+
+    def solve_first(self) -> list[int]:
+        initial: list[int] = [0] * self.nonterminal_count
+        relation: list[list[int]] = [[] for _ in range(self.nonterminal_count)]
+
+        for rule in self.grammar.rules:
+            for production in rule.productions:
+                if production.symbol_id < 0:
+                    break
+                if self.symbols.is_terminal(production.symbol_id):
+                    initial[rule.symbol_id] |= self.symbol_bit(production.symbol_id)
+                    break
+                relation[rule.symbol_id].append(production.symbol_id)
+                if not self.nullable[production.symbol_id]:
+                    break
+
+        first: list[int] = self.digraph(relation, initial)
+        for symbol_id in range(self.nonterminal_count):
+            if self.nullable[symbol_id]:
+                first[symbol_id] |= self.epsilon
+        first += [self.symbol_bit(symbol_id) for symbol_id in range(self.nonterminal_count, len(self.symbols))]
+
+        # the start symbol can never derive the empty string since the input always ends with an eof token
+        first[0] = self.end_of_input(first[0] | self.epsilon)
+        return first
+
+    def solve_follow(self) -> list[int]:
+        initial: list[int] = [0] * len(self.symbols)
+        relation: list[list[int]] = [[] for _ in range(len(self.symbols))]
+        initial[0] = self.epsilon  # epsilon doubles as the end of input marker in the follow set of the start symbol
+
+        for rule in self.grammar.rules:
+            trailer: int = self.epsilon
+            for production in reversed(rule.productions):
+                if production.symbol_id < 0:
+                    continue
+                initial[production.symbol_id] |= trailer & ~self.epsilon
+                if trailer & self.epsilon:
+                    relation[production.symbol_id].append(rule.symbol_id)
+                first: int = self.first[production.symbol_id]
+                trailer = (trailer | first) if first & self.epsilon else first
+
+        return self.digraph(relation, initial)
+
+    @staticmethod
+    def digraph(relation: list[list[int]], initial: list[int]) -> list[int]:
+        # DeRemer and Pennello's digraph algorithm: F(x) = F'(x) | union of F(y) for x R y. It is Tarjan's SCC
+        # algorithm written with an explicit stack so long chains of rules don't hit the recursion limit.
+        finished: int = len(relation) + 1
+        result: list[int] = list(initial)
+        depth: list[int] = [0] * len(relation)
+        stack: list[int] = []
+
+        for root in range(len(relation)):
+            if depth[root] != 0:
+                continue
+            stack.append(root)
+            depth[root] = len(stack)
+            calls: list[list[int]] = [[root, 0, len(stack)]]
+            while calls:
+                frame: list[int] = calls[-1]
+                x: int = frame[0]
+                if frame[1] < len(relation[x]):
+                    y: int = relation[x][frame[1]]
+                    frame[1] += 1
+                    if depth[y] == 0:
+                        stack.append(y)
+                        depth[y] = len(stack)
+                        calls.append([y, 0, len(stack)])
+                    else:
+                        depth[x] = min(depth[x], depth[y])
+                        result[x] |= result[y]
+                    continue
+
+                calls.pop()
+                if depth[x] == frame[2]:
+                    while True:
+                        top: int = stack.pop()
+                        depth[top] = finished
+                        result[top] = result[x]
+                        if top == x:
+                            break
+                if calls:
+                    parent: int = calls[-1][0]
+                    depth[parent] = min(depth[parent], depth[x])
+                    result[parent] |= result[x]
+
+        return result
+
+    def first_sets(self) -> dict[str, list[str]]:
+        first_sets: dict[str, list[str]] = {'': ['']}
+        for symbol_id, name in enumerate(self.symbols.names):
+            first_sets[name] = self.bitset_to_list(self.first[symbol_id])
+        return first_sets
+
+    def follow_sets(self) -> dict[str, list[str]]:
+        follow_sets: dict[str, list[str]] = {'': []}
+        for symbol_id, name in enumerate(self.symbols.names):
+            follow_sets[name] = self.bitset_to_list(self.follow[symbol_id])
+        return follow_sets
@@ -0,0 +1,133 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+import hashlib
+import importlib.machinery
+import importlib.util
+import mmap
+import os
+import pickle
+import py_compile
+import shutil
+from types import ModuleType
+
+
+class GrammarCache:
+    # Whatever a parser builds from a grammar, stored in one file per grammar text and algorithm. A file that can't be
+    # read, or that was written by another version of the program, is treated as missing and gets rebuilt.
+    folder: str = '../Cache/'
+    version: int = 3  # bump this whenever a change to a parser changes what it builds from the same grammar
+    enabled: bool = True
+
+    @classmethod
+    def file_name(cls, description: str, algorithm: str, extension: str = '.grc') -> str:
+        key: str = hashlib.sha256(f"{cls.version}\n{algorithm}\n{description}".encode()).hexdigest()
+        return cls.folder + key + extension
+
+    @classmethod
+    def load(cls, description: str, algorithm: str) -> dict[str, object] | None:
+        if not cls.enabled:
+            return None
+        try:
+            with open(cls.file_name(description, algorithm), 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return pickle.loads(data)
+        except Exception:
+            # unpickling a stale file can fail in about any way, from a class that isn't there anymore on
+            return None
+
+    @classmethod
+    def save(cls, description: str, algorithm: str, compiled: dict[str, object]) -> None:
+        if not cls.enabled:
+            return
+        file_name: str = cls.file_name(description, algorithm)
+        try:
+            os.makedirs(cls.folder, exist_ok=True)
+            with open(file_name + '.tmp', 'wb') as f:
+                pickle.dump(compiled, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(file_name + '.tmp', file_name)
+        except OSError:
+            pass  # running without a cache only costs time
+
+    class CheckedLoader(importlib.machinery.SourceFileLoader):
+        # Imports the source that load_module() checked against its hash, instead of reading the file again, and only
+        # takes bytecode from __pycache__ that Python checks against that source before using it.
+        def __init__(self, name: str, path: str, source: bytes) -> None:
+            super().__init__(name, path)
+            self.source: bytes = source
+
+        def get_data(self, path: str) -> bytes:
+            if path == self.path:
+                return self.source
+            data: bytes = super().get_data(path)
+            if int.from_bytes(data[4:8], 'little') != 3:  # the flags of a checked hash-based .pyc
+                raise OSError("Only checked hash-based bytecode is used")
+            return data
+
+        def set_data(self, path: str, data: bytes, *, _mode: int = 0o666) -> None:
+            pass  # the bytecode is written by save_module()
+
+    @classmethod
+    def load_module(cls, description: str, algorithm: str) -> ModuleType | None:
+        # Python code generated from a grammar is stored as a module and imported, so that Python keeps its compiled
+        # bytecode in the __pycache__ folder next to it like for any other module. The first line holds the hash of
+        # the rest, so a file that this program didn't write, or didn't finish writing, is never run.
+        if not cls.enabled:
+            return None
+        file_name: str = cls.file_name(description, algorithm, '.py')
+        try:
+            with open(file_name, 'rb') as f:
+                header: bytes = f.readline()
+                source: bytes = f.read()
+            if header != cls.module_header(source):
+                return None
+            name: str = os.path.basename(file_name)[:-3]
+            spec = importlib.util.spec_from_file_location(name, file_name,
+                                                          loader=cls.CheckedLoader(name, file_name, header + source))
+            module: ModuleType = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            return module
+        except Exception:
+            return None
+
+    @classmethod
+    def save_module(cls, description: str, algorithm: str, source: str) -> None:
+        if not cls.enabled:
+            return
+        file_name: str = cls.file_name(description, algorithm, '.py')
+        try:
+            os.makedirs(cls.folder, exist_ok=True)
+            with open(file_name + '.tmp', 'wb') as f:
+                f.write(cls.module_header(source.encode()) + source.encode())
+            os.replace(file_name + '.tmp', file_name)
+            py_compile.compile(file_name, doraise=True, invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH)
+        except (OSError, py_compile.PyCompileError):
+            pass
+
+    @staticmethod
+    def module_header(source: bytes) -> bytes:
+        return b'# sha256 ' + hashlib.sha256(source).hexdigest().encode() + b'\n'
+
+    @classmethod
+    def clear(cls) -> None:
+        if os.path.isdir(cls.folder):
+            for file_name in os.listdir(cls.folder):
+                if file_name.endswith(('.grc', '.py')):
+                    os.remove(cls.folder + file_name)
+            shutil.rmtree(cls.folder + '__pycache__', ignore_errors=True)
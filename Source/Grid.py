@@ -16,13 +16,27 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+from collections.abc import Iterator
+
 from Tree import Tree
 
 
 class Grid:
+    # The grid is sparse: the cells that hold a node are kept by their coordinates, next to where each node is and the
+    # rightmost taken cell of each row, so nothing has to be searched for. It only ever grows, like a grid of columns
+    # would, and a node placed on a taken cell takes it over.
+    #
+    # Laying out still isn't linear. A nudge moves the whole subtree of each child, and a node centered over its
+    # children can move its parent, and so on up the tree, so trees as deep as the program is long, which left
+    # recursive rules make, take time that grows with the square of their size. The window draws with TreeLayout.
+
     def __init__(self, tree: Tree, compact_tree: bool) -> None:
         self.tree: Tree = tree
-        self.grid: list[list[Tree | None]] = [[self.tree]]
+        self.cells: dict[tuple[int, int], Tree] = {(0, 0): self.tree}
+        self.coords: dict[Tree, tuple[int, int]] = {self.tree: (0, 0)}
+        self.rightmost: list[int] = [0]  # the x of the rightmost node of each row, or -1
+        self.width: int = 1
+        self.height: int = 1
 
         for child in self.tree:
             self.place_tree_on_grid(child, compact_tree)
@@ -30,14 +44,6 @@ class Grid:
         if self.tree.name == '':
             self.nudge_nodes_up()
 
-    @property
-    def width(self) -> int:
-        return len(self.grid)
-
-    @property
-    def height(self) -> int:
-        return len(self.grid[-1])
-
     @staticmethod
     def assert_coords_are_valid(coords: tuple[int, int]) -> None:
         assert coords[0] >= 0
@@ -47,28 +53,32 @@ class Grid:
         return self.get_node(coords) is None
 
     def has_item(self, node: Tree) -> bool:
-        return self.get_coords(node) != (-1, -1)
+        return node in self.coords
 
     def expand(self, new_width: int = 0, new_height: int = 0) -> None:
-        for column in self.grid:
-            column += [None] * (new_height-self.height+1)
-        self.grid += [[None] * self.height] * (new_width-self.width+1)
+        self.width = max(self.width, new_width + 1)
+        if new_height >= self.height:
+            self.rightmost += [-1] * (new_height-self.height+1)
+            self.height = new_height + 1
 
     def place_node(self, coords: tuple[int, int], node: Tree | None) -> None:
         self.assert_coords_are_valid(coords)
         self.expand(coords[0], coords[1])
-        self.grid[coords[0]][coords[1]] = node
+        self.clear_space(coords)
+        if node is not None:
+            self.cells[coords] = node
+            self.coords[node] = coords
+            self.rightmost[coords[1]] = max(self.rightmost[coords[1]], coords[0])
 
     def get_node(self, coords: tuple[int, int]) -> Tree | None:
         self.assert_coords_are_valid(coords)
-        return None if coords[0] >= self.width or coords[1] >= self.height else self.grid[coords[0]][coords[1]]
+        return self.cells.get(coords)
 
     def get_coords(self, node: Tree) -> tuple[int, int]:
-        for x, row in enumerate(self.grid):
-            for y, cell in enumerate(row):
-                if cell is node:
-                    return x, y
-        return -1, -1
+        return self.coords.get(node, (-1, -1))
+
+    def items(self) -> Iterator[tuple[Tree, tuple[int, int]]]:
+        return ((node, coords) for coords, node in sorted(self.cells.items(), key=lambda item: item[0]))
 
     def get_x_coord(self, node: Tree) -> int:
         return self.get_coords(node)[0]
@@ -82,15 +92,20 @@ class Grid:
 
     def clear_space(self, coords: tuple[int, int]) -> None:
         self.assert_coords_are_valid(coords)
-        if coords[0] < self.width and coords[1] < self.height:
-            self.grid[coords[0]][coords[1]] = None
+        node: Tree | None = self.cells.pop(coords, None)
+        if node is None:
+            return
+        if self.coords[node] == coords:
+            del self.coords[node]
+        x, y = coords
+        if self.rightmost[y] == x:
+            x -= 1
+            while x >= 0 and (x, y) not in self.cells:
+                x -= 1
+            self.rightmost[y] = x
 
     def rightmost_mode(self, y: int) -> int:
-        if y < self.height:
-            for x in reversed(range(self.width)):
-                if not self.cell_is_empty((x, y)):
-                    return x
-        return -1
+        return self.rightmost[y] if y < self.height else -1
 
     def placed_children(self, node: Tree) -> int:
         for i, child in enumerate(reversed(node.children)):
@@ -99,35 +114,47 @@ class Grid:
         return 0
 
     def nudge_node_left(self, node: Tree) -> None:
-        for child in node:
-            self.nudge_node_left(child)
-        self.move_node(self.get_coords(node), (self.get_x_coord(node)-1, self.get_y_coord(node)))
+        for moved in node.postorder():
+            self.move_node(self.get_coords(moved), (self.get_x_coord(moved)-1, self.get_y_coord(moved)))
 
     def nudge_nodes_up(self) -> None:
         self.clear_space(self.get_coords(self.tree))
-        for x in range(self.width):
-            for y in range(self.height):
-                if self.get_node((x, y)) is not None:
-                    self.move_node((x, y), (x, y - 1))
+        self.cells = {(x, y - 1): node for (x, y), node in self.cells.items()}
+        self.coords = {node: coords for coords, node in self.cells.items()}
+        self.rightmost = self.rightmost[1:] + [-1]
 
     def place_tree_on_grid(self, node: Tree, compact_tree: bool) -> None:
+        # Each node is placed, then each of its children with its whole subtree, fixing the node after each one. The
+        # stack has the nodes being placed and how many of their children are, so deep trees don't hit the recursion
+        # limit.
+        self.place_node_under_parent(node)
+        stack: list[tuple[Tree, int]] = [(node, 0)]
+        while stack:
+            node, placed = stack.pop()
+            if placed:
+                self.fix_placed_children(node, compact_tree)
+            if placed < len(node):
+                stack.append((node, placed + 1))
+                self.place_node_under_parent(node[placed])
+                stack.append((node[placed], 0))
+
+    def place_node_under_parent(self, node: Tree) -> None:
         self.place_node((
             max(self.rightmost_mode(self.get_y_coord(node.parent)+1)+1, self.get_x_coord(node.parent)),
             self.get_y_coord(node.parent)+1
         ), node)
-        for child in node:
-            self.place_tree_on_grid(child, compact_tree)
 
-            if compact_tree:
-                self.fix_node_x_position(node)
+    def fix_placed_children(self, node: Tree, compact_tree: bool) -> None:
+        if compact_tree:
+            self.fix_node_x_position(node)
 
-            if self.should_nudge_children(node, compact_tree) and  self.can_nudge_children(node):
-                for child_to_nudge in node:
-                    if self.has_item(child_to_nudge):
-                        self.nudge_node_left(child_to_nudge)
+        if self.should_nudge_children(node, compact_tree) and  self.can_nudge_children(node):
+            for child_to_nudge in node:
+                if self.has_item(child_to_nudge):
+                    self.nudge_node_left(child_to_nudge)
 
-            if not compact_tree:
-                self.fix_node_x_position(node)
+        if not compact_tree:
+            self.fix_node_x_position(node)
 
     def should_nudge_children(self, node: Tree, compact_tree: bool) -> bool:
         return (self.placed_children(node) > 1 and
@@ -135,24 +162,27 @@ class Grid:
                  (self.placed_children(node) % 2 == 1 and not compact_tree)))
 
     def can_nudge_children(self, node: Tree) -> bool:
-        for y, x in enumerate(self.leftmost_children(node, [], 0)):
-            if x < 1 or not self.cell_is_empty((x-1, y+1+self.get_y_coord(node))):
+        y: int = self.get_y_coord(node) + 1
+        for x in self.leftmost_children(node):
+            if x < 1 or not self.cell_is_empty((x-1, y)):
                 return False
+            y += 1
         return True
 
-    def leftmost_children(self, node: Tree, curr_list: list[int], level: int) -> list[int]:
-        curr_list += [self.width] * (level-len(curr_list)+1)
-        for child in node:
-            curr_list[level] = min(curr_list[level], self.get_x_coord(child), key=lambda x: self.width if x < 0 else x)
-            self.leftmost_children(child, curr_list, level+1)
-        return curr_list
-
-    def fix_node_x_position(self, node: Tree) -> None:
-        if (self.get_x_coord(node) != self.node_x_position(node) and
-                self.cell_is_empty((self.node_x_position(node), self.get_y_coord(node)))):
+    def leftmost_children(self, node: Tree) -> Iterator[int]:
+        # the leftmost x of the node's descendants on each level under it, or width where none of them are placed, a
+        # level at a time from the top, so can_nudge_children() stops at the first level that's in the way
+        level: list[Tree] = [node]
+        while level:
+            level = [child for parent in level for child in parent]
+            yield min((x for x in map(self.get_x_coord, level) if x >= 0), default=self.width)
+
+    def fix_node_x_position(self, node: Tree | None) -> None:
+        # centers the node over its children, and then its parent if it moved, and so on up the tree
+        while (node is not None and self.get_x_coord(node) != self.node_x_position(node) and
+               self.cell_is_empty((self.node_x_position(node), self.get_y_coord(node)))):
             self.move_node(self.get_coords(node), (self.node_x_position(node), self.get_y_coord(node)))
-            if node.parent is not None:
-                self.fix_node_x_position(node.parent)
+            node = node.parent
 
     def node_x_position(self, node: Tree) -> int:
         return ((self.get_x_coord(node[self.placed_children(node)-1])-self.get_x_coord(node[0])) // 2
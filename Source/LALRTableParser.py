@@ -0,0 +1,113 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+from GrammarAnalysis import GrammarAnalysis
+from LR0Automaton import LR0Automaton
+from SLRTableParser import SLRTableParser
+
+
+class LALRTableParser(SLRTableParser):
+    # Same automaton, table, and stepping as SLR, only the reduce lookaheads are computed with DeRemer and Pennello's
+    # algorithm over the nonterminal transitions (p, A) of the LR(0) automaton:
+    #   Read(p, A)   = terminals shiftable after A from p, plus Read(r, C) for nullable C read right after A
+    #   Follow(p, A) = Read(p, A), plus Follow(p', B) when B ::= x A y with y nullable and p' goes to p on x
+    #   LA(q, A ::= w) = union of Follow(p, A) for every p that goes to q on w
+
+    def lookaheads(self, automaton: LR0Automaton) -> list[dict[tuple[int, int], int]]:
+        analysis: GrammarAnalysis = self.grammar.analysis
+        transitions: list[tuple[int, int]] = self.nonterminal_transitions(automaton)
+        index: dict[tuple[int, int], int] = {transition: i for i, transition in enumerate(transitions)}
+
+        follow: list[int] = GrammarAnalysis.digraph(
+            self.includes(automaton, transitions, index),
+            GrammarAnalysis.digraph(self.reads(automaton, transitions, index), self.direct_reads(automaton, transitions))
+        )
+
+        lookback: dict[tuple[int, int], int] = {}
+        for i, (state, symbol) in enumerate(transitions):
+            for rule in automaton.rules_of[symbol]:
+                end_state: int = self.walk(automaton, state, automaton.right_sides[rule])
+                if end_state >= 0:
+                    lookback[(end_state, rule)] = lookback.get((end_state, rule), 0) | follow[i]
+
+        return [{item: analysis.end_of_input(lookback.get((state, item[0]), 0))
+                 for item in items if automaton.is_complete(item)} for state, items in enumerate(automaton.items)]
+
+    def nonterminal_transitions(self, automaton: LR0Automaton) -> list[tuple[int, int]]:
+        # the start symbol never gets shifted, but reducing it from state 0 still needs a transition to look back to
+        transitions: list[tuple[int, int]] = [(0, 0)]
+        for state, state_transitions in enumerate(automaton.transitions):
+            for symbol in state_transitions:
+                if not self.grammar.symbols.is_terminal(symbol) and (state, symbol) != (0, 0):
+                    transitions.append((state, symbol))
+        return transitions
+
+    def direct_reads(self, automaton: LR0Automaton, transitions: list[tuple[int, int]]) -> list[int]:
+        analysis: GrammarAnalysis = self.grammar.analysis
+        direct_reads: list[int] = [analysis.epsilon]  # the end of input follows the start symbol
+        for state, symbol in transitions[1:]:
+            direct_reads.append(0)
+            for next_symbol in automaton.transitions[automaton.transitions[state][symbol]]:
+                if self.grammar.symbols.is_terminal(next_symbol):
+                    direct_reads[-1] |= analysis.symbol_bit(next_symbol)
+        return direct_reads
+
+    def reads(self, automaton: LR0Automaton, transitions: list[tuple[int, int]],
+              index: dict[tuple[int, int], int]) -> list[list[int]]:
+        reads: list[list[int]] = []
+        for state, symbol in transitions:
+            target: int = automaton.transitions[state].get(symbol, -1)
+            reads.append([] if target < 0 else [
+                index[(target, next_symbol)] for next_symbol in automaton.transitions[target]
+                if not self.grammar.symbols.is_terminal(next_symbol) and self.grammar.analysis.nullable[next_symbol]
+            ])
+        return reads
+
+    def includes(self, automaton: LR0Automaton, transitions: list[tuple[int, int]],
+                 index: dict[tuple[int, int], int]) -> list[list[int]]:
+        includes: list[list[int]] = [[] for _ in transitions]
+        for i, (state, symbol) in enumerate(transitions):
+            for rule in automaton.rules_of[symbol]:
+                right_side: tuple[int, ...] = automaton.right_sides[rule]
+                nullable_suffix: bool = True
+                suffix_starts: list[bool] = [False] * len(right_side)
+                for position in reversed(range(len(right_side))):
+                    suffix_starts[position] = nullable_suffix
+                    nullable_suffix = nullable_suffix and self.symbol_is_nullable(right_side[position])
+
+                current: int = state
+                for position, right_side_symbol in enumerate(right_side):
+                    if suffix_starts[position] and (current, right_side_symbol) in index:
+                        includes[index[(current, right_side_symbol)]].append(i)
+                    current = automaton.transitions[current].get(right_side_symbol, -1)
+                    if current < 0:
+                        break
+        return includes
+
+    def symbol_is_nullable(self, symbol_id: int) -> bool:
+        return not self.grammar.symbols.is_terminal(symbol_id) and self.grammar.analysis.nullable[symbol_id]
+
+    @staticmethod
+    def walk(automaton: LR0Automaton, state: int, right_side: tuple[int, ...]) -> int:
+        for symbol in right_side:
+            state = automaton.transitions[state].get(symbol, -1)
+            if state < 0:
+                break
+        return state
@@ -17,11 +17,15 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 from __future__ import annotations
+from array import array
+from collections.abc import Callable, Iterator
 from enum import IntEnum, auto
 import os
+from typing import IO
 
 import HTML
 from Parser import Parser, LL1Parser
+from TokenStream import TokenStream
 from Tree import Tree
 
 
@@ -29,15 +33,20 @@ class LL1RecursiveDescentParser(Parser, LL1Parser):
     code: list[str]
     parse_stack: list[ParseStackFrame]
     rules: dict[str, list[Rule]]
+    rule_rows: list[dict[int, Rule]]  # by nonterminal id, the rule to use for each lookahead token id
     highlighted_rule: Action
     start_rule: Action
     null_rule: Action
+    compile_parser: bool = False
+    compiled_parser: Callable[..., Callable[[Tree], None]] | None
+    compiled_parsers: dict[str, Callable[..., Callable[[Tree], None]]] = {}  # by grammar description
+    listings: dict[tuple[str, str], tuple[list[str], list[int]]] = {}  # code and action lines by grammar and language
 
     class ParseStackFrame(Parser.BaseParseStackFrame):
-        def __init__(self, node: Tree, rule: LL1RecursiveDescentParser.Rule) -> None:
+        def __init__(self, node: Tree, rule: LL1RecursiveDescentParser.Rule, index: int = 0) -> None:
             super().__init__(node)
             self._rule: LL1RecursiveDescentParser.Rule = rule
-            self._index: int = 0
+            self._index: int = index
 
         def current_action(self) -> LL1RecursiveDescentParser.Action:
             return self._rule[self._index]
@@ -60,15 +69,23 @@ class LL1RecursiveDescentParser(Parser, LL1Parser):
         def increment_index(self) -> None:
             self._index += 1
 
+    class CompiledParseError(Exception):
+        def __init__(self, node: Tree) -> None:
+            super().__init__()
+            self.node: Tree = node  # the ERROR node
+            # the node, nonterminal id and lookahead symbol id of each call it was raised through, innermost first
+            self.frames: list[tuple[Tree, int, int]] = []
+
     class ActionType(IntEnum):
         Descend = auto()
         Match = auto()
         Return = auto()
 
     class Action:
-        def __init__(self, name: str, action: LL1RecursiveDescentParser.ActionType) -> None:
+        def __init__(self, name: str, action: LL1RecursiveDescentParser.ActionType, symbol_id: int = -1) -> None:
             self.name: str = name
             self.action: LL1RecursiveDescentParser.ActionType = action
+            self.symbol_id: int = symbol_id
             self.code_line: int = -1
 
     class Rule:
@@ -90,6 +107,8 @@ class LL1RecursiveDescentParser(Parser, LL1Parser):
 
         def __init__(self, file_name: str) -> None:
             self.name: str = file_name.removesuffix('.la')
+            self.file_name: str = file_name
+            self.loaded: bool = False
 
             self.declare_functions: bool = False
 
@@ -125,7 +144,11 @@ class LL1RecursiveDescentParser(Parser, LL1Parser):
 
             self.program_last_statements: str = ''
 
-            self.get_attributes_from_file(self.language_files_folder + file_name)
+        def load(self) -> None:
+            # the file is only read once the language is first used
+            if not self.loaded:
+                self.get_attributes_from_file(self.language_files_folder + self.file_name)
+                self.loaded = True
 
         def get_attributes_from_file(self, file_name: str) -> None:
             with open(file_name, 'r') as f:
@@ -137,62 +160,84 @@ class LL1RecursiveDescentParser(Parser, LL1Parser):
                 setattr(self, lines[line].split(':')[0], '\n'.join(lines[line + 1:attr_lines[i + 1]]))
 
         def make_code(self, rules: dict[str, list[LL1RecursiveDescentParser.Rule]],
-                      start_rule: LL1RecursiveDescentParser.Action) -> list[str]:
-            code: list[str] = []
+                      start_rule: LL1RecursiveDescentParser.Action,
+                      code_lines: dict[LL1RecursiveDescentParser.Action, int] | None = None) -> list[str]:
+            return list(self.write_code(rules, start_rule, code_lines))
+
+        def write_code(self, rules: dict[str, list[LL1RecursiveDescentParser.Rule]],
+                       start_rule: LL1RecursiveDescentParser.Action,
+                       code_lines: dict[LL1RecursiveDescentParser.Action, int] | None = None) -> Iterator[str]:
+            # The code a line at a time, with the line of each action put in code_lines. The last line of the functions
+            # is held back until the next one comes, since it gets dropped.
+            self.load()
+            held: str | None = None
+            for line in self.write_functions(rules, start_rule, {} if code_lines is None else code_lines):
+                if held is not None:
+                    yield held
+                held = line
+            if self.program_last_statements != '':
+                yield from self.program_last_statements.split('\n')
+
+        def write_functions(self, rules: dict[str, list[LL1RecursiveDescentParser.Rule]],
+                            start_rule: LL1RecursiveDescentParser.Action,
+                            code_lines: dict[LL1RecursiveDescentParser.Action, int]) -> Iterator[str]:
+            line: int = 0  # the number of lines written so far
             rule_counter: int = 1
             if self.program_first_statements != '':
-                code += self.program_first_statements.split('\n')
+                for text in self.program_first_statements.split('\n'):
+                    yield text
+                    line += 1
             if self.declare_functions:
                 for declaration in rules:
-                    code.append(
-                        self.function_declaration_beginning + declaration + self.function_declaration_end)
-                code.append('')
-                code.append('')
-            code += self.first_code.split('\n')
-            code[-1] += (start_rule.name + self.end_of_main.split('\n')[0])
-            start_rule.code_line = len(code) - 1
-            code += self.end_of_main.split('\n')[1:]
+                    yield self.function_declaration_beginning + declaration + self.function_declaration_end
+                yield from ('', '')
+                line += len(rules) + 2
+            first_code: list[str] = self.first_code.split('\n')
+            end_of_main: list[str] = self.end_of_main.split('\n')
+            yield from first_code[:-1]
+            yield first_code[-1] + start_rule.name + end_of_main[0]
+            code_lines[start_rule] = line + len(first_code) - 1
+            yield from end_of_main[1:]
+            line += len(first_code) + len(end_of_main) - 1
 
             for rule_name, rules_ in rules.items():
-                code.append(
-                    self.function_definition_beginning + rule_name + self.function_definition_end +
-                    (self.start_symbol_comment if start_rule.name == rule_name else ''))
-                code.append(self.switch_beginning)
+                yield self.function_definition_beginning + rule_name + self.function_definition_end + \
+                    (self.start_symbol_comment if start_rule.name == rule_name else '')
+                yield self.switch_beginning
+                line += 2
 
                 for rule in rules_:
                     rule_text: list[str] = [production.name for production in rule.actions]
                     rule_text = ['epsilon'] if rule_text == [] else rule_text
-                    code += \
+                    case: list[str] = \
                         (self.case_beginning + self.case_separator.join(rule.tokens) + self.case_end +
                          f"{self.comment_begin}P{rule_counter}: {rule_name} -> "
                          f"{' '.join(rule_text)}{self.comment_end}").split('\n')
+                    yield from case
+                    line += len(case)
                     rule_counter += 1
                     for i, production in enumerate(rule.actions):
-                        production.code_line = i + len(code)
+                        code_lines[production] = i + line
 
-                    steps_text: str = ''
-                    for production in rule.actions[:-1]:
-                        steps_text += ((self.call_function_beginning + production.name + self.call_function_end
+                    steps: list[str] = [self.call_function_beginning + production.name + self.call_function_end
                                         if production.action == LL1RecursiveDescentParser.ActionType.Descend else
-                                        self.call_match_beginning + production.name + self.call_match_end) + '\n')
-                    steps_text = (self.skip_case + '\n') if steps_text == '' else steps_text
-
-                    code += steps_text.split('\n')[:-1]
+                                        self.call_match_beginning + production.name + self.call_match_end
+                                        for production in rule.actions[:-1]] or [self.skip_case]
+                    steps = '\n'.join(steps).split('\n')
                     if self.end_of_case != '':
-                        code += self.end_of_case.split('\n')
+                        steps += self.end_of_case.split('\n')
+                    yield from steps
+                    line += len(steps)
 
-                code += self.switch_default.split('\n')
-                return_line: int = len(code)
+                switch_default: list[str] = self.switch_default.split('\n')
+                yield from switch_default
+                line += len(switch_default)
                 for rule in rules_:
-                    rule.actions[-1].code_line = return_line
-
-                code += self.function_last_lines.split('\n')
-            code.pop()
-
-            if self.program_last_statements != '':
-                code += self.program_last_statements.split('\n')
+                    code_lines[rule.actions[-1]] = line
 
-            return code
+                function_last_lines: list[str] = self.function_last_lines.split('\n')
+                yield from function_last_lines
+                line += len(function_last_lines)
 
         @classmethod
         def make_languages_list(cls) -> list[LL1RecursiveDescentParser.Language]:
@@ -205,9 +250,14 @@ class LL1RecursiveDescentParser(Parser, LL1Parser):
 
     def __init__(self) -> None:
         self.rules = {}
+        self.rule_rows = []
+        self.conflicts = []
+        self.compiled_parser = None
         self.highlighted_rule = self.null_rule = self.Action('', self.ActionType.Return)
         self.start_rule = self.Action('', self.ActionType.Return)
         self.languages: list[LL1RecursiveDescentParser.Language] = self.Language.make_languages_list()
+        self.token_stream = TokenStream([])
+        self.forget_subtrees()
         self.reset()
 
     def code_box_text(self) -> str:
@@ -220,22 +270,47 @@ class LL1RecursiveDescentParser(Parser, LL1Parser):
         return ' '.join(map(lambda x: x.node.name, self.parse_stack))
 
     def generate_rules(self) -> None:
+        self.make_rules(self.generate_predict_sets())
+
+    def compile_rules(self) -> dict[str, object]:
+        return {'predict_sets': [rule.tokens for rule in self.rules_in_grammar_order()], 'conflicts': self.conflicts}
+
+    def load_rules(self, compiled: dict[str, object]) -> None:
+        self.conflicts = compiled['conflicts']
+        self.make_rules(compiled['predict_sets'])
+
+    def rules_in_grammar_order(self) -> list[Rule]:
+        positions: dict[str, int] = dict.fromkeys(self.rules, 0)
+        rules: list[LL1RecursiveDescentParser.Rule] = []
+        for rule in self.grammar.rules:
+            rules.append(self.rules[rule.name][positions[rule.name]])
+            positions[rule.name] += 1
+        return rules
+
+    def make_rules(self, predict_sets: list[list[str]]) -> None:
         self.start_rule.name = self.grammar.rules[0].name
-        self.rules = dict.fromkeys(self.grammar.rule_names_list)
-        for entry in self.rules:
-            self.rules[entry] = []
+        self.start_rule.symbol_id = self.grammar.rules[0].symbol_id
+        self.rules = {name: [] for name in self.grammar.rule_names_list}
+        self.rule_rows = [{} for _ in self.grammar.symbols.nonterminals]
+        terminal_ids: dict[str, int] = self.grammar.symbols.terminal_ids
 
-        for rule, predict_set in zip(self.grammar.rules, self.generate_predict_sets()):
+        for rule, predict_set in zip(self.grammar.rules, predict_sets):
             actions = []
             for production in rule.productions:
                 if production.name != '':
                     actions.append(self.Action(
-                        production.name, self.ActionType.Match if production.terminal else self.ActionType.Descend
+                        production.name, self.ActionType.Match if production.terminal else self.ActionType.Descend,
+                        production.symbol_id
                     ))
             actions.append(self.Action('', self.ActionType.Return))
             self.rules[rule.name].append(self.Rule(predict_set, actions))
+            for token in predict_set:
+                # the predict sets don't overlap, see generate_predict_sets(), a token without a rule is a parse error
+                if token in terminal_ids:
+                    self.rule_rows[rule.symbol_id][terminal_ids[token]] = self.rules[rule.name][-1]
 
         self.make_code()
+        self.compiled_parser = None
         return
 
     def step(self) -> None:
@@ -253,22 +328,227 @@ class LL1RecursiveDescentParser(Parser, LL1Parser):
         else:
             self.finish_parse_with_error()
 
+    def parse_all(self) -> Tree:
+        # the moves of step() without highlighting the lines of the generated code
+        if self.compile_parser and not self.parse_stack:
+            return self.parse_compiled()
+        descend, match, return_ = self.ActionType
+        stream: TokenStream = self.token_stream
+        parse_stack: list[LL1RecursiveDescentParser.ParseStackFrame] = self.parse_stack
+        if not self.finished_parsing and not parse_stack and self.should_start_or_finish():
+            self.tree = self.current_node = self.new_tree(self.start_rule.name)
+            parse_stack.append(self.ParseStackFrame(self.tree, self.next_rule()))
+        if parse_stack:
+            with self.gc_paused():
+                self.descend_all()
+        while not self.finished_parsing:
+            if not parse_stack:
+                if self.should_start_or_finish():
+                    self.tree = self.current_node = self.new_tree(self.start_rule.name)
+                    parse_stack.append(self.ParseStackFrame(self.tree, self.next_rule()))
+                else:
+                    self.finish_parse()
+                continue
+            frame: LL1RecursiveDescentParser.ParseStackFrame = parse_stack[-1]
+            if frame.rule_not_found():
+                self.finish_parse_with_error()
+                continue
+            action: LL1RecursiveDescentParser.Action = frame.current_action()
+            if action.action == descend:
+                self.current_node = frame.node.add_child(action.name)
+                parse_stack.append(self.ParseStackFrame(self.current_node, self.next_rule()))
+            elif action.action == match and stream.peek().symbol_id == action.symbol_id:
+                self.current_node = frame.node.add_child(stream.advance().image)
+                frame.increment_index()
+            elif action.action == return_:
+                self.current_node = frame.node
+                parse_stack.pop()
+                if parse_stack:
+                    parse_stack[-1].increment_index()
+            else:
+                self.finish_parse_with_error()
+        return self.parse_result()
+
+    def descend_all(self) -> None:
+        # The parse without frames or Token objects: the stack is kept as lists of nodes, rules, and action indexes,
+        # and the lookahead is read straight out of the columns of the token stream. It stops where the next move needs
+        # more than that, a missing rule, a token that doesn't fit, or the end of the tokens, and leaves the stack in
+        # frames for parse_all() to take the move as step() would.
+        descend, match = self.ActionType.Descend, self.ActionType.Match
+        stream: TokenStream = self.token_stream
+        rule_rows: list[dict[int, LL1RecursiveDescentParser.Rule]] = self.rule_rows
+        new_node: Callable[..., Tree] = self.node_type()
+        nodes: list[Tree] = []
+        rules: list[LL1RecursiveDescentParser.Rule | None] = []
+        indexes: list[int] = []
+        for frame in self.parse_stack:
+            if not frame.node.changed:
+                frame.node.mark_changed()  # laid out since it was pushed, it gets children without add_child()
+            nodes.append(frame.node)
+            rules.append(frame._rule)
+            indexes.append(frame._index)
+
+        node: Tree = self.current_node
+        texts: list[str | None] = stream.texts
+        token_starts: array[int] = stream.starts
+        token_ends: array[int] = stream.ends
+        code: str | None = stream.code
+        length: int = len(code) if code is not None else 0
+        symbol_ids: array[int] = stream.symbol_ids
+        base: int = stream.start  # the position of the token at index 0 of the columns
+        gap: int = stream.gap
+        index: int = stream.position - base
+        while nodes:
+            rule: LL1RecursiveDescentParser.Rule | None = rules[-1]
+            if rule is None:
+                break
+            action: LL1RecursiveDescentParser.Action = rule.actions[indexes[-1]]
+            if action.action != descend and action.action != match:
+                node = nodes.pop()
+                rules.pop()
+                indexes.pop()
+                if indexes:
+                    indexes[-1] += 1
+                continue
+            if index >= len(symbol_ids):
+                stream.position = base + index
+                if not stream.keep_read:
+                    stream.forget_read()
+                stream.read(4096)
+                base, gap = stream.start, stream.gap
+                index = stream.position - base
+                if index >= len(symbol_ids):
+                    break
+            if action.action == descend:
+                node = new_node(action.name, nodes[-1])
+                nodes[-1].children.append(node)
+                nodes.append(node)
+                rules.append(rule_rows[action.symbol_id].get(symbol_ids[index]))
+                indexes.append(0)
+            elif action.symbol_id == symbol_ids[index]:
+                if texts[index] is not None:
+                    name: str = stream.image(index)
+                elif index >= gap:
+                    name = code[token_starts[index] + length:token_ends[index] + length]
+                else:
+                    name = code[token_starts[index]:token_ends[index]]
+                node = new_node(name, nodes[-1])
+                nodes[-1].children.append(node)
+                indexes[-1] += 1
+                index += 1
+            else:
+                break
+
+        self.parse_stack[:] = [self.ParseStackFrame(frame_node, rule, action_index)
+                               for frame_node, rule, action_index in zip(nodes, rules, indexes)]
+        self.current_node = node
+        stream.position = base + index
+        if not stream.keep_read:
+            stream.forget_read()
+
+    def parse_compiled(self) -> Tree:
+        # Runs the parser from make_python_parser(), which builds the same tree as stepping. Like stepping, the start
+        # symbol is parsed again with a new tree as long as tokens are left over.
+        if self.compiled_parser is None:
+            self.compiled_parser = self.compile_python_parser()
+        while not self.finished_parsing:
+            if not self.should_start_or_finish():
+                self.finish_parse()
+                break
+            self.tree = self.new_tree(self.start_rule.name)
+            parse: Callable[[Tree], None] = self.compiled_parser(
+                self.token_stream.peek, self.token_stream.advance, self.node_type(), self.CompiledParseError)
+            try:
+                parse(self.tree)
+            except self.CompiledParseError as error:
+                # the calls that were open are the frames stepping would have left on the stack, each one past the
+                # child it was working on
+                self.parse_stack = [self.ParseStackFrame(node, self.rule_rows[nonterminal].get(symbol),
+                                                         len(node.children) - 1)
+                                    for node, nonterminal, symbol in reversed(error.frames)]
+                self.current_node = error.node
+                self.finished_parsing = True
+                self.parse_error = True
+        return self.parse_result()
+
+    def compile_python_parser(self) -> Callable[..., Callable[[Tree], None]]:
+        description: str = self.grammar.description
+        if description not in self.compiled_parsers:
+            namespace: dict[str, object] = {}
+            exec(compile(self.make_python_parser(), f"<{self.start_rule.name} parser>", 'exec'), namespace)
+            self.compiled_parsers[description] = namespace['make_parser']
+        return self.compiled_parsers[description]
+
+    def make_python_parser(self) -> str:
+        # A runnable version of the Python code in the code box: one function per nonterminal that picks the rule by
+        # the symbol id of the next token, matches tokens against the token cursor, and adds the nodes to the tree as
+        # it goes. A rule that ends by calling its own function loops instead, so long lists don't recurse. A parse
+        # error records the open calls on its way out, a looping function one for each time it went around.
+        functions: dict[str, str] = {name: f"parse_{i}" for i, name in enumerate(self.rules)}
+        nonterminal_ids: dict[str, int] = {rule.name: rule.symbol_id for rule in self.grammar.rules}
+        terminal_ids: dict[str, int] = self.grammar.symbols.terminal_ids
+        code: list[str] = [
+            'def make_parser(peek, advance, Tree, ParseError):',
+            '    def error(node):',
+            "        raise ParseError(node.add_child('ERROR'))",
+            '',
+        ]
+        for name, rules in self.rules.items():
+            tail_calls: list[bool] = [len(rule) > 1 and rule[-2].action == self.ActionType.Descend and
+                                      rule[-2].name == name for rule in rules]
+            loops: bool = any(tail_calls)
+            indent: str = ' ' * (16 if loops else 12)
+            code.append(f"    def {functions[name]}(node):  # <{name}>")
+            if loops:
+                code.append('        symbols = []')
+            code.append('        try:')
+            if loops:
+                code.append('            while True:')
+            code += [indent + 'token = peek()', indent + 'symbol = -1 if token is None else token.symbol_id']
+            if loops:
+                code.append(indent + 'symbols.append(symbol)')
+            for rule, tail_call in zip(rules, tail_calls):
+                symbol_ids: list[int] = sorted(terminal_ids[token] for token in rule.tokens if token in terminal_ids)
+                code.append(indent + f"if symbol in {{{', '.join(map(str, symbol_ids))}}}:" if symbol_ids else
+                            indent + 'if False:')
+                for i, action in enumerate(rule.actions[:-1]):
+                    if action.action == self.ActionType.Match:
+                        code += [indent + '    token = peek()',
+                                 indent + f"    if token is None or token.symbol_id != {action.symbol_id}:",
+                                 indent + '        error(node)',
+                                 indent + '    node.children.append(Tree(advance().image, node))']
+                    else:
+                        code += [indent + f"    child = Tree({action.name!r}, node)",
+                                 indent + '    node.children.append(child)']
+                        code.append(indent + ('    node = child' if tail_call and i == len(rule) - 2 else
+                                              f"    {functions[action.name]}(child)"))
+                code.append(indent + ('    continue' if tail_call else '    return'))
+            code += [indent + 'error(node)', '        except ParseError as parse_error:']
+            if loops:
+                code += ['            for symbol in reversed(symbols):',
+                         f"                parse_error.frames.append((node, {nonterminal_ids[name]}, symbol))",
+                         '                node = node.parent']
+            else:
+                code.append(f"            parse_error.frames.append((node, {nonterminal_ids[name]}, symbol))")
+            code += ['            raise', '']
+        code.append(f"    return {functions[self.start_rule.name]}")
+        return '\n'.join(code) + '\n'
+
     def reset(self) -> None:
         self.reset_parser_attributes()
         self.remove_highlight()
 
     def should_start_or_finish(self) -> bool:
         # if token stream is empty finish since there is nothing left to parse, if not start
-        return bool(self.token_stream)
+        return self.token_stream.peek() is not None
 
-    def next_rule(self) -> Rule:
-        return next(filter(
-            lambda rule: self.token_stream[0].name in rule,
-            self.rules[self.parse_stack[-1].current_action().name if self.parse_stack else self.start_rule.name]
-        ), None)
+    def next_rule(self) -> Rule | None:
+        nonterminal: int = self.parse_stack[-1].current_action().symbol_id if self.parse_stack else \
+            self.start_rule.symbol_id
+        return self.rule_rows[nonterminal].get(self.token_stream.peek().symbol_id)
 
     def start_parse(self) -> None:
-        self.tree = self.current_node = Tree(self.start_rule.name)
+        self.tree = self.current_node = self.new_tree(self.start_rule.name)
         self.highlight_line(self.start_rule)
         self.parse_stack.append(self.ParseStackFrame(self.tree, self.next_rule()))
 
@@ -278,8 +558,8 @@ class LL1RecursiveDescentParser(Parser, LL1Parser):
         self.parse_stack.append(self.ParseStackFrame(self.current_node, self.next_rule()))
 
     def match_token(self) -> None:
-        if self.token_stream[0].name == self.parse_stack[-1].current_action().name:
-            self.current_node = self.parse_stack[-1].node.add_child(self.token_stream.pop(0).image)
+        if self.token_stream.peek().symbol_id == self.parse_stack[-1].current_action().symbol_id:
+            self.current_node = self.parse_stack[-1].node.add_child(self.token_stream.advance().image)
             self.highlight_line(self.parse_stack[-1].current_action())
             self.parse_stack[-1].increment_index()
         else:
@@ -302,7 +582,27 @@ class LL1RecursiveDescentParser(Parser, LL1Parser):
         self.finished_parsing = True
 
     def make_code(self, language_index: int = 0) -> None:  # pseudocode is the default option
-        self.code = self.languages[language_index].make_code(self.rules, self.start_rule)
+        # the code for a grammar and language is only written once, after that its lines are given back to the actions
+        language: LL1RecursiveDescentParser.Language = self.languages[language_index]
+        key: tuple[str, str] = (self.grammar.description, language.name)
+        if key not in self.listings:
+            code_lines: dict[LL1RecursiveDescentParser.Action, int] = {}
+            code: list[str] = language.make_code(self.rules, self.start_rule, code_lines)
+            self.listings[key] = code, [code_lines[action] for action in self.actions_in_code_order()]
+        self.code, lines = self.listings[key]
+        for action, line in zip(self.actions_in_code_order(), lines):
+            action.code_line = line
+
+    def actions_in_code_order(self) -> Iterator[Action]:
+        yield self.start_rule
+        for rules in self.rules.values():
+            for rule in rules:
+                yield from rule.actions
+
+    def export_code(self, file: IO[str], language_index: int = 0) -> None:
+        # written a line at a time, without keeping the code of the language around
+        for line in self.languages[language_index].write_code(self.rules, self.start_rule):
+            file.write(line + '\n')
 
     def highlight_line(self, action: Action) -> None:
         self.highlighted_rule = action
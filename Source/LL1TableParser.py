@@ -17,39 +17,54 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 from __future__ import annotations
-from collections.abc import Iterable
+from array import array
+from collections.abc import Callable, Iterable
 import itertools
 
+from ParseTable import ParseTable
 from Parser import Parser, UsesTable, WritesGrammar, LL1Parser
+from TokenStream import TokenStream
 from Tree import Tree
 
 
 class LL1TableParser(Parser, UsesTable, WritesGrammar, LL1Parser):
     parse_stack: list[ParseStackFrame]
     productions_list: list[list[Rule]]
+    open_nodes: list[tuple[Tree, int, int, int, int]]  # node, first token, stack depth, nonterminal, first record
+    expansions: dict[int, tuple[tuple[str, ...], tuple[int, ...]]]  # see make_expansions()
+    stack_rules: dict[int, Rule]  # the rule of every symbol that can be on the stack, by symbol id
+    compress_table: bool = False
+    reuse_subtrees: bool = True  # edits to the code are parsed again incrementally
 
     class ParseStackFrame(Parser.BaseParseStackFrame):
         def __init__(self, node: Tree, rule: LL1TableParser.Rule) -> None:
             super().__init__(node)
             self.terminal: bool = rule.terminal
             self.rule: str = rule.name
+            self.symbol_id: int = rule.symbol_id
 
     class Rule:
-        def __init__(self, terminal: bool, name: str) -> None:
+        def __init__(self, terminal: bool, name: str, symbol_id: int) -> None:
             self.terminal: bool = terminal
             self.name: str = name
+            self.symbol_id: int = symbol_id
 
     def __init__(self) -> None:
+        self.token_stream = TokenStream([])
+        self.forget_subtrees()
         self.reset()
         self.rule_list: list[str] = []
         self.token_list: list[str] = []
-        self.table: list[list[int]] = []
+        self.table: ParseTable = ParseTable(0, 0)
+        self.expansions = {}
+        self.stack_rules = {}
+        self.conflicts = []
 
     def table_height(self) -> int:
-        return len(self.table)
+        return self.table.height
 
     def table_width(self) -> int:
-        return len(self.table[0])
+        return self.table.width
 
     def get_table_top_row(self) -> Iterable[str]:
         return self.token_list
@@ -58,7 +73,7 @@ class LL1TableParser(Parser, UsesTable, WritesGrammar, LL1Parser):
         return self.rule_list
 
     def get_table_body(self) -> Iterable[Iterable[str]]:
-        return [['' if i < 0 else str(i) for i in row] for row in self.table]
+        return (['' if i < 0 else str(i) for i in row] for row in self.table.rows())
 
     def code_box_text(self) -> str:
         return self.grammar_to_numbered_list()
@@ -70,20 +85,56 @@ class LL1TableParser(Parser, UsesTable, WritesGrammar, LL1Parser):
         return ' '.join(map(lambda x: x.node.name, self.parse_stack))
 
     def generate_rules(self) -> None:
-        self.rule_list = self.grammar.rule_names_list
-        self.token_list = self.grammar.tokens_list
-        self.table = []
-        for _ in self.rule_list:
-            self.table.append([-1] * len(self.token_list))
-        self.productions_list = [[self.Rule(False, self.rule_list[0])]]
+        self.make_productions()
+        self.table = ParseTable(len(self.rule_list), len(self.token_list))
+        symbols = self.grammar.symbols
         for i, rule, predict_set in zip(itertools.count(1), self.grammar.rules, self.generate_predict_sets()):
             for token in predict_set:
-                self.table[self.rule_list.index(rule.name)][self.token_list.index(token)] = i
+                self.table.set(rule.symbol_id, symbols.terminal_index(symbols.terminal_ids[token]), i)
+        if self.compress_table:
+            self.table.compress()
+        self.make_expansions()
+
+    def cache_name(self) -> str:
+        return super().cache_name() + ('-compressed' if self.compress_table else '')
+
+    def compile_rules(self) -> dict[str, object]:
+        return {'table': self.table, 'conflicts': self.conflicts}
+
+    def load_rules(self, compiled: dict[str, object]) -> None:
+        self.make_productions()
+        self.table = compiled['table']
+        self.conflicts = compiled['conflicts']
+        self.make_expansions()
+
+    def make_productions(self) -> None:
+        self.rule_list = self.grammar.rule_names_list
+        self.token_list = self.grammar.tokens_list
+        symbols = self.grammar.symbols
+        self.productions_list = [[self.Rule(False, self.rule_list[0], symbols.nonterminal_ids[self.rule_list[0]])]]
+        for rule in self.grammar.rules:
             self.productions_list.append(
                 [] if rule.productions[0].name == '' else
-                [self.Rule(production.terminal, production.name) for production in rule.productions]
+                [self.Rule(production.terminal, production.name, production.symbol_id)
+                 for production in rule.productions]
             )
 
+    def make_expansions(self) -> None:
+        # The table cells parse_all() reads, keyed by nonterminal * key width + lookahead symbol id so a cell is one
+        # dict lookup. The width leaves a gap after the symbols, which is where unknown tokens (id -1) land. Each cell
+        # has the names of the children the rule adds, and the symbol ids it pushes, last child first.
+        key_width: int = len(self.grammar.symbols) + 1
+        first_terminal: int = len(self.grammar.symbols.nonterminals)
+        self.expansions = {}
+        self.stack_rules = {rule.symbol_id: rule for rules in self.productions_list for rule in rules}
+        for row in range(self.table.height):
+            for col, rule in enumerate(self.table.row(row)):
+                if rule >= 0:
+                    productions: list[LL1TableParser.Rule] = self.productions_list[rule]
+                    self.expansions[row * key_width + first_terminal + col] = (
+                        tuple(production.name for production in productions),
+                        tuple(production.symbol_id for production in reversed(productions)))
+
     def step(self) -> None:
         self.reset_highlighted_line()
         if not self.parse_stack:
@@ -91,41 +142,179 @@ class LL1TableParser(Parser, UsesTable, WritesGrammar, LL1Parser):
         else:
             current_frame: LL1TableParser.ParseStackFrame = self.parse_stack.pop()
             self.current_node = current_frame.node
-            self.match_token(current_frame.rule) if current_frame.terminal else self.non_terminal(current_frame.rule)
+            self.match_token(current_frame.symbol_id) if current_frame.terminal else \
+                self.non_terminal(current_frame.symbol_id)
+            if self.open_nodes and not self.parse_error:
+                self.record_finished_nodes()
+
+    def parse_all(self) -> Tree:
+        # the moves of step(), match_token(), and non_terminal() without any highlighting
+        first_terminal: int = len(self.grammar.symbols.nonterminals)
+        stream: TokenStream = self.token_stream
+        parse_stack: list[LL1TableParser.ParseStackFrame] = self.parse_stack
+        if not self.finished_parsing and not parse_stack and self.should_start_or_finish():
+            self.start_parse()
+        if parse_stack and not self.reusable:
+            with self.gc_paused():
+                self.predict_all()
+        while not self.finished_parsing:
+            if not parse_stack:
+                self.start_parse() if self.should_start_or_finish() else self.finish_parse()
+                continue
+            frame: LL1TableParser.ParseStackFrame = parse_stack.pop()
+            self.current_node = frame.node
+            symbol_id: int = stream.peek().symbol_id
+            if frame.terminal:
+                if symbol_id == frame.symbol_id:
+                    frame.node.name = stream.advance().image
+                else:
+                    self.finish_parse_with_error(frame.node)
+            elif not self.reusable or not self.reuse_subtree(frame.symbol_id):
+                rule: int = self.table.get(frame.symbol_id, symbol_id - first_terminal) \
+                    if symbol_id >= first_terminal else -1
+                if rule >= 0:
+                    if self.reuse_subtrees:
+                        self.open_nodes.append(
+                            (frame.node, stream.position, len(parse_stack), frame.symbol_id, len(self.records)))
+                    self.push_rules_to_stack(self.productions_list[rule])
+                else:
+                    self.finish_parse_with_error(frame.node.add_child(''))
+            if self.open_nodes and not self.parse_error:
+                self.record_finished_nodes()
+        return self.parse_result()
+
+    def predict_all(self) -> None:
+        # The parse without frames or Token objects: the stack is kept as a list of nodes and a list of symbol ids,
+        # the lookahead is read straight out of the columns of the token stream, and a nonterminal is expanded with one
+        # lookup in expansions. It stops where the next move needs more than that, a token that doesn't fit or the end
+        # of the tokens, and leaves the stack in frames for parse_all() to take the move as step() would.
+        stream: TokenStream = self.token_stream
+        first_terminal: int = len(self.grammar.symbols.nonterminals)
+        key_width: int = len(self.grammar.symbols) + 1
+        expansions: dict[int, tuple[tuple[str, ...], tuple[int, ...]]] = self.expansions
+        recording: bool = self.reuse_subtrees
+        open_nodes: list[tuple[Tree, int, int, int, int]] = self.open_nodes
+        # the open nodes it finishes, and where they end, added to self.records in one batch at the end
+        recorded: int = len(self.records)
+        finished: list[tuple[Tree, int, int, int, int]] = []
+        ends: list[int] = []
+        finish_depth: int = open_nodes[-1][2] if open_nodes else -1  # the stack depth the last open node finishes at
+        new_node: Callable[..., Tree] = self.node_type()
+        nodes: list[Tree] = []
+        symbols: list[int] = []
+        for frame in self.parse_stack:
+            if not frame.node.changed:
+                frame.node.mark_changed()  # laid out since it was pushed, it gets children without add_child()
+            nodes.append(frame.node)
+            symbols.append(frame.symbol_id)
+
+        node: Tree = self.current_node
+        symbol_id: int = -1
+        texts: list[str | None] = stream.texts
+        token_starts: array[int] = stream.starts
+        token_ends: array[int] = stream.ends
+        code: str | None = stream.code
+        length: int = len(code) if code is not None else 0
+        base: int = stream.start  # the position of the token at index 0 of the columns
+        gap: int = stream.gap
+        index: int = stream.position - base
+        symbol_ids: array[int] = stream.symbol_ids
+        pop_node = nodes.pop
+        pop_symbol = symbols.pop
+        while nodes:
+            if index >= len(symbol_ids):
+                stream.position = base + index
+                if not stream.keep_read:
+                    stream.forget_read()
+                stream.read(4096)
+                base, gap = stream.start, stream.gap
+                index = stream.position - base
+                if index >= len(symbol_ids):
+                    break
+            node = pop_node()
+            symbol_id = pop_symbol()
+            if symbol_id >= first_terminal:
+                if symbol_id != symbol_ids[index]:
+                    break
+                if texts[index] is not None:
+                    node.name = stream.image(index)
+                elif index >= gap:
+                    node.name = code[token_starts[index] + length:token_ends[index] + length]
+                else:
+                    node.name = code[token_starts[index]:token_ends[index]]
+                index += 1
+            else:
+                expansion: tuple[tuple[str, ...], tuple[int, ...]] | None = \
+                    expansions.get(symbol_id * key_width + symbol_ids[index])
+                if expansion is None:
+                    break
+                if recording:
+                    finish_depth = len(nodes)
+                    open_nodes.append((node, base + index, finish_depth, symbol_id, recorded))
+                children: list[Tree] = [new_node(name, node) for name in expansion[0]]
+                node.children = children
+                nodes += reversed(children)
+                symbols += expansion[1]
+            symbol_id = -1
+            while len(nodes) <= finish_depth:
+                finished.append(open_nodes.pop())
+                ends.append(base + index)
+                recorded += 1
+                finish_depth = open_nodes[-1][2] if open_nodes else -1
+
+        if finished:
+            finished_nodes, starts, _, keys, firsts = zip(*finished)
+            self.records.add_all(finished_nodes, starts, ends, keys, firsts)
+        if symbol_id >= 0:
+            nodes.append(node)  # the move that stopped the loop, taken again by parse_all()
+            symbols.append(symbol_id)
+        rules: dict[int, LL1TableParser.Rule] = self.stack_rules
+        self.parse_stack[:] = [self.ParseStackFrame(frame_node, rules[frame_symbol_id])
+                               for frame_node, frame_symbol_id in zip(nodes, symbols)]
+        self.current_node = node
+        stream.position = base + index
+        if not stream.keep_read:
+            stream.forget_read()
 
     def reset(self) -> None:
         self.reset_parser_attributes()
         self.reset_table_highlights()
         self.reset_highlighted_line()
+        self.open_nodes = []
 
     def should_start_or_finish(self) -> bool:
         # if token stream is empty finish since there is nothing left to parse, if not start
-        return bool(self.token_stream)
+        return self.token_stream.peek() is not None
 
-    def next_row(self, rule: str) -> int:
-        return self.rule_list.index(rule)
+    def next_row(self, rule: int) -> int:
+        return rule
 
     def next_col(self) -> int:
-        return self.token_list.index(self.token_stream[0].name)
+        return self.grammar.symbols.terminal_index(self.token_stream.peek().symbol_id)
 
-    def next_rule_index(self, rule: str) -> int:
-        return self.table[self.next_row(rule)][self.next_col()]
+    def next_rule_index(self, rule: int) -> int:
+        return self.table.get(self.next_row(rule), self.next_col()) if self.next_col() >= 0 else -1
 
     def start_parse(self) -> None:
-        self.tree = self.current_node = Tree(self.productions_list[0][0].name)
+        self.tree = self.current_node = self.new_tree(self.productions_list[0][0].name)
         self.parse_stack.append(self.ParseStackFrame(self.tree, self.productions_list[0][0]))
 
-    def match_token(self, rule: str) -> None:
+    def match_token(self, rule: int) -> None:
         self.unhighlight_table()
-        if rule == self.token_stream[0].name:
-            self.current_node.name = self.token_stream.pop(0).image
+        if rule == self.token_stream.peek().symbol_id:
+            self.current_node.name = self.token_stream.advance().image
         else:
             self.finish_parse_with_error(self.current_node)
 
-    def non_terminal(self, rule: str) -> None:
+    def non_terminal(self, rule: int) -> None:
+        if self.reusable and self.reuse_subtree(rule):
+            return
         self.highlight_row(self.next_row(rule))
         self.highlight_col(self.next_col())
         if self.next_rule_index(rule) >= 0:
+            if self.reuse_subtrees:
+                self.open_nodes.append(
+                    (self.current_node, self.token_stream.position, len(self.parse_stack), rule, len(self.records)))
             self.push_rules_to_stack(self.productions_list[self.next_rule_index(rule)])
             self.set_scroll_bar_to_line(self.next_rule_index(rule))
             self.set_highlighted_line(self.next_rule_index(rule))
@@ -136,6 +325,29 @@ class LL1TableParser(Parser, UsesTable, WritesGrammar, LL1Parser):
         for rule in reversed(rules):
             self.parse_stack.append(self.ParseStackFrame(self.current_node.add_child(rule.name, 0), rule))
 
+    def record_finished_nodes(self) -> None:
+        # a node is finished once the stack is back down to where it was before the node's rule was pushed
+        while self.open_nodes and len(self.parse_stack) <= self.open_nodes[-1][2]:
+            node, start, _, rule, first = self.open_nodes.pop()
+            self.records.add(node, start, self.token_stream.position, rule, first)
+
+    def reuse_subtree(self, rule: int) -> bool:
+        # The expansion of a nonterminal only depends on the tokens it reads, so a node from the last parse for the
+        # same nonterminal that starts here, and whose tokens and lookahead are all unchanged, replaces this one.
+        reused: tuple[int, int] | None = self.reused_records.reusable(
+            self.token_stream.position, rule, self.reused_change)
+        if reused is None:
+            return False
+        record, shift = reused
+        node: Tree = self.reused_records.nodes[record]
+        if self.current_node.parent is None:
+            self.tree = node
+        self.current_node.replace_with(node)
+        self.current_node = node
+        self.token_stream.skip(self.reused_records.ends[record] + shift - self.token_stream.position)
+        self.records.copy_subtree(self.reused_records, record, shift)
+        return True
+
     def finish_parse_with_error(self, error_node: Tree) -> None:
         error_node.name = "ERROR"
         self.current_node = error_node
@@ -0,0 +1,112 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+from Grammar import Grammar
+
+
+class LR0Automaton:  # items are (index of the rule in grammar.rules, position of the dot) pairs
+    def __init__(self, grammar: Grammar) -> None:
+        self.grammar: Grammar = grammar
+        self.symbols: Grammar.SymbolTable = grammar.symbols
+        self.left_sides: list[int] = [rule.symbol_id for rule in grammar.rules]
+        self.right_sides: list[tuple[int, ...]] = [
+            tuple(production.symbol_id for production in rule.productions if production.name != '')
+            for rule in grammar.rules
+        ]
+        self.rules_of: list[list[int]] = [[] for _ in self.symbols.nonterminals]
+        for i, left_side in enumerate(self.left_sides):
+            self.rules_of[left_side].append(i)
+        self.left_corners: list[list[int]] = self.find_left_corners()
+
+        self.kernels: list[frozenset[tuple[int, int]]] = []
+        self.state_ids: dict[frozenset[tuple[int, int]], int] = {}
+        self.items: list[list[tuple[int, int]]] = []
+        self.transitions: list[dict[int, int]] = []
+        self.build()
+
+    def __len__(self) -> int:
+        return len(self.kernels)
+
+    def next_symbol(self, item: tuple[int, int]) -> int:
+        right_side: tuple[int, ...] = self.right_sides[item[0]]
+        return right_side[item[1]] if item[1] < len(right_side) else -1
+
+    def is_complete(self, item: tuple[int, int]) -> bool:
+        return item[1] >= len(self.right_sides[item[0]])
+
+    def make_formatted_str(self, item: tuple[int, int]) -> str:
+        rule: Grammar.Rule = self.grammar.rules[item[0]]
+        productions: list[str] = [str(production) for production in rule.productions if production.name != '']
+        productions.insert(item[1], '•')
+        return '<' + rule.name + '> ::= ' + ' '.join(productions)
+
+    def find_left_corners(self) -> list[list[int]]:
+        # every nonterminal whose rules get added to a closure when the dot is in front of the given nonterminal
+        direct: list[set[int]] = [set() for _ in self.symbols.nonterminals]
+        for left_side, right_side in zip(self.left_sides, self.right_sides):
+            if right_side and not self.symbols.is_terminal(right_side[0]) and right_side[0] >= 0:
+                direct[left_side].add(right_side[0])
+
+        left_corners: list[list[int]] = []
+        for nonterminal in range(len(self.symbols.nonterminals)):
+            seen: dict[int, None] = {nonterminal: None}
+            work: list[int] = [nonterminal]
+            while work:
+                for corner in direct[work.pop()]:
+                    if corner not in seen:
+                        seen[corner] = None
+                        work.append(corner)
+            left_corners.append(sorted(seen))
+        return left_corners
+
+    def closure(self, kernel: frozenset[tuple[int, int]]) -> list[tuple[int, int]]:
+        nonterminals: set[int] = set()
+        for item in kernel:
+            symbol: int = self.next_symbol(item)
+            if symbol >= 0 and not self.symbols.is_terminal(symbol):
+                nonterminals.update(self.left_corners[symbol])
+        added: list[int] = sorted(rule for nonterminal in nonterminals for rule in self.rules_of[nonterminal])
+        return sorted(kernel) + [(rule, 0) for rule in added if (rule, 0) not in kernel]
+
+    def add_state(self, kernel: frozenset[tuple[int, int]]) -> int:
+        self.state_ids[kernel] = len(self.kernels)
+        self.kernels.append(kernel)
+        return self.state_ids[kernel]
+
+    def build(self) -> None:
+        # states are numbered in the order they are found, trying the symbols of each state in symbol id order
+        self.add_state(frozenset([(0, 0)]))
+        state: int = 0
+        while state < len(self.kernels):
+            items: list[tuple[int, int]] = self.closure(self.kernels[state])
+            gotos: dict[int, set[tuple[int, int]]] = {}
+            for item in items:
+                symbol: int = self.next_symbol(item)
+                if symbol >= 0:
+                    gotos.setdefault(symbol, set()).add((item[0], item[1] + 1))
+
+            transitions: dict[int, int] = {}
+            for symbol in sorted(gotos):
+                kernel: frozenset[tuple[int, int]] = frozenset(gotos[symbol])
+                transitions[symbol] = self.state_ids[kernel] if kernel in self.state_ids else self.add_state(kernel)
+
+            self.items.append(items)
+            self.transitions.append(transitions)
+            state += 1
@@ -0,0 +1,188 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+from Grammar import Grammar
+from GrammarAnalysis import GrammarAnalysis
+from LR0Automaton import LR0Automaton
+
+
+class LR1Automaton(LR0Automaton):
+    # LR(1) states are LR(0) kernels with a lookahead bitset (the same kind GrammarAnalysis uses, with epsilon as the
+    # end of input) for every kernel item. Without merging this is the canonical LR(1) collection. With merging, a new
+    # state is folded into an existing state with the same kernel whenever Pager's weak compatibility test shows the
+    # union can't create a reduce/reduce conflict the canonical states don't have, which gives LALR sized automata
+    # for LALR grammars while keeping the split states that other grammars need.
+
+    def __init__(self, grammar: Grammar, merge: bool = False) -> None:
+        self.analysis: GrammarAnalysis = grammar.analysis
+        self.merge: bool = merge
+        self.kernel_lookaheads: list[dict[tuple[int, int], int]] = []
+        self.lookaheads: list[dict[tuple[int, int], int]] = []
+        self.cores: dict[frozenset[tuple[int, int]], list[int]] = {}
+        self.suffix_firsts: list[list[int]] = []
+        self.corner_lookaheads: list[dict[int, tuple[int, bool]]] = []
+        super().__init__(grammar)
+
+    def find_suffix_firsts(self, right_side: tuple[int, ...]) -> list[int]:
+        # FIRST of every suffix of the right side, the last one being the empty suffix
+        epsilon: int = self.analysis.epsilon
+        suffix_firsts: list[int] = [epsilon] * (len(right_side) + 1)
+        for position in reversed(range(len(right_side))):
+            first: int = self.analysis.first[right_side[position]]
+            suffix_firsts[position] = (first & ~epsilon) | suffix_firsts[position + 1] if first & epsilon else first
+        return suffix_firsts
+
+    def find_corner_lookaheads(self) -> list[dict[int, tuple[int, bool]]]:
+        # For a dot in front of B, every left corner C of B gets the lookaheads that arise inside the closure, plus
+        # the lookaheads of the B item itself if the rest of every rule on some path from B to C is nullable.
+        epsilon: int = self.analysis.epsilon
+        edges: list[list[tuple[int, int, bool]]] = [[] for _ in self.symbols.nonterminals]
+        for rule, right_side in enumerate(self.right_sides):
+            if right_side and not self.symbols.is_terminal(right_side[0]):
+                suffix_first: int = self.suffix_firsts[rule][1]
+                edges[self.left_sides[rule]].append(
+                    (right_side[0], suffix_first & ~epsilon, bool(suffix_first & epsilon)))
+
+        corner_lookaheads: list[dict[int, tuple[int, bool]]] = []
+        for nonterminal in range(len(self.symbols.nonterminals)):
+            spontaneous: dict[int, int] = dict.fromkeys(self.left_corners[nonterminal], 0)
+            work: list[int] = list(spontaneous)
+            while work:
+                corner: int = work.pop()
+                for target, first, nullable in edges[corner]:
+                    lookahead: int = spontaneous[target] | first | (spontaneous[corner] if nullable else 0)
+                    if lookahead != spontaneous[target]:
+                        spontaneous[target] = lookahead
+                        work.append(target)
+
+            propagates: set[int] = {nonterminal}
+            work = [nonterminal]
+            while work:
+                for target, _, nullable in edges[work.pop()]:
+                    if nullable and target not in propagates:
+                        propagates.add(target)
+                        work.append(target)
+
+            corner_lookaheads.append({corner: (spontaneous[corner], corner in propagates) for corner in spontaneous})
+        return corner_lookaheads
+
+    def lookahead_closure(self, kernel_lookaheads: dict[tuple[int, int], int]) -> dict[tuple[int, int], int]:
+        epsilon: int = self.analysis.epsilon
+        nonterminal_lookaheads: dict[int, int] = {}
+        for item, lookahead in kernel_lookaheads.items():
+            symbol: int = self.next_symbol(item)
+            if symbol < 0 or self.symbols.is_terminal(symbol):
+                continue
+            suffix_first: int = self.suffix_firsts[item[0]][item[1] + 1]
+            inherited: int = (suffix_first & ~epsilon) | lookahead if suffix_first & epsilon else suffix_first
+            for corner, (spontaneous, propagates) in self.corner_lookaheads[symbol].items():
+                nonterminal_lookaheads[corner] = (
+                    nonterminal_lookaheads.get(corner, 0) | spontaneous | (inherited if propagates else 0))
+
+        closure: dict[tuple[int, int], int] = {item: kernel_lookaheads[item] for item in sorted(kernel_lookaheads)}
+        for rule in sorted(rule for nonterminal in nonterminal_lookaheads for rule in self.rules_of[nonterminal]):
+            closure[(rule, 0)] = closure.get((rule, 0), 0) | nonterminal_lookaheads[self.left_sides[rule]]
+        return closure
+
+    @staticmethod
+    def weakly_compatible(first: dict[tuple[int, int], int], second: dict[tuple[int, int], int]) -> bool:
+        # Pager: merging is safe if every lookahead two items would newly share was already shared in one of the states
+        items: list[tuple[int, int]] = list(first)
+        for i, item in enumerate(items):
+            for other in items[i+1:]:
+                if (((first[item] & second[other]) | (second[item] & first[other])) and
+                        not first[item] & first[other] and not second[item] & second[other]):
+                    return False
+        return True
+
+    def add_lookahead_state(self, kernel_lookaheads: dict[tuple[int, int], int]) -> int:
+        kernel: frozenset[tuple[int, int]] = frozenset(kernel_lookaheads)
+        self.cores.setdefault(kernel, []).append(len(self.kernels))
+        self.kernels.append(kernel)
+        self.kernel_lookaheads.append(kernel_lookaheads)
+        self.items.append([])
+        self.lookaheads.append({})
+        self.transitions.append({})
+        return len(self.kernels) - 1
+
+    def find_state(self, kernel_lookaheads: dict[tuple[int, int], int], work: list[int]) -> int:
+        for state in self.cores.get(frozenset(kernel_lookaheads), []):
+            existing: dict[tuple[int, int], int] = self.kernel_lookaheads[state]
+            if existing == kernel_lookaheads:
+                return state
+            if self.merge and self.weakly_compatible(existing, kernel_lookaheads):
+                merged: dict[tuple[int, int], int] = {
+                    item: existing[item] | kernel_lookaheads[item] for item in existing}
+                if merged != existing:
+                    # the successors were built from the smaller lookaheads, so the state has to be expanded again
+                    self.kernel_lookaheads[state] = merged
+                    work.append(state)
+                return state
+        state = self.add_lookahead_state(kernel_lookaheads)
+        work.append(state)
+        return state
+
+    def build(self) -> None:
+        self.suffix_firsts = [self.find_suffix_firsts(right_side) for right_side in self.right_sides]
+        self.corner_lookaheads = self.find_corner_lookaheads()
+
+        work: list[int] = [self.add_lookahead_state({(0, 0): self.analysis.epsilon})]
+        position: int = 0
+        while position < len(work):
+            state: int = work[position]
+            position += 1
+            closure: dict[tuple[int, int], int] = self.lookahead_closure(self.kernel_lookaheads[state])
+            gotos: dict[int, dict[tuple[int, int], int]] = {}
+            for item, lookahead in closure.items():
+                symbol: int = self.next_symbol(item)
+                if symbol >= 0:
+                    successor: dict[tuple[int, int], int] = gotos.setdefault(symbol, {})
+                    successor[(item[0], item[1] + 1)] = successor.get((item[0], item[1] + 1), 0) | lookahead
+
+            self.items[state] = list(closure)
+            self.lookaheads[state] = {item: lookahead for item, lookahead in closure.items() if self.is_complete(item)}
+            self.transitions[state] = {symbol: self.find_state(gotos[symbol], work) for symbol in sorted(gotos)}
+
+        if self.merge:
+            self.remove_unreachable_states()
+
+    def remove_unreachable_states(self) -> None:
+        # expanding a merged state again can move its transitions away from states nothing else leads to
+        reachable: set[int] = {0}
+        work: list[int] = [0]
+        while work:
+            for target in self.transitions[work.pop()].values():
+                if target not in reachable:
+                    reachable.add(target)
+                    work.append(target)
+        if len(reachable) == len(self.kernels):
+            return
+
+        kept: list[int] = sorted(reachable)
+        renumbered: dict[int, int] = {state: i for i, state in enumerate(kept)}
+        self.kernels = [self.kernels[state] for state in kept]
+        self.kernel_lookaheads = [self.kernel_lookaheads[state] for state in kept]
+        self.items = [self.items[state] for state in kept]
+        self.lookaheads = [self.lookaheads[state] for state in kept]
+        self.transitions = [{symbol: renumbered[target] for symbol, target in self.transitions[state].items()}
+                            for state in kept]
+        self.cores = {}
+        for state, kernel in enumerate(self.kernels):
+            self.cores.setdefault(kernel, []).append(state)
@@ -0,0 +1,44 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+from GrammarAnalysis import GrammarAnalysis
+from LR0Automaton import LR0Automaton
+from LR1Automaton import LR1Automaton
+from SLRTableParser import SLRTableParser
+
+
+class LR1TableParser(SLRTableParser):
+    # Same table and stepping as SLR, built from the LR(1) collection. With merge_states set, compatible states are
+    # merged while the collection is built, which usually brings the table down to the size of the LALR one.
+
+    def __init__(self, merge_states: bool = False) -> None:
+        super().__init__()
+        self.merge_states: bool = merge_states
+
+    def cache_name(self) -> str:
+        return super().cache_name() + ('-merged' if self.merge_states else '')
+
+    def make_automaton(self) -> LR0Automaton:
+        return LR1Automaton(self.grammar, self.merge_states)
+
+    def lookaheads(self, automaton: LR1Automaton) -> list[dict[tuple[int, int], int]]:
+        analysis: GrammarAnalysis = self.grammar.analysis
+        return [{item: analysis.end_of_input(lookahead) for item, lookahead in lookaheads.items()}
+                for lookaheads in automaton.lookaheads]
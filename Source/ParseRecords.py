@@ -0,0 +1,117 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+
+from Tree import Tree
+
+
+class ParseRecords:
+    # The nonterminal nodes a parse finished, in the order they were finished. Each record has the node, the tokens
+    # it covers from start up to end, the token at end being the lookahead it was finished with, a key for what the
+    # parser was doing when it started the node, and the first record of its subtree. The token cursor only moves
+    # forward, so the records are sorted by end, and the records of a subtree come right before the record of its root.
+    # The records are indexed by (start, key), so the next parse can look up the ones it can reuse without going over
+    # all of them, and only once the index is first needed, so a parse that isn't followed by another doesn't pay for
+    # it. The index has the last record for each, and every record has the distance back to the record before it with
+    # the same start and key, which it nests inside of unless it's empty. Distances don't change when a subtree is
+    # copied, so they are copied along with it as they are.
+
+    def __init__(self) -> None:
+        self.nodes: list[Tree] = []
+        self.starts: array[int] = array('q')
+        self.ends: array[int] = array('q')
+        self.keys: array[int] = array('i')
+        self.firsts: array[int] = array('q')
+        self.previous: array[int] = array('q')  # the distance back to the last record with the same start and key
+        self.index: dict[tuple[int, int], int] = {}
+        self.indexed: int = 0  # the number of records in the index, the rest are indexed when it's next used
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def add(self, node: Tree, start: int, end: int, key: int, first: int = -1) -> int:
+        # first is the first record of the subtree, -1 if the node is the only record in it
+        record: int = len(self.nodes)
+        self.nodes.append(node)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.keys.append(key)
+        self.firsts.append(first if first >= 0 else record)
+        return record
+
+    def add_all(self, nodes: Sequence[Tree], starts: Sequence[int], ends: Sequence[int], keys: Sequence[int],
+                firsts: Sequence[int]) -> None:
+        # add() for a batch of records, with their firsts filled in
+        self.nodes += nodes
+        self.starts.extend(starts)
+        self.ends.extend(ends)
+        self.keys.extend(keys)
+        self.firsts.extend(firsts)
+
+    def update_index(self) -> None:
+        # indexes the records added since the last time
+        index: dict[tuple[int, int], int] = self.index
+        previous: list[int] = []
+        for record, indexed in enumerate(zip(self.starts[self.indexed:], self.keys[self.indexed:]), self.indexed):
+            previous.append(record - index.get(indexed, record))
+            index[indexed] = record
+        self.previous.extend(previous)
+        self.indexed = len(self.nodes)
+
+    def copy_subtree(self, records: ParseRecords, record: int, shift: int) -> int:
+        # adds the records of the subtree of a record from another parse, moved by shift tokens, returns its new index
+        self.update_index()
+        if records.indexed <= record:
+            records.update_index()
+        first: int = records.firsts[record]
+        renumbered: int = len(self.nodes) - first
+        self.nodes.extend(records.nodes[first:record + 1])
+        self.starts.extend(map(shift.__add__, records.starts[first:record + 1]))
+        self.ends.extend(map(shift.__add__, records.ends[first:record + 1]))
+        self.keys.extend(records.keys[first:record + 1])
+        self.firsts.extend(map(renumbered.__add__, records.firsts[first:record + 1]))
+        self.previous.extend(records.previous[first:record + 1])
+        self.index.update(zip(zip(self.starts[first + renumbered:], records.keys[first:record + 1]),
+                              range(first + renumbered, len(self.nodes))))
+        self.indexed = len(self.nodes)
+        return len(self.nodes) - 1
+
+    def reusable(self, start: int, key: int, change: tuple[int, int, int] | None) -> tuple[int, int] | None:
+        # The record to reuse for a node with key starting at start in the edited tokens, as (record, shift), or None.
+        # Only records whose tokens, lookahead included, weren't touched by the change TokenStream.edit() returned
+        # can be reused: the records that end in front of the new tokens and the records that start behind them. Of
+        # the nested records with the same start and key the largest one that can be reused is taken. A distance
+        # copied along with a subtree can point past the start of it, so the record it leads to is checked again.
+        if self.indexed < len(self.nodes):
+            self.update_index()
+        if change is None:
+            return (self.index[start, key], 0) if (start, key) in self.index else None
+        first, end, shift = change
+        if start >= end:
+            return (self.index[start - shift, key], shift) if (start - shift, key) in self.index else None
+        record: int = self.index.get((start, key), -1) if start < first else -1
+        while record >= 0 and self.ends[record] >= first:
+            record = record - self.previous[record] if self.previous[record] else -1
+        if record < 0 or self.starts[record] != start or self.keys[record] != key:
+            return None
+        return record, 0
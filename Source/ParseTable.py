@@ -0,0 +1,93 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+from array import array
+from collections.abc import Iterator
+
+
+class ParseTable:
+    # A table of ints stored row after row in one flat array. After compress() the rows are overlapped with row
+    # displacement: row r starts at offsets[r] in values, and a cell only belongs to r if owners holds r at that spot.
+
+    def __init__(self, height: int, width: int, empty: int = -1) -> None:
+        self.height: int = height
+        self.width: int = width
+        self.empty: int = empty
+        self.values: array[int] = array('i', [empty]) * (height * width)
+        self.offsets: array[int] = array('i', range(0, height * width, width)) if width else array('i', [0] * height)
+        self.owners: array[int] | None = None
+
+    @property
+    def compressed(self) -> bool:
+        return self.owners is not None
+
+    def get(self, row: int, col: int) -> int:
+        index: int = self.offsets[row] + col
+        if self.owners is None:
+            return self.values[index]
+        return self.values[index] if index < len(self.owners) and self.owners[index] == row else self.empty
+
+    def set(self, row: int, col: int, value: int) -> None:
+        if self.compressed:
+            raise ValueError("A compressed table can't be changed")
+        self.values[self.offsets[row] + col] = value
+
+    def row(self, row: int) -> list[int]:
+        if self.owners is None:
+            return self.values[self.offsets[row]:self.offsets[row] + self.width].tolist()
+        return [self.get(row, col) for col in range(self.width)]
+
+    def rows(self) -> Iterator[list[int]]:
+        return map(self.row, range(self.height))
+
+    def byte_size(self) -> int:
+        return (len(self.values) + len(self.offsets) + (len(self.owners) if self.owners is not None else 0)) * \
+            self.values.itemsize
+
+    def compress(self) -> None:
+        # first fit, densest rows first, since those are the hardest to place once the array starts filling up
+        if self.compressed:
+            return
+        filled: list[list[int]] = [[col for col, value in enumerate(self.row(row)) if value != self.empty]
+                                   for row in range(self.height)]
+        values: array[int] = array('i')
+        owners: array[int] = array('i')
+        offsets: array[int] = array('i', [0] * self.height)
+        occupied: int = 0  # bit i is set once values[i] is taken
+        for row in sorted(range(self.height), key=lambda r: -len(filled[r])):
+            if not filled[row]:
+                continue
+            mask: int = sum(1 << col for col in filled[row])
+            offset: int = 0
+            while (occupied >> offset) & mask:
+                offset += 1
+            occupied |= mask << offset
+            if offset + self.width > len(owners):
+                values.extend([self.empty] * (offset + self.width - len(owners)))
+                owners.extend([-1] * (offset + self.width - len(owners)))
+            for col in filled[row]:
+                values[offset + col] = self.get(row, col)
+                owners[offset + col] = row
+            offsets[row] = offset
+
+        # trim the unused tail so lookups past the end fall on the length check instead
+        while owners and owners[-1] < 0:
+            owners.pop()
+            values.pop()
+        self.values, self.owners, self.offsets = values, owners, offsets
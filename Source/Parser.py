@@ -17,11 +17,20 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 from __future__ import annotations
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+import gc
+from mmap import mmap
+from typing import IO
 
 from Grammar import Grammar
+from GrammarAnalysis import GrammarAnalysis
+from GrammarCache import GrammarCache
 import HTML
+from ParseRecords import ParseRecords
+from TokenStream import TokenStream
 from Tree import Tree
+from TreeArena import TreeArena
 
 
 class UsesGrammar:
@@ -29,33 +38,104 @@ class UsesGrammar:
 
 
 class Parser(UsesGrammar):
-    tree: Tree | None
+    tree: Tree | None = None
     current_node: Tree | None
     parse_stack: list[BaseParseStackFrame]
-    token_stream: list[Grammar.Token]
+    token_stream: TokenStream
+    code_file: IO[str] | IO[bytes] | mmap | None = None  # the file or mmap the token stream reads from
+    code_offset: int = -1  # where the code starts in code_file, -1 if it can't be seeked back to
     finished_parsing: bool
     parse_error: bool
     scroll_bar_line: int
+    reuse_subtrees: bool = False
+    arena_trees: bool = False  # build the tree in a TreeArena
+    arena: TreeArena | None = None  # the arena of the tree, kept for the next parse if it reuses subtrees from it
+    records: ParseRecords
+    reused_records: ParseRecords
+    reusable: bool  # whether reused_records has any records the parse can reuse
+    reused_change: tuple[int, int, int] | None  # the change to the tokens since reused_records were made
+    token_change: tuple[int, int, int] | None
+    conflicts: list[str]  # where the grammar doesn't fit the algorithm, and which way each was resolved
 
     class BaseParseStackFrame:
         def __init__(self, node: Tree) -> None:
             self.node = node
 
+    class ParsingException(Exception):
+        def __init__(self, message: str, position: int, token: Grammar.Token | None) -> None:
+            super().__init__(message)
+            self.position: int = position  # of the token the parse stopped at, counted from the start of the input
+            self.token: Grammar.Token | None = token
+
     def input_grammar(self, description: str) -> None:
         self.grammar = Grammar(description)
-        self.generate_rules()
+        self.forget_subtrees()
+        compiled: dict[str, object] | None = GrammarCache.load(description, self.cache_name())
+        try:
+            if compiled is not None and compiled['symbols'] == self.grammar.symbols.names:
+                self.load_rules(compiled)
+                return
+        except Exception:
+            pass  # left by another version of the parser, everything load_rules() set is built again below
 
-    def input_code(self, code: str) -> None:
-        self.token_stream = self.grammar.lexer(code)
+        self.generate_rules()
+        compiled = self.compile_rules()
+        if compiled is not None:
+            GrammarCache.save(description, self.cache_name(), {'symbols': self.grammar.symbols.names, **compiled})
+
+    def cache_name(self) -> str:
+        return type(self).__name__
+
+    def input_code(self, code: str | IO[str] | IO[bytes] | mmap) -> None:
+        # Code from the window is lexed up front, so lexing errors show up right away and the whole token stream can
+        # be displayed. Files and mmaps are lexed as the parser asks for tokens, which only keeps the lookahead around.
+        if isinstance(code, str):
+            self.token_stream = TokenStream(self.grammar.tokens(code), code=code)
+            self.token_stream.read()
+        else:
+            self.code_file = code
+            self.code_offset = code.tell() if isinstance(code, mmap) or code.seekable() else -1
+            self.token_stream = TokenStream(self.grammar.tokens(code), keep_read=False)
+        self.forget_subtrees()
+
+    def read_code_again(self) -> Iterable[Grammar.Token]:
+        # The tokens of a file or mmap that the stream let go of can't be rewound to, so the file is lexed again from
+        # where it started. It is only seeked once the parser asks for a token, in case other code gets input first.
+        if self.code_offset < 0:
+            raise ValueError("The code can't be read again, it doesn't support seeking")
+        self.code_file.seek(self.code_offset)
+        yield from self.grammar.tokens(self.code_file)
+
+    def edit_code(self, code: str) -> None:
+        # Only lexes the edited part of the code again. With reuse_subtrees on, the next parse takes the subtrees of
+        # the last one that only cover unchanged tokens, and were started in the same state, instead of building them.
+        if self.token_stream.code is None:
+            self.input_code(code)
+        else:
+            first, end, shift = self.token_stream.edit(self.grammar, code)
+            if self.token_change is not None:
+                # edited again before parsing, so the changes are combined into one
+                last_first, last_end, last_shift = self.token_change
+                first, end, shift = min(first, last_first), max(end, last_end + shift), shift + last_shift
+            self.token_change = first, end, shift
+
+    def forget_subtrees(self) -> None:
+        self.records = ParseRecords()
+        self.reusable = False
+        self.token_change = None
 
     def node_on_stack(self, node: Tree) -> bool:
-        return any(map(lambda frame: node is frame.node, self.parse_stack))
+        return any(map(lambda frame: node == frame.node, self.parse_stack))
+
+    def nodes_on_stack(self) -> set[Tree]:
+        # for checking every node of a tree against a stack that can be as deep as the tree
+        return {frame.node for frame in self.parse_stack if frame.node is not None}
 
     def node_should_be_highlighted(self, node: Tree) -> bool:
-        return node is self.current_node and (not self.finished_parsing or self.parse_error)
+        return node == self.current_node and (not self.finished_parsing or self.parse_error)
 
     def token_stream_to_str(self) -> str:
-        return ' '.join(map(lambda token: token.image, self.token_stream))
+        return ' '.join(map(lambda token: token.image, self.token_stream.remaining()))
 
     def set_scroll_bar_to_line(self, line: int) -> None:
         self.scroll_bar_line = line - 1
@@ -63,11 +143,64 @@ class Parser(UsesGrammar):
     def set_scroll_bar_to_index(self, index: int) -> None:
         self.scroll_bar_line = index
 
+    def parse_all(self) -> Tree:
+        # Runs the parse to the end and returns the tree, or raises a ParsingException with the tree left as stepping
+        # would leave it. The parsers override this with a loop that skips the highlighting step() does for the window.
+        while not self.finished_parsing:
+            self.step()
+        return self.parse_result()
+
+    @staticmethod
+    @contextmanager
+    def gc_paused() -> Iterator[None]:
+        # A parse allocates nodes far faster than it lets go of them, which sets off the cyclic garbage collector over
+        # and over while the tree only grows. It is paused for the loop and runs when it next would once it's back on.
+        enabled: bool = gc.isenabled()
+        gc.disable()
+        try:
+            yield
+        finally:
+            if enabled:
+                gc.enable()
+
+    def new_tree(self, name: str) -> Tree:
+        # A parse that reuses subtrees of the last one builds its tree in the same arena, so they can be linked into
+        # it. The nodes of the last tree that weren't reused stay in the arena until a parse doesn't reuse any.
+        if not self.arena_trees:
+            return Tree(name)
+        if self.arena is None:
+            self.arena = TreeArena()
+        return self.arena.add_root(name)
+
+    def node_type(self) -> Callable[[str, Tree | None, list[Tree] | None], Tree]:
+        # what the loops of parse_all() make nodes with, in place of the Tree constructor, for the tree being built
+        return self.tree.arena.new_node if isinstance(self.tree, TreeArena.Node) else Tree
+
+    def parse_result(self) -> Tree:
+        if self.parse_error:
+            token: Grammar.Token | None = self.token_stream.peek()
+            raise self.ParsingException(
+                f"Unexpected token '{token.image}'." if token is not None else "Unexpected end of input.",
+                self.token_stream.position, token)
+        return self.tree
+
     def reset_parser_attributes(self) -> None:
         self.tree = None
         self.current_node = None
         self.parse_stack = []
-        self.token_stream = []
+        if self.token_stream.start == 0:
+            self.token_stream.rewind()
+        else:
+            self.token_stream = TokenStream(self.read_code_again(), keep_read=False)
+        self.reused_records = self.records
+        self.reused_change = self.token_change
+        # the subtrees can only be linked into a tree of the same kind, in the case of an arena the same one
+        self.reusable = self.reuse_subtrees and len(self.records) > 0 and \
+            isinstance(self.records.nodes[0], TreeArena.Node) == self.arena_trees
+        if not self.reusable:
+            self.arena = None
+        self.records = ParseRecords()
+        self.token_change = None
         self.finished_parsing = False
         self.parse_error = False
         self.scroll_bar_line = -1
@@ -77,6 +210,8 @@ class Parser(UsesGrammar):
     def parse_stack_to_str(self) -> str: ...
 
     def generate_rules(self) -> None: ...
+    def compile_rules(self) -> dict[str, object] | None: ...
+    def load_rules(self, compiled: dict[str, object]) -> None: ...
     def step(self) -> None: ...
     def reset(self) -> None: ...
 
@@ -124,32 +259,36 @@ class WritesGrammar(UsesGrammar):
 
 
 class LL1Parser(UsesGrammar):
+    conflicts: list[str]
+
     def generate_predict_sets(self) -> list[list[str]]:
-        first_sets: dict[str, list[str]] = self.grammar.generate_first_sets()
-        follow_sets: dict[str, list[str]] = self.grammar.generate_follow_sets(first_sets)
-        predict_sets: list[list[str]] = []
-
-        for rule in self.grammar.rules:
-            new_set: list[str] = [symbol for symbol in first_sets[rule.productions[0].name]]
-            if '' in new_set:
-                new_set.remove('')
-                new_set = list(set(new_set + follow_sets[rule.name]))
-            predict_sets.append(new_set)
-        if '' in predict_sets[0]:
-            predict_sets[0].remove('')
-        if 'eof' not in predict_sets[0]:
-            predict_sets[0].append('eof')
-
-        check: dict[str, list[str]] = dict.fromkeys(self.grammar.rule_names_list)
-        for thing in check.keys():
-            check[thing] = []
-        for rule, predict in zip(self.grammar.rules, predict_sets):
-            check[rule.name] += predict
-        for k, v in check.items():
-            if len(set(v)) < len(v):
-                print(f"Predict set for {k} is not disjoint.")
-                for rule, predict in zip(self.grammar.rules, predict_sets):
-                    if rule.name == k:
-                        print(f"{predict} -> {rule.make_formatted_str(0)}")
-
-        return predict_sets
+        # When the predict sets of a nonterminal's rules overlap the grammar isn't LL(1). Each token they overlap on
+        # goes into conflicts, and is only left in the set of one rule, so both LL(1) parsers pick the same rule for
+        # it: the first rule that isn't left recursive, or the first rule if they all are. A left recursive rule never
+        # wins, since it could get back to its own nonterminal without reading a token and descend forever.
+        analysis: GrammarAnalysis = self.grammar.analysis
+        predict_sets: list[int] = [analysis.predict(rule) for rule in self.grammar.rules]
+
+        self.conflicts = []
+        rules_of: dict[int, list[int]] = {}
+        for i, rule in enumerate(self.grammar.rules):
+            rules_of.setdefault(rule.symbol_id, []).append(i)
+        for symbol_id, rules in rules_of.items():
+            overlap: int = 0
+            seen: int = 0
+            for i in rules:
+                overlap |= seen & predict_sets[i]
+                seen |= predict_sets[i]
+            if not overlap:
+                continue
+            for token in analysis.bitset_to_list(overlap):
+                self.conflicts.append(f"LL(1) conflict for {self.grammar.symbols.names[symbol_id]} on {token}")
+            ordered: list[int] = sorted(rules, key=lambda i: analysis.left_recursive(self.grammar.rules[i]))
+            for i in ordered:
+                taken: int = predict_sets[i] & overlap
+                for j in rules:
+                    if j != i:
+                        predict_sets[j] &= ~taken
+                overlap &= ~taken
+
+        return [analysis.bitset_to_list(predict) for predict in predict_sets]
@@ -17,24 +17,46 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 from __future__ import annotations
-from collections.abc import Iterable
+from array import array
+from collections.abc import Callable, Iterable
 from enum import StrEnum
+from types import ModuleType
 
+from Grammar import Grammar
+from GrammarAnalysis import GrammarAnalysis
+from GrammarCache import GrammarCache
+from LR0Automaton import LR0Automaton
+from ParseTable import ParseTable
 from Parser import Parser, UsesTable, WritesGrammar
+from TokenStream import TokenStream
 from Tree import Tree
 
 
 class SLRTableParser(Parser, UsesTable, WritesGrammar):
     parse_stack: list[ParseStackFrame]
-    table: list[list[TableEntry]]
+    action_table: ParseTable
+    goto_table: ParseTable
     production_list: list[Production]
-    tree_is_first_in_token_stream: bool
+    production_index: dict[Production, int]  # the index of each production in production_list
+    goto_symbol: Production | None
+    goto_position: int
+    goto_record: int
+    state_actions: list[dict[int, tuple[int, int | Production]]]  # see make_state_actions()
+    compress_tables: bool = False
+    reuse_subtrees: bool = True  # edits to the code are parsed again incrementally
+    compile_parser: bool = False
+    engines: dict[tuple[str, str], Callable[..., tuple[tuple | None, int, int, bool]]] = {}  # by grammar and cache name
 
     class ParseStackFrame(Parser.BaseParseStackFrame):
-        def __init__(self, node: Tree, symbol: str, state: int) -> None:
+        # position is the first token under the symbol, record the record of its node if it is a nonterminal
+        def __init__(self, node: Tree, symbol: str, symbol_id: int, state: int, position: int = 0,
+                     record: int = -1) -> None:
             super().__init__(node)
             self.symbol: str = symbol
+            self.symbol_id: int = symbol_id
             self.state: int = state
+            self.position: int = position
+            self.record: int = record
 
     class Actions(StrEnum):
         Shift = 's'
@@ -42,40 +64,55 @@ class SLRTableParser(Parser, UsesTable, WritesGrammar):
         ShiftReduce = 'b'
         Nothing = ''
 
-    class TableEntry:
-        def __init__(self, action: SLRTableParser.Actions, target: int) -> None:
-            self.action: SLRTableParser.Actions = action
-            self.target: int = target
+    action_codes: tuple[Actions, ...] = (Actions.Nothing, Actions.Shift, Actions.Reduce, Actions.ShiftReduce)
+
+    class TableEntry:  # decoded table cell, the tables hold target << 2 | action code with 0 for an empty cell
+        def __init__(self, value: int) -> None:
+            self.action: SLRTableParser.Actions = SLRTableParser.action_codes[value & 3]
+            self.target: int = value >> 2 if value else -1
 
         def __str__(self) -> str:
             return self.action + str(self.target)
 
+        @staticmethod
+        def encode(action: SLRTableParser.Actions, target: int) -> int:
+            return target << 2 | SLRTableParser.action_codes.index(action)
+
     class Production:
-        def __init__(self, name: str, right_side_len: int) -> None:
+        def __init__(self, name: str, symbol_id: int, right_side_len: int) -> None:
             self.name: str = name
+            self.symbol_id: int = symbol_id
             self.right_side_len: int = right_side_len
 
     def __init__(self) -> None:
+        self.token_stream = TokenStream([])
+        self.forget_subtrees()
         self.reset()
 
-        self.table = []
+        self.action_table = ParseTable(0, 0, 0)
+        self.goto_table = ParseTable(0, 0, 0)
         self.production_list = []
+        self.production_index = {}
+        self.state_actions = []
         self.symbol_list: list[str] = []
+        self.conflicts: list[str] = []
 
     def table_height(self) -> int:
-        return len(self.table)
+        return self.action_table.height
 
     def table_width(self) -> int:
-        return len(self.table[0])
+        return len(self.symbol_list)
 
     def get_table_top_row(self) -> Iterable[str]:
         return self.symbol_list
 
     def get_table_left_col(self) -> Iterable[str]:
-        return map(str, range(len(self.table)))
+        return map(str, range(self.action_table.height))
 
     def get_table_body(self) -> Iterable[Iterable[str]]:
-        return [['' if str(i) == '-1' else str(i) for i in row] for row in self.table]
+        # the goto columns come first since the nonterminals have the lower symbol ids, see symbol_column
+        return ([str(self.TableEntry(value)) if value else '' for value in goto_row[1:] + action_row]
+                for action_row, goto_row in zip(self.action_table.rows(), self.goto_table.rows()))
 
     def code_box_text(self) -> str:
         return self.grammar_to_numbered_list()
@@ -86,193 +123,559 @@ class SLRTableParser(Parser, UsesTable, WritesGrammar):
     def parse_stack_to_str(self) -> str:
         return ' '.join(map(lambda x: f"{x.node.name} {x.state}", self.parse_stack))
 
-    def generate_rules(self) -> None:
-        self.symbol_list = self.grammar.rule_names_list + self.grammar.tokens_list
-
-        class LRProduction:
-            def __init__(self, name: str, terminal: bool) -> None:
-                self.name: str = name
-                self.terminal: bool = terminal
-
-            def __eq__(self, other: LRProduction) -> bool:
-                return self.name == other.name and self.terminal == other.terminal
-
-            def __str__(self) -> str:
-                return f'"{self.name.replace('\n', '\\n')}"' if self.terminal else f'<{self.name}>'
-
-        class LRItem:
-            def __init__(self, name: str, productions: list[LRProduction], dot_position: int) -> None:
-                self.name: str = name
-                self.productions: list[LRProduction] = productions
-                self.dot_position: int = dot_position
-
-            def __eq__(self, other: LRItem) -> bool:
-                return self.name == other.name and self.productions == other.productions and self.dot_position == other.dot_position
-
-            def make_formatted_str(self) -> str:
-                prods = list(map(str, self.productions))
-                prods.insert(self.dot_position, '•') if self.dot_position < len(prods) else prods.append('•')
-                return '<' + self.name + '> ::= ' + ' '.join(prods)
-
-        def closure(items_list: list[LRItem], all_lr_items: list[LRItem]) -> list[LRItem]:
-            list_length: int = 0
-            while len(items_list) != list_length:
-                list_length = len(items_list)
-                for item_ in items_list:
-                    if item_.dot_position < len(item_.productions):
-                        for lr_item in all_lr_items:
-                            if lr_item.name == item_.productions[item_.dot_position].name and lr_item.dot_position == 0 and lr_item not in items_list:
-                                items_list.append(lr_item)
-            return items_list
-
-        def goto(items: list[LRItem], symbol_: str, all_lr_items: list[LRItem]) -> list[LRItem]:
-            new_items: list[LRItem] = []
-            for item_ in items:
-                if item_.dot_position < len(item_.productions) and item_.productions[item_.dot_position].name == symbol_:
-                    new_items.append(LRItem(item_.name, item_.productions, item_.dot_position+1))
-            return closure(new_items, all_lr_items)
-
-        def find_rule_index(lr_item_: LRItem) -> int:
-            for ri, rule_ in enumerate(self.grammar.rules):
-                if [p.name for p in rule_.productions] == [lri.name for lri in lr_item_.productions]:
-                    return ri
-
-        lr_items: list[LRItem] = []
-        for rule in self.grammar.rules:
-            for i in range(len(rule.productions) + 1):
-                lr_items.append(LRItem(rule.name, [LRProduction(p.name, p.terminal) for p in rule.productions], i))
-
-        closures: list[list[LRItem]] = [closure([lr_items[0]], lr_items)]
-        current_states: int = 0
-        while len(closures) != current_states:
-            current_states = len(closures)
-            for state in closures:
-                for symbol in self.symbol_list:
-                    new_set: list[LRItem] = goto(state, symbol, lr_items)
-                    if len(new_set) > 0 and new_set not in closures:
-                        closures.append(new_set)
-
-        singleton_indices: list[int] = []
-        for i, state in enumerate(closures):
-            if len(state) == 1 and state[0].dot_position >= len(state[0].productions):
-                singleton_indices.append(i)
-        singleton_states: list[LRItem] = []
-        for i in singleton_indices[::-1]:
-            singleton_states.append(closures.pop(i).pop())
-
-        follow_sets: dict[str, list[str]] = self.grammar.generate_follow_sets()
-        if '' in follow_sets[self.grammar.start_symbol]:
-            follow_sets[self.grammar.start_symbol].remove('')
-        if 'eof' not in follow_sets[self.grammar.start_symbol]:
-            follow_sets[self.grammar.start_symbol].append('eof')
-
-        self.symbol_list.remove(self.grammar.start_symbol)
-        blank_entry = self.TableEntry(self.Actions.Nothing, -1)
-        self.table = []
-        for state in closures:
-            self.table.append([blank_entry] * len(self.symbol_list))
-            for item in state:
-                if item.dot_position < len(item.productions):
-                    goto_ = goto(state, item.productions[item.dot_position].name, lr_items)
-                    if goto_ in closures:
-                        self.table[-1][self.symbol_list.index(item.productions[item.dot_position].name)] =\
-                            self.TableEntry(self.Actions.Shift, closures.index(goto_))
-                    else:
-                        self.table[-1][self.symbol_list.index(item.productions[item.dot_position].name)] = \
-                            self.TableEntry(self.Actions.ShiftReduce, find_rule_index(goto_[0]) + 1)
-
-            for item in state:
-                if item.dot_position >= len(item.productions):
-                    for symbol in follow_sets[item.name]:
-                        if self.table[-1][self.symbol_list.index(symbol)] is not blank_entry:
-                            print("shift reduce conflict in state:")
-                            print('\n'.join(map(lambda j: j.make_formatted_str(), state)))
-                        self.table[-1][self.symbol_list.index(symbol)] = self.TableEntry(
-                            self.Actions.Reduce, find_rule_index(item) + 1
-                        )
+    def token_stream_to_str(self) -> str:
+        # a reduced nonterminal waiting for its goto is shown in front of the input it was reduced on
+        return ' '.join(([self.goto_symbol.name] if self.goto_symbol is not None else []) +
+                        [token.image for token in self.token_stream.remaining()])
 
-        self.production_list = []
-        for rule in self.grammar.rules:
-            self.production_list.append(self.Production(rule.name, len(rule.productions)))
+    def generate_rules(self) -> None:
+        self.make_productions()
+        automaton: LR0Automaton = self.make_automaton()
+        self.conflicts = []
+        self.fill_table(automaton, self.lookaheads(automaton))
+        self.make_state_actions()
+
+    def cache_name(self) -> str:
+        return super().cache_name() + ('-compressed' if self.compress_tables else '')
+
+    def compile_rules(self) -> dict[str, object]:
+        return {'action_table': self.action_table, 'goto_table': self.goto_table, 'conflicts': self.conflicts}
+
+    def load_rules(self, compiled: dict[str, object]) -> None:
+        self.make_productions()
+        self.action_table = compiled['action_table']
+        self.goto_table = compiled['goto_table']
+        self.conflicts = compiled['conflicts']
+        self.make_state_actions()
+
+    def make_productions(self) -> None:
+        self.symbol_list = self.grammar.symbols.names[1:]
+        self.production_list = [
+            self.Production(rule.name, rule.symbol_id, sum(production.name != '' for production in rule.productions))
+            for rule in self.grammar.rules
+        ]
+        self.production_index = {production: i for i, production in enumerate(self.production_list)}
+
+    def make_automaton(self) -> LR0Automaton:
+        return LR0Automaton(self.grammar)
+
+    def lookaheads(self, automaton: LR0Automaton) -> list[dict[tuple[int, int], int]]:
+        analysis: GrammarAnalysis = self.grammar.analysis
+        return [{item: analysis.end_of_input(analysis.follow[automaton.left_sides[item[0]]])
+                 for item in items if automaton.is_complete(item)} for items in automaton.items]
+
+    def fill_table(self, automaton: LR0Automaton, lookaheads: list[dict[tuple[int, int], int]]) -> None:
+        # states that only hold one finished item are folded into the shift that reaches them as a shift-reduce
+        analysis: GrammarAnalysis = self.grammar.analysis
+        rows: list[int] = []
+        row_count: int = 0
+        for kernel in automaton.kernels:
+            singleton: bool = len(kernel) == 1 and automaton.is_complete(next(iter(kernel)))
+            rows.append(-1 if singleton else row_count)
+            row_count += 0 if singleton else 1
+
+        symbols: Grammar.SymbolTable = self.grammar.symbols
+        self.action_table = ParseTable(row_count, len(symbols.terminals), 0)
+        self.goto_table = ParseTable(row_count, len(symbols.nonterminals), 0)
+        for state, row in enumerate(rows):
+            if row < 0:
+                continue
+            for symbol_id, target in automaton.transitions[state].items():
+                value: int = (
+                    self.TableEntry.encode(self.Actions.Shift, rows[target]) if rows[target] >= 0 else
+                    self.TableEntry.encode(self.Actions.ShiftReduce, next(iter(automaton.kernels[target]))[0] + 1))
+                if symbols.is_terminal(symbol_id):
+                    self.action_table.set(row, symbols.terminal_index(symbol_id), value)
+                elif symbol_id > 0:
+                    self.goto_table.set(row, symbol_id, value)
+
+            for item, lookahead in lookaheads[state].items():
+                for symbol_id in analysis.bitset_to_ids(lookahead):
+                    column: int = symbols.terminal_index(symbol_id)
+                    entry: SLRTableParser.TableEntry = self.TableEntry(self.action_table.get(row, column))
+                    if entry.action != self.Actions.Nothing:
+                        self.report_conflict(row, symbol_id, entry)
+                    # like yacc, shifts win over reductions and earlier rules win over later ones
+                    if entry.action == self.Actions.Nothing or (
+                            entry.action == self.Actions.Reduce and item[0] + 1 < entry.target):
+                        self.action_table.set(row, column, self.TableEntry.encode(self.Actions.Reduce, item[0] + 1))
+
+        if self.compress_tables:
+            self.action_table.compress()
+            self.goto_table.compress()
+
+    def make_state_actions(self) -> None:
+        # The action and goto rows of each state as one dict from symbol id to (action code, target), for parse_all()
+        # to decode a cell with one lookup. The target of a shift is the next state, of a reduction its Production.
+        first_terminal: int = len(self.grammar.symbols.nonterminals)
+        shift: int = self.action_codes.index(self.Actions.Shift)
+        self.state_actions = []
+        for action_row, goto_row in zip(self.action_table.rows(), self.goto_table.rows()):
+            cells: list[tuple[int, int]] = [(symbol_id, value) for symbol_id, value in enumerate(goto_row)
+                                            if value and symbol_id > 0]
+            cells += [(column + first_terminal, value) for column, value in enumerate(action_row) if value]
+            self.state_actions.append({
+                symbol_id: (value & 3, value >> 2 if value & 3 == shift else self.production_list[(value >> 2) - 1])
+                for symbol_id, value in cells})
+
+    def report_conflict(self, row: int, symbol_id: int, entry: SLRTableParser.TableEntry) -> None:
+        # the window shows the conflicts of the grammar, nothing is printed
+        kind: str = 'reduce/reduce' if entry.action == self.Actions.Reduce else 'shift/reduce'
+        self.conflicts.append(f"{kind} conflict in state {row} on {self.grammar.symbols.names[symbol_id]}")
 
     def step(self) -> None:
         self.reset_highlighted_line()
         if not self.parse_stack:
             self.start_parse()
-        elif (not self.token_stream or self.token_stream[0].name == self.production_list[0].name) and self.parse_stack[-1].state == 0:
+        elif ((self.input_is_empty() or self.lookahead_symbol_id() == self.production_list[0].symbol_id) and
+              self.parse_stack[-1].state == 0):
             self.finish_parse()
         else:
             self.do_action()
 
+    def parse_all(self) -> Tree:
+        # the moves of step() and do_action(), with the table cells decoded in place and nothing highlighted
+        if self.compile_parser:
+            return self.parse_compiled()
+        shift, reduce, shift_reduce = map(self.action_codes.index, (self.Actions.Shift, self.Actions.Reduce,
+                                                                    self.Actions.ShiftReduce))
+        first_terminal: int = len(self.grammar.symbols.nonterminals)
+        start_symbol: int = self.production_list[0].symbol_id
+        action_table, goto_table = self.action_table, self.goto_table
+        stream: TokenStream = self.token_stream
+        if not self.parse_stack and not self.finished_parsing:
+            self.start_parse()
+        if not self.finished_parsing and not self.reusable:
+            with self.gc_paused():
+                self.shift_reduce_all()
+        parse_stack: list[SLRTableParser.ParseStackFrame] = self.parse_stack
+        tree: Tree = self.tree
+
+        while not self.finished_parsing:
+            goto: SLRTableParser.Production | None = self.goto_symbol
+            token: Grammar.Token | None = stream.peek() if goto is None else None
+            symbol_id: int = goto.symbol_id if goto is not None else \
+                token.symbol_id if token is not None else parse_stack[-1].symbol_id
+            state: int = parse_stack[-1].state
+            if state == 0 and (symbol_id == start_symbol or goto is None and token is None):
+                self.finish_parse()
+                break
+            if self.reusable and goto is None and self.reuse_subtree(state):
+                continue
+
+            value: int = action_table.get(state, symbol_id - first_terminal) if symbol_id >= first_terminal else \
+                goto_table.get(state, symbol_id) if symbol_id > 0 else 0
+            action: int = value & 3
+            if action == shift and goto is None:
+                position: int = stream.position
+                stream.advance()
+                self.current_node = tree.add_child(token.name)
+                parse_stack.append(
+                    self.ParseStackFrame(self.current_node, token.name, token.symbol_id, value >> 2, position))
+            elif action == shift:
+                self.shift(value >> 2)
+            elif action == reduce or action == shift_reduce:
+                production: SLRTableParser.Production = self.production_list[(value >> 2) - 1]
+                length: int = production.right_side_len
+                if action == reduce:
+                    self.reduce_nodes(production, length, length, stream.position)
+                elif goto is not None:
+                    self.reduce_nodes(production, length - 1, length, self.goto_position)
+                else:
+                    position = stream.position
+                    stream.advance()
+                    self.reduce_nodes(production, length - 1, length - 1, position).add_child(token.name)
+            else:
+                self.finish_parse_with_error()
+        return self.parse_result()
+
+    def shift_reduce_all(self) -> None:
+        # The parse without frames or Token objects: the stack is kept as lists of states, symbol ids, first tokens,
+        # and records, the nodes on it are the last children of the tree as in reduce_nodes(), the lookahead is read
+        # straight out of the columns of the token stream, and a cell is decoded with one lookup in state_actions. It
+        # stops where the next move needs more than that, an empty cell, the end of the tokens, or the accepting state,
+        # and leaves the stack in frames for parse_all() to take the move as step() would.
+        no_record: int = 1 << 62  # records are numbered in the order they're finished, min() is the first of a subtree
+        shift, reduce = self.action_codes.index(self.Actions.Shift), self.action_codes.index(self.Actions.Reduce)
+        stream: TokenStream = self.token_stream
+        state_actions: list[dict[int, tuple[int, int | SLRTableParser.Production]]] = self.state_actions
+        start_symbol: int = self.production_list[0].symbol_id
+        recording: bool = self.reuse_subtrees
+        # the records of the nodes it reduces, added to self.records in one batch at the end
+        recorded: int = len(self.records)
+        firsts: list[int] = self.records.firsts.tolist()
+        reduced: list[tuple[Tree, int, int, int]] = []
+        tree: Tree = self.tree
+        nodes: list[Tree] = tree.children
+        new_node: Callable[..., Tree] = self.node_type()
+        parse_stack: list[SLRTableParser.ParseStackFrame] = self.parse_stack
+        states: list[int] = [frame.state for frame in parse_stack]
+        symbols: list[int] = [frame.symbol_id for frame in parse_stack]
+        positions: list[int] = [frame.position for frame in parse_stack]
+        frame_records: list[int] = [frame.record if frame.record >= 0 else no_record for frame in parse_stack]
+        goto: SLRTableParser.Production | None = self.goto_symbol
+        goto_position: int = self.goto_position
+        goto_record: int = self.goto_record
+        if not tree.changed:
+            tree.mark_changed()  # laid out since the parse started, it gets children without add_child()
+
+        names: list[str] = stream.names
+        symbol_ids: array[int] = stream.symbol_ids
+        base: int = stream.start  # the position of the token at index 0 of the columns
+        index: int = stream.position - base
+        while True:
+            if goto is not None:
+                symbol_id: int = goto.symbol_id
+            elif index < len(symbol_ids):
+                symbol_id = symbol_ids[index]
+            else:
+                stream.position = base + index
+                if not stream.keep_read:
+                    stream.forget_read()
+                stream.read(4096)
+                base = stream.start
+                index = stream.position - base
+                if index >= len(symbol_ids):
+                    break
+                continue
+            state: int = states[-1]
+            if state == 0 and symbol_id == start_symbol:
+                break
+            action: tuple[int, int | SLRTableParser.Production] | None = state_actions[state].get(symbol_id)
+            if action is None:
+                break
+            kind, target = action
+            if kind == shift:
+                states.append(target)
+                symbols.append(symbol_id)
+                if goto is None:
+                    nodes.append(new_node(names[index], tree))
+                    positions.append(base + index)
+                    frame_records.append(no_record)
+                    index += 1
+                else:
+                    positions.append(goto_position)
+                    frame_records.append(goto_record if goto_record >= 0 else no_record)
+                    goto = None
+                continue
+
+            # a reduction, or a shift and a reduction when the symbol is the last one of the rule
+            length: int = target.right_side_len
+            shifted: str | None = None
+            first: int = no_record
+            if kind == reduce:
+                frames = count = length
+                position: int = base + index
+            elif goto is not None:
+                frames, count = length - 1, length
+                position = goto_position
+                if goto_record >= 0:
+                    first = goto_record
+            else:
+                frames = count = length - 1
+                position = base + index
+                shifted = names[index]
+                index += 1
+            if frames:
+                position = positions[-frames]
+                first = min(first, *frame_records[-frames:])
+                del states[-frames:], symbols[-frames:], positions[-frames:], frame_records[-frames:]
+            children: list[Tree] = nodes[len(nodes) - count:]
+            del nodes[len(nodes) - count:]
+            node: Tree = new_node(target.name, tree, children)
+            nodes.append(node)
+            if shifted is not None:
+                node.children.append(new_node(shifted, node))
+            if recording:
+                reduced.append((node, position, base + index, states[-1]))
+                firsts.append(firsts[first] if first != no_record else len(firsts))
+                goto_record = len(firsts) - 1
+            goto, goto_position = target, position
+
+        if reduced:
+            reduced_nodes, starts, ends, keys = zip(*reduced)
+            self.records.add_all(reduced_nodes, starts, ends, keys, firsts[recorded:])
+        parse_stack[1:] = [self.ParseStackFrame(node, node.name, symbol_id, state, position,
+                                                record if record != no_record else -1)
+                           for node, symbol_id, state, position, record in
+                           zip(nodes, symbols[1:], states[1:], positions[1:], frame_records[1:])]
+        self.current_node = nodes[-1] if nodes else tree
+        self.goto_symbol, self.goto_position, self.goto_record = goto, goto_position, goto_record
+        stream.position = base + index
+        if not stream.keep_read:
+            stream.forget_read()
+
+    def parse_compiled(self) -> Tree:
+        # Runs the engine from make_python_engine() on plain tuples for the stack frames, and puts the frames it leaves
+        # back on the parse stack, so the parser ends up where stepping would have left it. A reduction waiting for
+        # its goto goes in and comes out by its index in production_list, -1 for the node of a reused subtree, whose
+        # goto_symbol reuse_subtree() made.
+        parse: Callable[..., tuple[tuple | None, int, int, bool]] = self.python_engine()
+        if not self.parse_stack and not self.finished_parsing:
+            self.start_parse()
+        if self.finished_parsing:
+            return self.parse_result()
+        stack: list[tuple[int, int, int, int]] = [(frame.state, frame.symbol_id, frame.position, frame.record)
+                                                  for frame in self.parse_stack]
+        goto: tuple | None = None
+        if self.goto_symbol is not None:
+            goto = (0, self.production_index.get(self.goto_symbol, -1), self.goto_symbol.name,
+                    self.goto_symbol.symbol_id, self.goto_symbol.right_side_len)
+        with self.gc_paused():
+            goto, self.goto_position, self.goto_record, error = parse(
+                stack, goto, self.goto_position, self.goto_record, self.tree, self.token_stream, self.node_type(),
+                self.records if self.reuse_subtrees else None, self.reuse_compiled if self.reusable else None)
+
+        self.parse_stack[1:] = [self.ParseStackFrame(node, node.name, symbol_id, state, position, record)
+                                for node, (state, symbol_id, position, record) in zip(self.tree.children, stack[1:])]
+        if goto is None or goto[1] >= 0:
+            self.goto_symbol = self.production_list[goto[1]] if goto is not None else None
+        self.finish_parse_with_error() if error else self.finish_parse()
+        return self.parse_result()
+
+    def reuse_compiled(self, state: int) -> tuple[tuple, int, int] | None:
+        # reuse_subtree() for the engine, which takes the reused node as a goto with no production, see parse_compiled()
+        if not self.reuse_subtree(state):
+            return None
+        return (0, -1, self.goto_symbol.name, self.goto_symbol.symbol_id, 0), self.goto_position, self.goto_record
+
+    def python_engine(self) -> Callable[..., tuple[tuple | None, int, int, bool]]:
+        # the module is kept in the grammar cache, and only generated again when it isn't there
+        key: tuple[str, str] = (self.grammar.description, self.cache_name())
+        if key not in self.engines:
+            module: ModuleType | None = GrammarCache.load_module(*key)
+            if module is None or module.SYMBOLS != self.grammar.symbols.names:
+                source: str = self.make_python_engine()
+                GrammarCache.save_module(*key, source)
+                module = GrammarCache.load_module(*key)
+                if module is None:
+                    module = ModuleType(self.cache_name())
+                    exec(compile(source, f"<{self.cache_name()} engine>", 'exec'), module.__dict__)
+            self.engines[key] = module.parse
+        return self.engines[key]
+
+    def make_python_engine(self) -> str:
+        # The action and goto rows of each state as one dict from symbol id to (1, state) for a shift, or to
+        # (action code, rule index, name, symbol id, length) for a reduction, and a loop making the same moves as
+        # do_action() with them. The nodes on the stack are the last children of the tree, like in reduce_nodes().
+        shift, reduce, shift_reduce = map(self.action_codes.index, (self.Actions.Shift, self.Actions.Reduce,
+                                                                    self.Actions.ShiftReduce))
+        first_terminal: int = len(self.grammar.symbols.nonterminals)
+
+        def entry(value: int) -> str:
+            if value & 3 == shift:
+                return f"({shift}, {value >> 2})"
+            production: SLRTableParser.Production = self.production_list[(value >> 2) - 1]
+            return f"({value & 3}, {(value >> 2) - 1}, {production.name!r}, {production.symbol_id}, " \
+                   f"{production.right_side_len})"
+
+        code: list[str] = [f"# {type(self).__name__} engine, generated by make_python_engine()", '',
+                           f"SYMBOLS = {self.grammar.symbols.names!r}", '', 'STATES = [']
+        for state, (action_row, goto_row) in enumerate(zip(self.action_table.rows(), self.goto_table.rows())):
+            cells: list[str] = [f"{symbol_id}: {entry(value)}" for symbol_id, value in enumerate(goto_row)
+                                if value and symbol_id > 0]
+            cells += [f"{column + first_terminal}: {entry(value)}" for column, value in enumerate(action_row) if value]
+            code.append(f"    {{{', '.join(cells)}}},  # {state}")
+        code += [']', '', '', f'''\
+def parse(stack, goto, goto_position, goto_record, tree, stream, Tree, records, reuse):
+    # stack holds (state, symbol id, first token, record) for each frame, goto the reduction waiting for its goto.
+    # records gets the record of each reduction if it isn't None, reuse(state) takes a subtree from the last parse if
+    # it isn't None, and returns it as the goto, its first token, and its record.
+    nodes = tree.children
+    peek, advance = stream.peek, stream.advance
+    while True:
+        state = stack[-1][0]
+        if goto is None:
+            token = peek()
+            symbol = token.symbol_id if token is not None else stack[-1][1]
+            if state == 0 and (token is None or symbol == {self.production_list[0].symbol_id}):
+                return goto, goto_position, goto_record, False
+            if reuse is not None:
+                reused = reuse(state)
+                if reused is not None:
+                    goto, goto_position, goto_record = reused
+                    continue
+        else:
+            symbol = goto[3]
+            if state == 0 and symbol == {self.production_list[0].symbol_id}:
+                return goto, goto_position, goto_record, False
+        action = STATES[state].get(symbol)
+        if action is None:
+            return goto, goto_position, goto_record, True
+
+        if action[0] == {shift}:
+            if goto is None:
+                position = stream.position
+                advance()
+                nodes.append(Tree(token.name, tree))
+                stack.append((action[1], symbol, position, -1))
+            else:
+                stack.append((action[1], symbol, goto_position, goto_record))
+                goto = None
+            continue
+
+        length = action[4]
+        shifted = None
+        if action[0] == {reduce}:
+            frames = count = length
+            position = stream.position
+        elif goto is not None:
+            frames, count = length - 1, length
+            position = goto_position
+        else:
+            position = stream.position
+            shifted = advance().name
+            frames = count = length - 1
+        first = -1
+        if frames:
+            for frame in stack[len(stack) - frames:]:
+                if frame[3] >= 0:
+                    first = frame[3]
+                    break
+            position = stack[len(stack) - frames][2]
+            del stack[len(stack) - frames:]
+        if first < 0 and count > frames:
+            first = goto_record
+        children = nodes[len(nodes) - count:]
+        del nodes[len(nodes) - count:]
+        node = Tree(action[2], tree, children)
+        nodes.append(node)
+        if shifted is not None:
+            node.children.append(Tree(shifted, node))
+        if records is not None:
+            goto_record = records.add(node, position, stream.position, stack[-1][0],
+                                      records.firsts[first] if first >= 0 else -1)
+        goto, goto_position = action, position''']
+        return '\n'.join(code) + '\n'
+
     def reset(self) -> None:
         self.reset_parser_attributes()
         self.reset_table_highlights()
         self.reset_highlighted_line()
-        self.tree_is_first_in_token_stream = False
+        self.goto_symbol = None
+        self.goto_position = 0
+        self.goto_record = -1
+
+    def input_is_empty(self) -> bool:
+        return self.goto_symbol is None and self.token_stream.peek() is None
+
+    def lookahead_symbol_id(self) -> int:
+        # the reduced nonterminal if there is one, otherwise the next token, and once the input runs out the last
+        # symbol that was shifted (the eof token)
+        if self.goto_symbol is not None:
+            return self.goto_symbol.symbol_id
+        token: Grammar.Token | None = self.token_stream.peek()
+        return token.symbol_id if token is not None else self.parse_stack[-1].symbol_id
 
     def next_row(self) -> int:
         return self.parse_stack[-1].state
 
     def next_col(self) -> int:
-        return self.symbol_list.index(self.token_stream[0].name if self.token_stream else self.parse_stack[-1].symbol)
+        return self.symbol_column(self.lookahead_symbol_id())
 
     def next_rule(self) -> SLRTableParser.TableEntry:
-        return self.table[self.next_row()][self.next_col()]
+        symbol_id: int = self.lookahead_symbol_id()
+        if self.grammar.symbols.is_terminal(symbol_id):
+            column: int = self.grammar.symbols.terminal_index(symbol_id)
+            return self.TableEntry(self.action_table.get(self.next_row(), column))
+        return self.TableEntry(self.goto_table.get(self.next_row(), symbol_id) if symbol_id > 0 else 0)
+
+    @staticmethod
+    def symbol_column(symbol_id: int) -> int:
+        # the column shown in the table: the start symbol has id 0 and no column of its own, unknown symbols have no
+        # column either
+        return symbol_id - 1 if symbol_id > 0 else -1
 
     def start_parse(self) -> None:
-        self.tree = self.current_node = Tree('')
-        self.parse_stack.append(self.ParseStackFrame(self.tree, '', 0))
+        self.tree = self.current_node = self.new_tree('')
+        self.parse_stack.append(self.ParseStackFrame(self.tree, '', -1, 0))
 
     def do_action(self) -> None:
+        if self.reusable and self.goto_symbol is None and self.reuse_subtree(self.parse_stack[-1].state):
+            return
         self.highlight_row(self.next_row())
         self.highlight_col(self.next_col())
-        match self.next_rule().action:
+        entry: SLRTableParser.TableEntry = self.next_rule()
+        match entry.action:
             case self.Actions.Shift:
-                self.shift(self.next_rule().target)
+                self.shift(entry.target)
             case self.Actions.Reduce:
-                self.reduce(self.next_rule().target)
+                self.reduce(entry.target)
             case self.Actions.ShiftReduce:
-                self.shift_reduce(self.next_rule().target)
+                self.shift_reduce(entry.target)
             case _:
                 self.finish_parse_with_error()
 
     def shift(self, rule_target: int) -> None:
-        self.current_node = (
-            self.tree[-1] if self.tree_is_first_in_token_stream else self.tree.add_child(self.token_stream[0].name))
-        self.parse_stack.append(self.ParseStackFrame(self.current_node, self.token_stream[0].name, rule_target))
-        self.token_stream.pop(0)
-        self.tree_is_first_in_token_stream = False
+        # shifting a reduced nonterminal is the goto, its node is already the last one in the tree
+        if self.goto_symbol is not None:
+            self.current_node = self.tree[-1]
+            self.parse_stack.append(self.ParseStackFrame(self.current_node, self.goto_symbol.name,
+                                                         self.goto_symbol.symbol_id, rule_target, self.goto_position,
+                                                         self.goto_record))
+            self.goto_symbol = None
+        else:
+            position: int = self.token_stream.position
+            token: Grammar.Token = self.token_stream.advance()
+            self.current_node = self.tree.add_child(token.name)
+            self.parse_stack.append(
+                self.ParseStackFrame(self.current_node, token.name, token.symbol_id, rule_target, position))
 
     def reduce(self, rule_target: int) -> None:
         self.set_scroll_bar_to_line(rule_target)
         self.set_highlighted_line(rule_target)
-        production = self.production_list[rule_target-1]
-        self.token_stream.insert(0, self.grammar.Token(production.name))
-        self.tree_is_first_in_token_stream = True
-        popped_nodes: list[Tree] = []
-        for _ in range(production.right_side_len):
-            self.parse_stack.pop()
-            popped_nodes.insert(0, self.tree.remove_last_child())
-        self.current_node = self.tree.add_child(production.name, children_list=popped_nodes)
+        production: SLRTableParser.Production = self.production_list[rule_target-1]
+        self.reduce_nodes(production, production.right_side_len, production.right_side_len,
+                          self.token_stream.position)
 
     def shift_reduce(self, rule_target: int) -> None:
-        current_symbol: str = self.token_stream[0].name
         self.set_scroll_bar_to_line(rule_target)
         self.set_highlighted_line(rule_target)
-        self.token_stream.pop(0)
-        production = self.production_list[rule_target-1]
-        self.token_stream.insert(0, self.grammar.Token(production.name))
-        popped_nodes: list[Tree] = []
-        for _ in range(production.right_side_len - 1):
-            self.parse_stack.pop()
-            popped_nodes.insert(0, self.tree.remove_last_child())
-        if self.tree_is_first_in_token_stream:
-            popped_nodes.insert(0, self.tree.remove_last_child())
-            self.current_node = self.tree.add_child(production.name, children_list=popped_nodes)
+        production: SLRTableParser.Production = self.production_list[rule_target-1]
+        if self.goto_symbol is not None:
+            # the last symbol of the rule is the reduced nonterminal, which never made it onto the stack
+            self.reduce_nodes(production, production.right_side_len - 1, production.right_side_len,
+                              self.goto_position)
         else:
-            self.current_node = self.tree.add_child(production.name, children_list=popped_nodes)
-            self.current_node.add_child(current_symbol)
-        self.tree_is_first_in_token_stream = True
+            position: int = self.token_stream.position
+            symbol: str = self.token_stream.advance().name
+            stacked: int = production.right_side_len - 1
+            self.reduce_nodes(production, stacked, stacked, position).add_child(symbol)
+
+    def reduce_nodes(self, production: SLRTableParser.Production, frames: int, nodes: int, position: int) -> Tree:
+        # The last nodes of the tree are the nodes on the top of the stack, so both are cut off with a slice. position
+        # is where the new node starts if none of the reduced symbols are on the stack.
+        popped: list[SLRTableParser.ParseStackFrame] = self.parse_stack[len(self.parse_stack) - frames:]
+        del self.parse_stack[len(self.parse_stack) - frames:]
+        children: list[Tree] = self.tree.remove_last_children(nodes)
+        self.current_node = self.tree.add_child(production.name, children_list=children)
+        if self.reuse_subtrees:
+            records: list[int] = [frame.record for frame in popped if frame.record >= 0]
+            if nodes > frames and self.goto_record >= 0:
+                records.append(self.goto_record)
+            self.goto_record = self.records.add(
+                self.current_node, popped[0].position if popped else position, self.token_stream.position,
+                self.parse_stack[-1].state, self.records.firsts[records[0]] if records else -1)
+        self.goto_position = popped[0].position if popped else position
+        self.goto_symbol = production
+        return self.current_node
+
+    def reuse_subtree(self, state: int) -> bool:
+        # A node from the last parse that was started in the state on top of the stack, and whose tokens and lookahead
+        # are all unchanged, is what reducing all over again would build, so it is taken as if it was just reduced.
+        reused: tuple[int, int] | None = self.reused_records.reusable(
+            self.token_stream.position, state, self.reused_change)
+        if reused is None:
+            return False
+        record, shift = reused
+        self.current_node = self.reused_records.nodes[record]
+        self.tree.add_subtree(self.current_node)
+        self.goto_position = self.token_stream.position
+        self.token_stream.skip(self.reused_records.ends[record] + shift - self.goto_position)
+        self.goto_record = self.records.copy_subtree(self.reused_records, record, shift)
+        self.goto_symbol = self.Production(
+            self.current_node.name, self.grammar.symbols.nonterminal_ids[self.current_node.name], 0)
+        return True
 
     def finish_parse_with_error(self) -> None:
         self.current_node = self.tree.add_child("ERROR")
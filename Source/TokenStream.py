@@ -0,0 +1,237 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+
+from Grammar import Grammar
+
+
+class TokenStream:
+    # Tokens read through a cursor, pulled from the source as they are needed. They are stored in columns, so a token
+    # costs a few array entries and two references instead of an object, and are only turned back into Token objects
+    # when they are read. Positions count tokens from the start of the input. Tokens behind the cursor are kept so the
+    # stream can be rewound, unless keep_read is off, in which case only the tokens from the oldest mark on are kept.
+    # Tokens lexed from a str remember it in code, so that an edited version of it can be lexed again incrementally.
+    # Their text is stored as None instead of the code, and their offsets from gap on are stored counted back from
+    # the end of the code. An edit moves the gap to the change, so the tokens in front of it and behind it keep their
+    # offsets as they are, and only the tokens between the old place of the gap and the change have theirs converted.
+
+    def __init__(self, tokens: Iterable[Grammar.Token], keep_read: bool = True, code: str | None = None) -> None:
+        self.source: Iterator[Grammar.Token] = iter(tokens)
+        self.code: str | None = code
+        self.names: list[str] = []
+        self.texts: list[str] = []
+        self.symbol_ids: array[int] = array('i')
+        self.starts: array[int] = array('q')
+        self.ends: array[int] = array('q')
+        self.gap: int = 0  # the first token whose offsets are counted from the end of the code
+        self.carried: int = 0  # the number of tokens that carry their own text
+        self.keep_read: bool = keep_read
+        self.start: int = 0  # position of the first stored token
+        self.position: int = 0
+        self.marks: list[int] = []
+        self.peeked: Grammar.Token | None = None  # the last token peeked at, the parsers look at the same one often
+        self.peeked_position: int = -1
+
+    def __len__(self) -> int:
+        # the number of stored tokens
+        return len(self.names)
+
+    def read(self, count: int = -1) -> int:
+        # stores up to count more tokens from the source, all of them if count is negative, and returns how many
+        stored: int = len(self.names)
+        for token in self.source if count < 0 else (next(self.source, None) for _ in range(count)):
+            if token is None:
+                break
+            self.names.append(token.name)
+            self.symbol_ids.append(token.symbol_id)
+            if token.text is self.code:
+                self.texts.append(None)
+                self.starts.append(token.start - len(self.code))
+                self.ends.append(token.end - len(self.code))
+            else:
+                self.texts.append(token.text)
+                self.starts.append(token.start)
+                self.ends.append(token.end)
+                self.carried += 1
+        return len(self.names) - stored
+
+    def token(self, index: int) -> Grammar.Token:
+        if self.texts[index] is not None:
+            return Grammar.Token(self.names[index], self.texts[index], self.symbol_ids[index], self.starts[index],
+                                 self.ends[index])
+        return Grammar.Token(self.names[index], self.code, self.symbol_ids[index], self.offset(self.starts, index),
+                             self.offset(self.ends, index))
+
+    def image(self, index: int) -> str:
+        # the image of the token, without building it
+        if self.texts[index] is not None:
+            return self.texts[index][self.starts[index]:self.ends[index]]
+        return self.code[self.offset(self.starts, index):self.offset(self.ends, index)]
+
+    def offset(self, column: array[int], index: int) -> int:
+        # the offset into the code of a token lexed from it, out of the starts or the ends
+        return column[index] + len(self.code) if index >= self.gap else column[index]
+
+    def find(self, column: array[int], offset: int, low: int, high: int) -> int:
+        # bisect_left() for an offset into the code over the tokens in [low, high), which are all lexed from it
+        if low < self.gap:
+            index: int = bisect_left(column, offset, low, min(high, self.gap))
+            if index < min(high, self.gap):
+                return index
+        return bisect_left(column, offset - len(self.code), max(low, self.gap), high)
+
+    def move_gap(self, gap: int, length: int) -> None:
+        # Moves the gap to another token, converting the offsets of the tokens it passes. length is the length of the
+        # code the offsets behind the gap are counted back from.
+        if gap < self.gap:
+            self.starts[gap:self.gap] = array('q', map((-length).__add__, self.starts[gap:self.gap]))
+            self.ends[gap:self.gap] = array('q', map((-length).__add__, self.ends[gap:self.gap]))
+        else:
+            self.starts[self.gap:gap] = array('q', map(length.__add__, self.starts[self.gap:gap]))
+            self.ends[self.gap:gap] = array('q', map(length.__add__, self.ends[self.gap:gap]))
+        self.gap = gap
+
+    def peek(self, ahead: int = 0) -> Grammar.Token | None:
+        if self.position + ahead == self.peeked_position:
+            return self.peeked
+        index: int = self.position - self.start + ahead
+        if index >= len(self.names):
+            self.read(index - len(self.names) + 1)
+            if index >= len(self.names):
+                return None
+        self.peeked, self.peeked_position = self.token(index), self.position + ahead
+        return self.peeked
+
+    def advance(self) -> Grammar.Token:
+        token: Grammar.Token | None = self.peek()
+        if token is None:
+            raise IndexError("There are no tokens left")
+        self.position += 1
+        if not self.keep_read:
+            self.forget_read()
+        return token
+
+    def skip(self, count: int) -> None:
+        # moves the cursor past count tokens without building them
+        index: int = self.position - self.start + count
+        if index > len(self.names):
+            self.read(index - len(self.names))
+        self.position = min(self.position + count, self.start + len(self.names))
+        if not self.keep_read:
+            self.forget_read()
+
+    def mark(self) -> int:
+        self.marks.append(self.position)
+        return self.position
+
+    def release(self, mark: int) -> None:
+        self.marks.remove(mark)
+
+    def rewind(self, mark: int = 0) -> None:
+        if mark < self.start:
+            raise ValueError(f"Tokens before position {self.start} are no longer kept")
+        self.position = mark
+
+    def remaining(self) -> Iterator[Grammar.Token]:
+        # the tokens from the cursor on that have been read from the source so far
+        return map(self.token, range(self.position - self.start, len(self.names)))
+
+    def forget_read(self) -> None:
+        # dropped in batches so that the columns aren't shifted on every token
+        dropped: int = min(self.marks, default=self.position) - self.start
+        if dropped * 2 >= len(self.names):
+            for column in (self.names, self.texts, self.symbol_ids, self.starts, self.ends):
+                del column[:dropped]
+            self.start += dropped
+            self.gap = max(self.gap - dropped, 0)
+
+    def edit(self, grammar: Grammar, code: str) -> tuple[int, int, int]:
+        # Replaces the tokens with those of code, an edited version of self.code, and rewinds. Only the tokens around
+        # the changed text are lexed again: lexing restarts a couple of tokens in front of it, in case one of them
+        # looked ahead into it, and stops at the first new token past it that lines up with an old one, since from
+        # there on the old tokens are the new ones moved by the change in length. Returns (first, end, shift): the
+        # tokens in [first, end) are new, and every token from end on is the old token shift positions before it.
+        old: str | None = self.code
+        self.read()
+        count: int = len(self.names) - 1  # the eof token at the end doesn't point into the code
+        if old is None or self.start != 0 or count < 0 or self.carried != 1:
+            # text was carried into some tokens, so their offsets aren't offsets into the code
+            old_count: int = len(self.names)
+            self.__init__(grammar.tokens(code), code=code)
+            self.read()
+            return 0, len(self.names), len(self.names) - old_count
+
+        prefix: int = self.common_prefix(old, code)
+        suffix: int = self.common_suffix(old, code, min(len(old), len(code)) - prefix)
+        delta: int = len(code) - len(old)
+        changed_end: int = len(code) - suffix
+        first: int = max(self.find(self.ends, prefix, 0, count) - 2, 0)
+        self.move_gap(first, len(old))  # the tokens from first on keep their offsets from the end, which didn't move
+        relexed: list[Grammar.Token] = []
+        synced: int = len(self.names)  # the first old token that is kept
+        for token in grammar.tokens(code, position=self.offset(self.ends, first - 1) if first else 0):
+            if token.text is code and token.start >= changed_end:
+                old_index: int = self.find(self.starts, token.start - delta, first, count)
+                if (old_index < count and self.offset(self.starts, old_index) == token.start - delta and
+                        self.offset(self.ends, old_index) == token.end - delta and self.names[old_index] == token.name):
+                    synced = old_index
+                    break
+            relexed.append(token)
+
+        self.carried -= sum(text is not None for text in self.texts[first:synced])
+        texts: list[str | None] = [None if token.text is code else token.text for token in relexed]
+        self.carried += len(texts) - texts.count(None)
+        self.names[first:synced] = [token.name for token in relexed]
+        self.symbol_ids[first:synced] = array('i', [token.symbol_id for token in relexed])
+        self.texts[first:synced] = texts
+        self.starts[first:synced] = array('q', [token.start - len(code) if text is None else token.start
+                                                for token, text in zip(relexed, texts)])
+        self.ends[first:synced] = array('q', [token.end - len(code) if text is None else token.end
+                                              for token, text in zip(relexed, texts)])
+        self.code = code
+        self.source = iter(())
+        self.position = 0
+        self.marks.clear()
+        self.peeked, self.peeked_position = None, -1
+        return first, first + len(relexed), first + len(relexed) - synced
+
+    @staticmethod
+    def common_prefix(first: str, second: str, block: int = 4096) -> int:
+        # compared a block at a time, so the strings are only walked a character at a time inside the last block
+        length: int = min(len(first), len(second))
+        position: int = 0
+        while position < length and first[position:position + block] == second[position:position + block]:
+            position += block
+        while position < length and first[position] == second[position]:
+            position += 1
+        return position
+
+    @staticmethod
+    def common_suffix(first: str, second: str, limit: int, block: int = 4096) -> int:
+        length: int = 0
+        while length + block <= limit and first[len(first) - length - block:len(first) - length] == \
+                second[len(second) - length - block:len(second) - length]:
+            length += block
+        while length < limit and first[len(first) - length - 1] == second[len(second) - length - 1]:
+            length += 1
+        return length
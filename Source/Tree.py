@@ -17,22 +17,60 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 from __future__ import annotations
+from collections import deque
+from collections.abc import Iterator
 
 
-class Tree:
+class BaseTree:
+    # What Tree has in common with the views of a TreeArena, which keep the fields of a node in the arena instead.
+    # It has no fields itself, so that neither of them gets a __dict__.
+    __slots__ = ()
+
+    def __len__(self) -> int:
+        return self.number_of_children
+
+    # The walks keep their own stack, so they don't run into the recursion limit on trees that are thousands of
+    # levels deep, which right recursive rules make out of long programs.
+
+    def preorder(self) -> Iterator[Tree]:
+        stack: list[Tree] = [self]
+        while stack:
+            node: Tree = stack.pop()
+            yield node
+            stack += reversed(node.children)
+
+    def postorder(self) -> Iterator[Tree]:
+        stack: list[tuple[Tree, bool]] = [(self, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done:
+                yield node
+            else:
+                stack.append((node, True))
+                stack += ((child, False) for child in reversed(node.children))
+
+    def level_order(self) -> Iterator[Tree]:
+        queue: deque[Tree] = deque([self])
+        while queue:
+            node: Tree = queue.popleft()
+            yield node
+            queue += node.children
+
+
+class Tree(BaseTree):
+    __slots__ = ('name', 'parent', 'children', 'changed')
+
     def __init__(self, name: str, parent: Tree = None, children_list: list[Tree] = None) -> None:
         self.name = name
         self.parent: Tree | None = parent
         self.children: list[Tree] = [] if children_list is None else children_list
+        self.changed: bool = True  # whether the node, or a node under it, is new or got new children since last layout
         for child in self.children:
             child.parent = self
 
     def __getitem__(self, item: int) -> Tree:
         return self.children[item]
 
-    def __len__(self) -> int:
-        return self.number_of_children
-
     @property
     def number_of_children(self) -> int:
         return len(self.children)
@@ -40,9 +78,38 @@ class Tree:
     def add_child(self, name: str, index: int = -1, children_list: list[Tree] = None) -> Tree:
         child = Tree(name, self, children_list)
         if index < 0:
-            index = len(self)
-        self.children.insert(index, child)
+            self.children.append(child)
+        else:
+            self.children.insert(index, child)
+        self.mark_changed()
         return child
 
+    def add_subtree(self, node: Tree) -> None:
+        # puts a node made elsewhere, with everything under it, after the children of this one
+        self.children.append(node)
+        node.parent = self
+        self.mark_changed()
+
+    def replace_with(self, node: Tree) -> None:
+        # puts a node made elsewhere where this one is among the children of its parent, or makes it a root like this
+        if self.parent is not None:
+            self.parent.children[self.parent.children.index(self)] = node
+            self.parent.mark_changed()
+        node.parent = self.parent
+
     def remove_last_child(self) -> Tree:
+        self.mark_changed()
         return self.children.pop()
+
+    def remove_last_children(self, count: int) -> list[Tree]:
+        removed: list[Tree] = self.children[len(self.children) - count:]
+        del self.children[len(self.children) - count:]
+        self.mark_changed()
+        return removed
+
+    def mark_changed(self) -> None:
+        # the ancestors of a changed node are always marked as well, so marking stops at the first one that already is
+        node: Tree | None = self
+        while node is not None and not node.changed:
+            node.changed = True
+            node = node.parent
@@ -0,0 +1,349 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+from __future__ import annotations
+from array import array
+from collections.abc import Iterable, Iterator, MutableSequence
+
+from Tree import BaseTree, Tree
+
+
+class TreeArena:
+    # A whole tree kept in parallel columns of ints, indexed by node number, instead of an object and a list of
+    # children per node. The children of a node are linked through next_sibling and prev_sibling, from first_child to
+    # last_child, -1 meaning there is none, and counted in child_count. Node names are interned into labels, so each
+    # one is only stored once. Nodes are handed out as Node views, which the parsers, the layouts and the window use
+    # like any other Tree.
+
+    class Node(BaseTree):
+        # A view of one node, with the methods and properties of Tree. Views are made whenever a node is asked for and
+        # only hold the arena and the index of the node, so two views of the same node are equal, but aren't the same
+        # object.
+        __slots__ = ('arena', 'index')
+
+        def __init__(self, arena: TreeArena, index: int) -> None:  # the fields of Tree are read from the arena
+            self.arena: TreeArena = arena
+            self.index: int = index
+
+        def __eq__(self, other: object) -> bool:
+            return isinstance(other, TreeArena.Node) and other.index == self.index and other.arena is self.arena
+
+        def __hash__(self) -> int:
+            return hash((id(self.arena), self.index))
+
+        @property
+        def name(self) -> str:
+            return self.arena.labels[self.arena.label[self.index]]
+
+        @name.setter
+        def name(self, name: str) -> None:
+            self.arena.label[self.index] = self.arena.label_id(name)
+
+        @property
+        def parent(self) -> TreeArena.Node | None:
+            parent: int = self.arena.parent[self.index]
+            return None if parent < 0 else TreeArena.Node(self.arena, parent)
+
+        @property
+        def children(self) -> TreeArena.Children:
+            return TreeArena.Children(self.arena, self.index)
+
+        @children.setter
+        def children(self, children: Iterable[Tree]) -> None:
+            self.children[:] = children
+
+        @property
+        def changed(self) -> bool:
+            return bool(self.arena.changed[self.index])
+
+        @changed.setter
+        def changed(self, changed: bool) -> None:
+            self.arena.changed[self.index] = changed
+
+        def __iter__(self) -> Iterator[TreeArena.Node]:
+            return iter(self.children)
+
+        def __getitem__(self, item: int) -> TreeArena.Node:
+            return self.children[item]
+
+        @property
+        def number_of_children(self) -> int:
+            return self.arena.child_count[self.index]
+
+        def add_child(self, name: str, index: int = -1, children_list: list[Tree] = None) -> TreeArena.Node:
+            grandchildren: list[int] = [self.arena.own(grandchild) for grandchild in children_list or ()]
+            child: int = self.arena.add(name, self.index, index)
+            for grandchild in grandchildren:
+                self.arena.unlink(grandchild)
+                self.arena.link(grandchild, child, -1)
+            self.mark_changed()
+            return TreeArena.Node(self.arena, child)
+
+        def add_subtree(self, node: Tree) -> None:
+            self.children.append(node)
+            self.mark_changed()
+
+        def replace_with(self, node: Tree) -> None:
+            new: int = self.arena.own(node)
+            if new == self.index:
+                return
+            self.arena.unlink(new)
+            parent: int = self.arena.parent[self.index]
+            if parent >= 0:
+                after: int = self.arena.prev_sibling[self.index]
+                self.arena.unlink(self.index)
+                self.arena.link_after(new, parent, after)
+                TreeArena.Node(self.arena, parent).mark_changed()
+
+        def mark_changed(self) -> None:
+            node: int = self.index
+            while node >= 0 and not self.arena.changed[node]:
+                self.arena.changed[node] = True
+                node = self.arena.parent[node]
+
+        def remove_last_child(self) -> TreeArena.Node:
+            return self.remove_last_children(1)[0]
+
+        def remove_last_children(self, count: int) -> list[TreeArena.Node]:
+            removed: list[int] = []
+            while len(removed) < count and self.arena.last_child[self.index] >= 0:
+                removed.append(self.arena.last_child[self.index])
+                self.arena.unlink(removed[-1])
+            self.mark_changed()
+            return [TreeArena.Node(self.arena, node) for node in reversed(removed)]
+
+    class Children(MutableSequence):
+        # The children of a node as a list, read from and written to the arena, so the code that works on the children
+        # list of a Tree works on it too. As with that list, changing it doesn't mark the node changed. A node can only
+        # be in one place in the arena, so putting one in that is already somewhere else, here or under another node,
+        # moves it, where a list would hold it twice. Only nodes of the same arena can be put in.
+        __slots__ = ('arena', 'node')
+
+        def __init__(self, arena: TreeArena, node: int) -> None:
+            self.arena: TreeArena = arena
+            self.node: int = node  # whose children they are
+
+        def __len__(self) -> int:
+            return self.arena.child_count[self.node]
+
+        def __iter__(self) -> Iterator[TreeArena.Node]:
+            child: int = self.arena.first_child[self.node]
+            while child >= 0:
+                yield TreeArena.Node(self.arena, child)
+                child = self.arena.next_sibling[child]
+
+        def __reversed__(self) -> Iterator[TreeArena.Node]:
+            child: int = self.arena.last_child[self.node]
+            while child >= 0:
+                yield TreeArena.Node(self.arena, child)
+                child = self.arena.prev_sibling[child]
+
+        def __contains__(self, node: object) -> bool:
+            return isinstance(node, TreeArena.Node) and node.arena is self.arena and \
+                self.arena.parent[node.index] == self.node
+
+        def __eq__(self, other: object) -> bool:
+            if isinstance(other, TreeArena.Children):
+                other = list(other)
+            return isinstance(other, list) and list(self) == other
+
+        def position(self, index: int) -> int:
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("child index out of range")
+            return index
+
+        def span(self, item: slice) -> list[int]:
+            # the children a slice takes, walked to from the nearer end of the list
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                every: list[int] = [node.index for node in self]
+                return every[item]
+            children: list[int] = []
+            child: int = self.arena.child_at(self.node, start) if start < stop else -1
+            for _ in range(stop - start):
+                children.append(child)
+                child = self.arena.next_sibling[child]
+            return children
+
+        def __getitem__(self, item: int | slice) -> TreeArena.Node | list[TreeArena.Node]:
+            if isinstance(item, slice):
+                return [TreeArena.Node(self.arena, child) for child in self.span(item)]
+            return TreeArena.Node(self.arena, self.arena.child_at(self.node, self.position(item)))
+
+        def __setitem__(self, item: int | slice, value: Tree | Iterable[Tree]) -> None:
+            if isinstance(item, slice):
+                nodes: list[int] = [self.arena.own(node) for node in value]
+                start, _, step = item.indices(len(self))
+                if step != 1:
+                    raise ValueError("children can only be put in a slice with a step of 1")
+                del self[item]
+                for node in nodes:
+                    self.arena.unlink(node)
+                start = min(start, len(self))
+                after: int = self.arena.child_at(self.node, start - 1) if start > 0 else -1
+                for node in nodes:
+                    self.arena.link_after(node, self.node, after)
+                    after = node
+                return
+            new: int = self.arena.own(value)
+            old: int = self.arena.child_at(self.node, self.position(item))
+            if new == old:
+                return
+            self.arena.unlink(new)
+            after = self.arena.prev_sibling[old]
+            self.arena.unlink(old)
+            self.arena.link_after(new, self.node, after)
+
+        def __delitem__(self, item: int | slice) -> None:
+            children: list[int] = self.span(item) if isinstance(item, slice) else \
+                [self.arena.child_at(self.node, self.position(item))]
+            for child in children:
+                self.arena.unlink(child)
+
+        def insert(self, index: int, value: Tree) -> None:
+            node: int = self.arena.own(value)
+            self.arena.unlink(node)
+            self.arena.link(node, self.node, max(index + len(self), 0) if index < 0 else index)
+
+        def append(self, value: Tree) -> None:
+            node: int = self.arena.own(value)
+            self.arena.unlink(node)
+            self.arena.link(node, self.node, -1)
+
+        def index(self, value: object, start: int = 0, stop: int | None = None) -> int:
+            for i, child in enumerate(self):
+                if (stop is None or i < stop) and i >= start and child == value:
+                    return i
+            raise ValueError("the node isn't one of the children")
+
+        def reverse(self) -> None:
+            self[:] = list(reversed(self))
+
+    def __init__(self) -> None:
+        self.parent: array[int] = array('i')
+        self.first_child: array[int] = array('i')
+        self.last_child: array[int] = array('i')
+        self.next_sibling: array[int] = array('i')
+        self.prev_sibling: array[int] = array('i')
+        self.child_count: array[int] = array('i')
+        self.label: array[int] = array('i')
+        self.changed: bytearray = bytearray()
+        self.labels: list[str] = []
+        self.label_ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def label_id(self, name: str) -> int:
+        label: int | None = self.label_ids.get(name)
+        if label is None:
+            label = self.label_ids[name] = len(self.labels)
+            self.labels.append(name)
+        return label
+
+    def own(self, node: object) -> int:
+        # the index of a node that's put under one of the arena's nodes, which has to be one of them as well
+        if not isinstance(node, TreeArena.Node):
+            raise TypeError(f"Only nodes of a TreeArena can be put under its nodes, not {type(node).__name__}.")
+        if node.arena is not self:
+            raise ValueError("The node is in another TreeArena.")
+        return node.index
+
+    def add_root(self, name: str) -> TreeArena.Node:
+        return TreeArena.Node(self, self.add(name, -1, -1))
+
+    def new_node(self, name: str, parent: Tree | None = None, children_list: list[Tree] | None = None) \
+            -> TreeArena.Node:
+        # The Tree constructor for the arena, which the loops of parse_all() make nodes with. As with Tree, the node
+        # isn't put among the children of parent, the caller does that, and since a node in the arena only has the
+        # parent it's linked under, it has none until then. The nodes in children_list are moved under it.
+        children: list[int] = [self.own(child) for child in children_list or ()]
+        node: int = self.add(name, -1, -1)
+        for child in children:
+            self.unlink(child)
+            self.link(child, node, -1)
+        return TreeArena.Node(self, node)
+
+    def add(self, name: str, parent: int, index: int) -> int:
+        # a new node, put among the children of parent at index, or after them if index is negative
+        node: int = len(self.parent)
+        self.parent.append(-1)
+        self.first_child.append(-1)
+        self.last_child.append(-1)
+        self.next_sibling.append(-1)
+        self.prev_sibling.append(-1)
+        self.child_count.append(0)
+        self.label.append(self.label_id(name))
+        self.changed.append(True)
+        if parent >= 0:
+            self.link(node, parent, index)
+        return node
+
+    def child_at(self, parent: int, index: int) -> int:
+        # the child at an index that's in range, walked to from whichever end of the children is nearer
+        count: int = self.child_count[parent]
+        if index <= count // 2:
+            child: int = self.first_child[parent]
+            for _ in range(index):
+                child = self.next_sibling[child]
+        else:
+            child = self.last_child[parent]
+            for _ in range(count - 1 - index):
+                child = self.prev_sibling[child]
+        return child
+
+    def link(self, node: int, parent: int, index: int) -> None:
+        if index < 0 or index >= self.child_count[parent]:
+            self.link_after(node, parent, self.last_child[parent])
+        else:
+            self.link_after(node, parent, self.prev_sibling[self.child_at(parent, index)])
+
+    def link_after(self, node: int, parent: int, after: int) -> None:
+        # puts a node that isn't linked anywhere among the children of parent, after the sibling after, or first if -1
+        before: int = self.first_child[parent] if after < 0 else self.next_sibling[after]
+        self.parent[node] = parent
+        self.prev_sibling[node] = after
+        self.next_sibling[node] = before
+        if after < 0:
+            self.first_child[parent] = node
+        else:
+            self.next_sibling[after] = node
+        if before < 0:
+            self.last_child[parent] = node
+        else:
+            self.prev_sibling[before] = node
+        self.child_count[parent] += 1
+
+    def unlink(self, node: int) -> None:
+        parent: int = self.parent[node]
+        if parent < 0:
+            return
+        after, before = self.prev_sibling[node], self.next_sibling[node]
+        if after < 0:
+            self.first_child[parent] = before
+        else:
+            self.next_sibling[after] = before
+        if before < 0:
+            self.last_child[parent] = after
+        else:
+            self.prev_sibling[before] = after
+        self.child_count[parent] -= 1
+        self.parent[node] = self.prev_sibling[node] = self.next_sibling[node] = -1
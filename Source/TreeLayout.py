@@ -0,0 +1,320 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+from __future__ import annotations
+from collections.abc import Iterator
+from heapq import heapify, heappop, heappush
+
+from Tree import Tree
+
+
+class TreeLayout:
+    # Walker's tidy tree layout in linear time, as given by Buchheim, Jünger and Leipert. Nodes are one unit apart,
+    # parents are centered over their children, and subtrees are pushed apart by comparing their contours. Without
+    # compact_tree, nodes that aren't siblings are kept two units apart, so the subtrees are easier to tell apart. Like
+    # in Grid, the nameless root the LR parsers keep their stack under isn't drawn and its children form the top row.
+    #
+    # The layout is kept from one step of the parser to the next. Placing the children of a node against each other
+    # also changes nodes further down, where the contours of the subtrees meet, so each node logs the values it
+    # overwrote while doing it. When update() is called, the nodes marked as changed in the tree have their logs
+    # undone, which leaves the subtrees under them as they were on their own, and then only they are placed again.
+    # The second walk then only goes into the changed nodes and the nodes whose modifiers add up differently, and the
+    # extents of the layout are counted as nodes move, so the leftmost node is found without looking at the others.
+    # What an update moved is kept in moved and removed, for the window to only redraw those nodes.
+
+    class Node:
+        __slots__ = ('tree', 'parent', 'children', 'number', 'prelim', 'mod', 'change', 'shift', 'thread', 'ancestor',
+                     'default_ancestor', 'midpoint', 'log', 'x', 'offset', 'depth')
+
+        def __init__(self, tree: Tree) -> None:
+            self.tree: Tree = tree
+            self.parent: TreeLayout.Node | None = None
+            self.children: list[TreeLayout.Node] = []
+            self.number: int = 0  # the index among its siblings
+            self.prelim: float = 0
+            self.mod: float = 0
+            self.change: float = 0
+            self.shift: float = 0
+            self.thread: TreeLayout.Node | None = None
+            self.ancestor: TreeLayout.Node = self
+            self.default_ancestor: TreeLayout.Node | None = None
+            self.midpoint: float = 0  # between the first and last children, once they are placed
+            self.log: list[tuple] = []
+            self.x: float = 0  # from the second walk, before the layout is moved to x = 0
+            self.offset: float = 0  # the modifiers of the node and its ancestors, which its children are moved by
+            self.depth: int = -1  # -1 until the node is placed
+
+        def next_left(self) -> TreeLayout.Node | None:
+            return self.children[0] if self.children else self.thread
+
+        def next_right(self) -> TreeLayout.Node | None:
+            return self.children[-1] if self.children else self.thread
+
+    def __init__(self, tree: Tree, compact_tree: bool) -> None:
+        self.tree: Tree = tree
+        self.compact_tree: bool = compact_tree
+        self.nodes: dict[Tree, TreeLayout.Node] = {}
+        self.coords: dict[Tree, tuple[float, int]] = {}  # x as the second walk leaves it, before left is taken off
+        self.moved: set[Tree] = set()  # the drawn nodes the last update placed, or put under another parent
+        self.removed: list[Tree] = []  # the drawn nodes the last update took out
+        self.hidden: int = 0  # 1 if the root isn't drawn, which moves the other rows up by one
+        self.x_counts: dict[float, int] = {}  # how many nodes are at each x
+        self.lefts: list[float] = []  # heaps of the x in x_counts, and of their negations, which keep removed ones
+        self.rights: list[float] = []  # until they come out on top
+        self.row_counts: list[int] = []  # how many nodes are in each row
+        self.left: float = 0
+        self.width: int = 0
+        self.height: int = 0
+        self.update(tree, True)
+
+    def update(self, tree: Tree, full: bool = False) -> None:
+        # lays out the tree again, redoing only the nodes that changed since the last update, unless it's a new tree
+        if full or tree is not self.tree:
+            self.tree = tree
+            self.nodes = {}
+            self.coords = {}
+            self.hidden = 1 if tree.name == '' else 0
+            self.x_counts, self.lefts, self.rights, self.row_counts = {}, [], [], []
+        self.moved = set()
+        self.removed = []
+        changed: list[TreeLayout.Node] = self.changed_nodes()
+        for node in changed:  # parents before children
+            self.undo(node)
+        for node in reversed(changed):  # children before parents
+            self.place_children(node)
+        root: TreeLayout.Node = changed[0]
+        root.prelim = root.midpoint if root.children else 0
+        self.second_walk(changed)
+        self.measure()
+
+    def changed_nodes(self) -> list[TreeLayout.Node]:
+        # The changed nodes in preorder, starting from the root, which is always taken since the parsers that build the
+        # tree in one go don't mark it. Every node under a changed one is checked, and nodes seen for the first time
+        # are changed as well. Children that were taken off a changed node and not put under another one are removed.
+        root: TreeLayout.Node | None = self.nodes.get(self.tree)
+        if root is None:
+            root = self.nodes[self.tree] = self.Node(self.tree)
+        changed: list[TreeLayout.Node] = []
+        dropped: list[TreeLayout.Node] = []
+        stack: list[TreeLayout.Node] = [root]
+        while stack:
+            node: TreeLayout.Node = stack.pop()
+            changed.append(node)
+            node.tree.changed = False
+            dropped += node.children
+            node.children = []
+            for i, child_tree in enumerate(node.tree.children):
+                child: TreeLayout.Node | None = self.nodes.get(child_tree)
+                if child is None:
+                    child = self.nodes[child_tree] = self.Node(child_tree)
+                    stack.append(child)
+                elif child_tree.changed:
+                    stack.append(child)
+                if child.parent is not node:
+                    self.moved.add(child_tree)
+                child.parent = node
+                child.number = i
+                node.children.append(child)
+        for node in dropped:
+            parent: TreeLayout.Node = node.parent
+            if node.number >= len(parent.children) or parent.children[node.number] is not node:
+                self.remove(node)
+        return changed
+
+    def remove(self, root: TreeLayout.Node) -> None:
+        stack: list[TreeLayout.Node] = [root]
+        while stack:
+            node: TreeLayout.Node = stack.pop()
+            self.place(node, 0, 0, -1)
+            self.nodes.pop(node.tree, None)
+            stack += (child for child in node.children if child.parent is node)
+
+    @staticmethod
+    def undo(node: TreeLayout.Node) -> None:
+        for changed, attribute, value in reversed(node.log):
+            setattr(changed, attribute, value)
+        node.log = []
+        node.default_ancestor = None
+
+    def separation(self, left: TreeLayout.Node, right: TreeLayout.Node) -> float:
+        return 1 if self.compact_tree or left.parent is right.parent else 2
+
+    def place_children(self, node: TreeLayout.Node) -> None:
+        # The first walk of the algorithm for the children of one node, which is what it does between finishing the
+        # subtrees under them and placing the node over them.
+        log: list[tuple] = node.log
+        left_sibling: TreeLayout.Node | None = None
+        for child in node.children:
+            if left_sibling is not None:
+                log.append((child, 'prelim', child.prelim))
+                child.prelim = left_sibling.prelim + self.separation(child, left_sibling)
+                if child.children:
+                    log.append((child, 'mod', child.mod))
+                    child.mod = child.prelim - child.midpoint
+            elif child.children:
+                log.append((child, 'prelim', child.prelim))
+                child.prelim = child.midpoint
+            node.default_ancestor = self.apportion(child, left_sibling, node.default_ancestor or node.children[0], log)
+            left_sibling = child
+        if node.children:
+            self.execute_shifts(node, log)
+            node.midpoint = (node.children[0].prelim + node.children[-1].prelim) / 2
+
+    def apportion(self, node: TreeLayout.Node, left_sibling: TreeLayout.Node | None, ancestor: TreeLayout.Node,
+                  log: list[tuple]) -> TreeLayout.Node:
+        # walks down the right contour of the subtrees on the left and the left contour of this one, and moves this
+        # one right wherever they get too close
+        if left_sibling is None:
+            return ancestor
+        inner_right: TreeLayout.Node | None = node
+        outer_right: TreeLayout.Node = node
+        inner_left: TreeLayout.Node | None = left_sibling
+        outer_left: TreeLayout.Node = node.parent.children[0]
+        inner_right_mod, outer_right_mod = inner_right.mod, outer_right.mod
+        inner_left_mod, outer_left_mod = inner_left.mod, outer_left.mod
+        inner_left, inner_right = inner_left.next_right(), inner_right.next_left()
+        while inner_left is not None and inner_right is not None:
+            outer_left = outer_left.next_left()
+            outer_right = outer_right.next_right()
+            log.append((outer_right, 'ancestor', outer_right.ancestor))
+            outer_right.ancestor = node
+            shift: float = (inner_left.prelim + inner_left_mod - inner_right.prelim - inner_right_mod +
+                            self.separation(inner_left, inner_right))
+            if shift > 0:
+                self.move_subtree(inner_left.ancestor if inner_left.ancestor.parent is node.parent else ancestor,
+                                  node, shift, log)
+                inner_right_mod += shift
+                outer_right_mod += shift
+            inner_left_mod += inner_left.mod
+            inner_right_mod += inner_right.mod
+            outer_left_mod += outer_left.mod
+            outer_right_mod += outer_right.mod
+            inner_left, inner_right = inner_left.next_right(), inner_right.next_left()
+        if inner_left is not None and outer_right.next_right() is None:
+            log.append((outer_right, 'thread', outer_right.thread))
+            log.append((outer_right, 'mod', outer_right.mod))
+            outer_right.thread = inner_left
+            outer_right.mod += inner_left_mod - outer_right_mod
+        if inner_right is not None and outer_left.next_left() is None:
+            log.append((outer_left, 'thread', outer_left.thread))
+            log.append((outer_left, 'mod', outer_left.mod))
+            outer_left.thread = inner_right
+            outer_left.mod += inner_right_mod - outer_left_mod
+            ancestor = node
+        return ancestor
+
+    @staticmethod
+    def move_subtree(left: TreeLayout.Node, right: TreeLayout.Node, shift: float,
+                     log: list[tuple]) -> None:
+        # the subtrees between left and right get their share of the shift in execute_shifts()
+        change: float = shift / (right.number - left.number)
+        log += ((right, 'change', right.change), (right, 'shift', right.shift), (left, 'change', left.change),
+                (right, 'prelim', right.prelim), (right, 'mod', right.mod))
+        right.change -= change
+        right.shift += shift
+        left.change += change
+        right.prelim += shift
+        right.mod += shift
+
+    @staticmethod
+    def execute_shifts(node: TreeLayout.Node,
+                       log: list[tuple]) -> None:
+        shift: float = 0
+        change: float = 0
+        for child in reversed(node.children):
+            if shift:
+                log += ((child, 'prelim', child.prelim), (child, 'mod', child.mod))
+                child.prelim += shift
+                child.mod += shift
+            change += child.change
+            shift += child.shift + change
+
+    def second_walk(self, changed: list[TreeLayout.Node]) -> None:
+        # Adds up the modifiers on the way down. A node that isn't changed, and whose modifiers and depth add up as
+        # they did last time, has the subtree under it where it was, so the walk only goes into the changed nodes and
+        # the subtrees that were moved.
+        changed_set: set[TreeLayout.Node] = set(changed)
+        root: TreeLayout.Node = changed[0]
+        self.place(root, root.prelim, 0, 0)
+        stack: list[TreeLayout.Node] = [root]
+        while stack:
+            node: TreeLayout.Node = stack.pop()
+            for child in node.children:
+                offset: float = child.mod + node.offset
+                walk: bool = child in changed_set or child.offset != offset or child.depth != node.depth + 1
+                self.place(child, child.prelim + node.offset, offset, node.depth + 1)
+                if walk and child.children:
+                    stack.append(child)
+
+    def place(self, node: TreeLayout.Node, x: float, offset: float, depth: int) -> None:
+        # moves the node, keeping coords and the counts of the extents up to date, a depth of -1 takes it out
+        node.offset = offset
+        if x == node.x and depth == node.depth:
+            return
+        if node.depth >= self.hidden:
+            count: int = self.x_counts[node.x] - 1
+            if count:
+                self.x_counts[node.x] = count
+            else:
+                del self.x_counts[node.x]
+            self.row_counts[node.depth - self.hidden] -= 1
+            del self.coords[node.tree]
+            if depth < 0:
+                self.moved.discard(node.tree)
+                self.removed.append(node.tree)
+        node.x, node.depth = x, depth
+        if depth >= self.hidden:
+            if x not in self.x_counts:
+                self.x_counts[x] = 0
+                heappush(self.lefts, x)
+                heappush(self.rights, -x)
+            self.x_counts[x] += 1
+            if depth - self.hidden == len(self.row_counts):
+                self.row_counts.append(0)
+            self.row_counts[depth - self.hidden] += 1
+            self.coords[node.tree] = (x, depth - self.hidden)
+            self.moved.add(node.tree)
+
+    def measure(self) -> None:
+        # the leftmost node goes to x = 0
+        if not self.x_counts:
+            self.left = self.width = self.height = 0
+            return
+        if len(self.lefts) > 2 * len(self.x_counts) + 16:  # too many removed ones piled up
+            self.lefts = list(self.x_counts)
+            self.rights = [-x for x in self.x_counts]
+            heapify(self.lefts)
+            heapify(self.rights)
+        while self.lefts[0] not in self.x_counts:
+            heappop(self.lefts)
+        while -self.rights[0] not in self.x_counts:
+            heappop(self.rights)
+        while not self.row_counts[-1]:
+            self.row_counts.pop()
+        self.left = self.lefts[0]
+        self.width = int(-self.rights[0] - self.left) + 1
+        self.height = len(self.row_counts)
+
+    def items(self) -> Iterator[tuple[Tree, tuple[float, int]]]:
+        left: float = self.left
+        return ((node, (x - left, y)) for node, (x, y) in self.coords.items())
+
+    def get_coords(self, node: Tree) -> tuple[float, int]:
+        coords: tuple[float, int] | None = self.coords.get(node)
+        return (-1, -1) if coords is None else (coords[0] - self.left, coords[1])
@@ -217,6 +217,8 @@ class Ui_MainWindow(object):
         self.AlgorithmBox.addItem("")
         self.AlgorithmBox.addItem("")
         self.AlgorithmBox.addItem("")
+        self.AlgorithmBox.addItem("")
+        self.AlgorithmBox.addItem("")
         self.StackTabBottom.addWidget(self.AlgorithmBox)
         spacerItem3 = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Policy.Expanding, QtWidgets.QSizePolicy.Policy.Minimum)
         self.StackTabBottom.addItem(spacerItem3)
@@ -390,6 +392,8 @@ class Ui_MainWindow(object):
         self.AlgorithmBox.setItemText(0, _translate("MainWindow", "LL (Recursive Descent)"))
         self.AlgorithmBox.setItemText(1, _translate("MainWindow", "LL (Table)"))
         self.AlgorithmBox.setItemText(2, _translate("MainWindow", "SLR (Table)"))
+        self.AlgorithmBox.setItemText(3, _translate("MainWindow", "LALR (Table)"))
+        self.AlgorithmBox.setItemText(4, _translate("MainWindow", "LR(1) (Table)"))
         self.RightScreen.setTabText(self.RightScreen.indexOf(self.StackTab), _translate("MainWindow", "Stack"))
         self.CodeUpdateButton.setText(_translate("MainWindow", "Update"))
         self.CodeImportButton.setText(_translate("MainWindow", "Import..."))
@@ -22,13 +22,15 @@ import time
 from PyQt6 import QtCore, QtGui, QtWidgets
 
 from GraphicsSettings import GraphicsSettings
-from Grid import Grid
+from LALRTableParser import LALRTableParser
 from LL1RecursiveDescentParser import LL1RecursiveDescentParser
 from LL1TableParser import LL1TableParser
+from LR1TableParser import LR1TableParser
 from Parser import Parser, UsesTable
 import HTML
 from SLRTableParser import SLRTableParser
 from Tree import Tree
+from TreeLayout import TreeLayout
 from Ui_Window import Ui_MainWindow
 
 
@@ -49,6 +51,27 @@ class Window(QtWidgets.QMainWindow, Ui_MainWindow):
         def run(self) -> None:
             self.fn(*self.args, **self.kwargs)
 
+    class NodeGraphics:
+        # The items drawn for one node, kept in the scene from one step to the next, with what they were drawn for, so
+        # a step only changes the ones that differ. The line, and its shadow, go from the node's parent to the node.
+        def __init__(self, text: QtWidgets.QGraphicsTextItem, box: QtWidgets.QGraphicsRectItem,
+                     box_shadow: QtWidgets.QGraphicsRectItem | None) -> None:
+            self.text: QtWidgets.QGraphicsTextItem = text
+            self.box: QtWidgets.QGraphicsRectItem = box
+            self.box_shadow: QtWidgets.QGraphicsRectItem | None = box_shadow
+            self.line: QtWidgets.QGraphicsLineItem | None = None
+            self.line_shadow: QtWidgets.QGraphicsLineItem | None = None
+            self.name: str = text.toPlainText()
+            self.text_width: float = text.boundingRect().width()
+            self.coords: tuple[float, int] | None = None
+            self.parent_coords: tuple[float, int] = (-1, -1)
+            self.on_stack: bool | None = None
+            self.highlight: bool | None = None
+
+        def items(self) -> list[QtWidgets.QGraphicsItem]:
+            return [item for item in (self.text, self.box, self.box_shadow, self.line, self.line_shadow)
+                    if item is not None]
+
     def __init__(self) -> None:
         super(Window, self).__init__()
         self.setupUi(self)
@@ -57,11 +80,18 @@ class Window(QtWidgets.QMainWindow, Ui_MainWindow):
         self.stack_trace_token_list: list[str] = []
         self.stack_trace_max_stack_text_len: int = 0
         self.stack_trace_max_token_text_len: int = 0
+        self.tree_layout: TreeLayout | None = None  # kept between steps, so only what changed is laid out again
+        self.node_graphics: dict[Tree, Window.NodeGraphics] = {}  # the items in the tree scene for each node
+        self.tree_items: QtWidgets.QGraphicsItemGroup | None = None  # their parent, moved by the left of the layout
+        self.drawn_stack: set[Tree] = set()  # the nodes on the stack when the tree was last drawn
+        self.drawn_current: Tree | None = None  # and the current node, since they are drawn differently
 
         self.currently_running: bool = False
         self.thread_pool: QtCore.QThreadPool = QtCore.QThreadPool()
 
-        self.parsers: list[Parser] = [LL1RecursiveDescentParser(), LL1TableParser(), SLRTableParser()]
+        self.parsers: list[Parser] = [
+            LL1RecursiveDescentParser(), LL1TableParser(), SLRTableParser(), LALRTableParser(), LR1TableParser()
+        ]
         # noinspection PyUnresolvedReferences
         for language in self.parsers[0].languages:
             self.RDCodeSelectBox.addItem(language.name)
@@ -71,6 +101,10 @@ class Window(QtWidgets.QMainWindow, Ui_MainWindow):
             self.parsers[1].input_grammar(f.read())
         with open("../Grammars/ExtendedCalculator-LR.gr", 'r') as f:
             self.parsers[2].input_grammar(f.read())
+        with open("../Grammars/ExtendedCalculator-LR.gr", 'r') as f:
+            self.parsers[3].input_grammar(f.read())
+        with open("../Grammars/ExtendedCalculator-LR.gr", 'r') as f:
+            self.parsers[4].input_grammar(f.read())
 
         # Initialize grammar, code, and other class variables
         with open("../ExampleCode/SumAverage.cl", "r") as f:
@@ -79,6 +113,7 @@ class Window(QtWidgets.QMainWindow, Ui_MainWindow):
         self.current_parser.input_code(self.code)
 
         # Set up GUI stuff
+        self.show_conflicts()
         self.GrammarEditBox.setPlainText(self.current_parser.grammar.description)
         self.CodeBox.setHtml(self.current_parser.code_box_text())
         self.CodeEditBox.setPlainText(self.code)
@@ -144,10 +179,12 @@ class Window(QtWidgets.QMainWindow, Ui_MainWindow):
     def grammar_update_button_pressed(self) -> None:
         try:
             self.current_parser.input_grammar(self.GrammarEditBox.toPlainText())
+            self.current_parser.input_code(self.code)
         except Exception as e:
             # TODO: raise a dialogue box
             raise e
         else:
+            self.show_conflicts()
             self.reset()
 
     def grammar_import_button_pressed(self) -> None:
@@ -186,11 +223,13 @@ class Window(QtWidgets.QMainWindow, Ui_MainWindow):
         self.GrammarEditBox.setPlainText(self.current_parser.grammar.description)
         self.RDCodeSelectBox.setEnabled(not self.using_table_driven_parser())
         self.TableBox.setHidden(not self.using_table_driven_parser())
+        self.current_parser.input_code(self.code)
+        self.show_conflicts()
         self.reset()
 
     def code_update_button_pressed(self) -> None:
         try:
-            self.current_parser.input_code(self.CodeEditBox.toPlainText())
+            self.current_parser.edit_code(self.CodeEditBox.toPlainText())
         except Exception as e:
             # TODO: raise a dialogue box
             raise e
@@ -206,6 +245,14 @@ class Window(QtWidgets.QMainWindow, Ui_MainWindow):
         # TODO put code in file
         pass
 
+    def show_conflicts(self) -> None:
+        # a grammar with conflicts still gets parsed, the status bar says where and the tooltip lists them all
+        conflicts: list[str] = self.current_parser.conflicts
+        self.statusbar.showMessage(
+            f"{len(conflicts)} conflict{'' if len(conflicts) == 1 else 's'} in the grammar: {conflicts[0]}"
+            + (', ...' if len(conflicts) > 1 else '') if conflicts else '')
+        self.statusbar.setToolTip('\n'.join(conflicts))
+
     def using_table_driven_parser(self) -> bool:
         return isinstance(self.current_parser, UsesTable)
 
@@ -223,7 +270,6 @@ class Window(QtWidgets.QMainWindow, Ui_MainWindow):
         self.update_display()
         self.StackDisplay.setHtml('')
         self.enable_run_buttons()
-        self.current_parser.input_code(self.code)
         self.stack_trace_stack_text = []
         self.stack_trace_token_list = []
 
@@ -285,9 +331,24 @@ class Window(QtWidgets.QMainWindow, Ui_MainWindow):
             self.stack_trace_max_stack_text_len + 3 + self.stack_trace_max_token_text_len
         )
 
-        self.TreeScene.clear()
-        if self.current_parser.tree is not None:
-            self.draw_tree(Grid(self.current_parser.tree, self.graphics_settings.compact_tree))
+        self.update_tree_display()
+
+    def update_tree_display(self) -> None:
+        tree: Tree | None = self.current_parser.tree
+        if (tree is None or self.tree_layout is None or tree is not self.tree_layout.tree or
+                self.tree_layout.compact_tree != self.graphics_settings.compact_tree):
+            # a new tree, after a reset or another parser was picked, is drawn from scratch
+            self.TreeScene.clear()
+            self.node_graphics = {}
+            self.tree_items = QtWidgets.QGraphicsItemGroup()
+            self.TreeScene.addItem(self.tree_items)
+            self.drawn_stack = set()
+            self.drawn_current = None
+            self.tree_layout = TreeLayout(tree, self.graphics_settings.compact_tree) if tree is not None else None
+        else:
+            self.tree_layout.update(tree)
+        if self.tree_layout is not None:
+            self.draw_tree(self.tree_layout)
         self.TreeScene.update()
         self.TreeView.update()
 
@@ -342,105 +403,171 @@ class Window(QtWidgets.QMainWindow, Ui_MainWindow):
             self.current_parser.table_height()
         )
 
-    def draw_tree(self, grid: Grid) -> None:
+    def draw_tree(self, layout: TreeLayout) -> None:
+        # Only goes through the nodes the layout moved, the children they draw lines to, and the nodes that went on or
+        # off the stack or in or out of the highlight, so a step takes as long as what it changed. The items are drawn
+        # at the x of the layout before its left is taken off, and the item they're under is moved by it instead.
         self.TreeScene.setSceneRect(
             0, 0,
-            max(self.TreeScene.width(), self.graphics_settings.canvas_width(grid.width)),
-            max(self.TreeScene.height(), self.graphics_settings.canvas_height(grid.height))
+            max(self.TreeScene.width(), self.graphics_settings.canvas_width(layout.width)),
+            max(self.TreeScene.height(), self.graphics_settings.canvas_height(layout.height))
         )
-
-        for x in range(grid.width):
-            for y in range(grid.height):
-                node: Tree = grid.get_node((x, y))
-                if node is None:
-                    continue
-
-                text_width: float = self.make_text_graphic(x, y, node.name).boundingRect().width()
-                self.make_box_graphic(
-                    x, y, text_width, self.current_parser.node_on_stack(node),
-                    self.current_parser.node_should_be_highlighted(node)
-                )
+        self.tree_items.setPos(self.graphics_settings.line_start_x_coord(0) -
+                               self.graphics_settings.line_start_x_coord(layout.left), 0)
+
+        for node in layout.removed:
+            graphics: Window.NodeGraphics | None = self.node_graphics.pop(node, None)
+            if graphics is not None:
+                for item in graphics.items():
+                    self.TreeScene.removeItem(item)
+
+        stacked: set[Tree] = self.current_parser.nodes_on_stack()
+        redrawn: set[Tree] = stacked ^ self.drawn_stack
+        redrawn.update(layout.moved)
+        for node in layout.moved:
+            redrawn.update(node.children)
+        redrawn.add(self.current_parser.current_node)
+        redrawn.add(self.drawn_current)
+        for node in redrawn:
+            coords: tuple[float, int] | None = layout.coords.get(node)
+            if coords is not None:
+                parent_coords: tuple[float, int] | None = layout.coords.get(node.parent)
+                self.draw_node(node, coords, (-1, -1) if parent_coords is None else parent_coords, node in stacked,
+                               self.current_parser.node_should_be_highlighted(node))
+        self.drawn_stack = stacked
+        self.drawn_current = self.current_parser.current_node
+
+        current: Window.NodeGraphics | None = self.node_graphics.get(self.current_parser.current_node)
+        if current is not None:
+            x, y = current.coords
+            x -= layout.left
+            self.move_scroll_bar_if_off_screen(
+                self.TreeView.horizontalScrollBar(),
+                self.graphics_settings.horizontal_scroll_bar_pos(x, current.text_width),
+                int(self.TreeScene.width())
+            )
+            self.move_scroll_bar_if_off_screen(
+                self.TreeView.verticalScrollBar(),
+                self.graphics_settings.vertical_scroll_bar_pos(y),
+                int(self.TreeScene.height())
+            )
+
+    def draw_node(self, node: Tree, coords: tuple[float, int], parent_coords: tuple[float, int], on_stack: bool,
+                  highlight: bool) -> None:
+        graphics: Window.NodeGraphics | None = self.node_graphics.get(node)
+        if graphics is None:
+            graphics = self.node_graphics[node] = self.NodeGraphics(
+                self.make_text_graphic(node.name), self.make_box_graphic(),
+                self.make_box_shadow_graphic() if self.graphics_settings.shadow_enabled else None
+            )
+        elif graphics.name != node.name:  # the LL(1) table parser names terminal nodes after the token they match
+            graphics.text.setPlainText(node.name)
+            graphics.name = node.name
+            graphics.text_width = graphics.text.boundingRect().width()
+            graphics.coords = None
+
+        moved: bool = graphics.coords != coords
+        if moved:
+            self.place_node_graphics(graphics, *coords)
+            graphics.coords = coords
+        if graphics.on_stack != on_stack or graphics.highlight != highlight:
+            graphics.box.setBrush(self.stacked_brush if on_stack else self.unstacked_brush)
+            graphics.box.setPen(
+                self.outline_pen if highlight else (self.stacked_border_pen if on_stack else self.unstacked_border_pen)
+            )
+            if graphics.line is not None:
+                graphics.line.setPen(self.stacked_line_pen if on_stack else self.unstacked_line_pen)
+            graphics.highlight = highlight
+
+        if moved or graphics.parent_coords != parent_coords:
+            if parent_coords == (-1, -1):  # the nameless root of the LR parsers isn't drawn, nor lines from it
+                for line in (graphics.line, graphics.line_shadow):
+                    if line is not None:
+                        self.TreeScene.removeItem(line)
+                graphics.line = graphics.line_shadow = None
+            elif graphics.line is None:
+                graphics.line = self.make_line_graphic(parent_coords, coords, on_stack)
                 if self.graphics_settings.shadow_enabled:
-                    self.make_box_shadow_graphic(x, y, text_width)
-
-                for child in node:
-                    self.make_line_graphic(
-                        (x, y), grid.get_coords(child), self.current_parser.node_on_stack(child)
-                    )
-                    if self.graphics_settings.shadow_enabled:
-                        self.make_line_shadow_graphic((x, y), grid.get_coords(child))
-
-                if node is self.current_parser.current_node:
-                    self.move_scroll_bar_if_off_screen(
-                        self.TreeView.horizontalScrollBar(),
-                        self.graphics_settings.horizontal_scroll_bar_pos(x, text_width),
-                        int(self.TreeScene.width())
-                    )
-                    self.move_scroll_bar_if_off_screen(
-                        self.TreeView.verticalScrollBar(),
-                        self.graphics_settings.vertical_scroll_bar_pos(y),
-                        int(self.TreeScene.height())
-                    )
-
-    def make_text_graphic(self, x_pos: int, y_pos: int, text: str) -> QtWidgets.QGraphicsTextItem:
-        text_graphic: QtWidgets.QGraphicsTextItem = QtWidgets.QGraphicsTextItem(text)
-        text_graphic.setPos(
-            self.graphics_settings.text_x_coord(x_pos, text_graphic.boundingRect().width()),
-            self.graphics_settings.text_y_coord(y_pos, text_graphic.boundingRect().height())
+                    graphics.line_shadow = self.make_line_shadow_graphic(parent_coords, coords)
+            else:
+                self.place_line_graphic(graphics.line, parent_coords, coords)
+                if graphics.line_shadow is not None:
+                    self.place_line_shadow_graphic(graphics.line_shadow, parent_coords, coords)
+            graphics.parent_coords = parent_coords
+        graphics.on_stack = on_stack
+
+    def place_node_graphics(self, graphics: Window.NodeGraphics, x_pos: float, y_pos: int) -> None:
+        graphics.text.setPos(
+            self.graphics_settings.text_x_coord(x_pos, graphics.text_width),
+            self.graphics_settings.text_y_coord(y_pos, graphics.text.boundingRect().height())
+        )
+        graphics.box.setRect(0, 0, self.graphics_settings.box_width(graphics.text_width),
+                             self.graphics_settings.box_height())
+        graphics.box.setPos(
+            self.graphics_settings.box_x_coord(x_pos, graphics.text_width),
+            self.graphics_settings.box_y_coord(y_pos)
         )
+        if graphics.box_shadow is not None:
+            graphics.box_shadow.setRect(0, 0, self.graphics_settings.box_width(graphics.text_width),
+                                        self.graphics_settings.box_height())
+            graphics.box_shadow.setPos(
+                self.graphics_settings.box_shadow_x_coord(x_pos, graphics.text_width),
+                self.graphics_settings.box_shadow_y_coord(y_pos)
+            )
+
+    def make_text_graphic(self, text: str) -> QtWidgets.QGraphicsTextItem:
+        text_graphic: QtWidgets.QGraphicsTextItem = QtWidgets.QGraphicsTextItem(text)
         text_graphic.setZValue(3)
-        self.TreeScene.addItem(text_graphic)
+        text_graphic.setParentItem(self.tree_items)
         return text_graphic
 
-    def make_box_graphic(self, x_pos: int, y_pos: int, text_width: float, on_stack: bool, highlight: bool) -> None:
-        box: QtWidgets.QGraphicsRectItem = QtWidgets.QGraphicsRectItem(0, 0,
-            self.graphics_settings.box_width(text_width), self.graphics_settings.box_height()
-        )
-        box.setPos(
-            self.graphics_settings.box_x_coord(x_pos, text_width),
-            self.graphics_settings.box_y_coord(y_pos)
-        )
-        box.setBrush(self.stacked_brush if on_stack else self.unstacked_brush)
-        box.setPen(
-            self.outline_pen if highlight else (self.stacked_border_pen if on_stack else self.unstacked_border_pen)
-        )
+    def make_box_graphic(self) -> QtWidgets.QGraphicsRectItem:
+        box: QtWidgets.QGraphicsRectItem = QtWidgets.QGraphicsRectItem()
         box.setZValue(2)
-        self.TreeScene.addItem(box)
+        box.setParentItem(self.tree_items)
+        return box
 
-    def make_line_graphic(self, parent_coords: tuple[int, int],
-                          child_coords: tuple[int, int], child_on_stack: bool) -> None:
-        line = QtWidgets.QGraphicsLineItem(
+    def make_line_graphic(self, parent_coords: tuple[float, int],
+                          child_coords: tuple[float, int], child_on_stack: bool) -> QtWidgets.QGraphicsLineItem:
+        line: QtWidgets.QGraphicsLineItem = QtWidgets.QGraphicsLineItem()
+        self.place_line_graphic(line, parent_coords, child_coords)
+        line.setPen(self.stacked_line_pen if child_on_stack else self.unstacked_line_pen)
+        line.setZValue(1)
+        line.setParentItem(self.tree_items)
+        return line
+
+    def place_line_graphic(self, line: QtWidgets.QGraphicsLineItem, parent_coords: tuple[float, int],
+                           child_coords: tuple[float, int]) -> None:
+        line.setLine(
             self.graphics_settings.line_start_x_coord(parent_coords[0]),
             self.graphics_settings.line_start_y_coord(parent_coords[1]),
             self.graphics_settings.line_end_x_coord(child_coords[0]),
             self.graphics_settings.line_end_y_coord(child_coords[1])
         )
-        line.setPen(self.stacked_line_pen if child_on_stack else self.unstacked_line_pen)
-        line.setZValue(1)
-        self.TreeScene.addItem(line)
 
-    def make_box_shadow_graphic(self, x_pos: int, y_pos: int, text_width: float) -> None:
-        box_shadow = QtWidgets.QGraphicsRectItem(0, 0,
-            self.graphics_settings.box_width(text_width),
-            self.graphics_settings.box_height()
-        )
-        box_shadow.setPos(
-            self.graphics_settings.box_shadow_x_coord(x_pos, text_width),
-            self.graphics_settings.box_shadow_y_coord(y_pos)
-        )
+    def make_box_shadow_graphic(self) -> QtWidgets.QGraphicsRectItem:
+        box_shadow: QtWidgets.QGraphicsRectItem = QtWidgets.QGraphicsRectItem()
         box_shadow.setBrush(self.shadow_brush)
         box_shadow.setPen(self.shadow_border_pen)
-        self.TreeScene.addItem(box_shadow)
+        box_shadow.setParentItem(self.tree_items)
+        return box_shadow
 
-    def make_line_shadow_graphic(self, parent_coords: tuple[int, int], child_coords: tuple[int, int]) -> None:
-        line_shadow = QtWidgets.QGraphicsLineItem(
+    def make_line_shadow_graphic(self, parent_coords: tuple[float, int],
+                                 child_coords: tuple[float, int]) -> QtWidgets.QGraphicsLineItem:
+        line_shadow: QtWidgets.QGraphicsLineItem = QtWidgets.QGraphicsLineItem()
+        self.place_line_shadow_graphic(line_shadow, parent_coords, child_coords)
+        line_shadow.setPen(self.line_shadow_pen)
+        line_shadow.setParentItem(self.tree_items)
+        return line_shadow
+
+    def place_line_shadow_graphic(self, line_shadow: QtWidgets.QGraphicsLineItem, parent_coords: tuple[float, int],
+                                  child_coords: tuple[float, int]) -> None:
+        line_shadow.setLine(
             self.graphics_settings.line_shadow_start_x_coord(parent_coords[0]),
             self.graphics_settings.line_shadow_start_y_coord(parent_coords[1]),
             self.graphics_settings.line_shadow_end_x_coord(child_coords[0]),
             self.graphics_settings.line_shadow_end_y_coord(child_coords[1])
         )
-        line_shadow.setPen(self.line_shadow_pen)
-        self.TreeScene.addItem(line_shadow)
 
     @staticmethod
     def move_scroll_bar(scroll_bar: QtWidgets.QScrollBar, position_to_set: int, max_position: int) -> None:
@@ -0,0 +1,59 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+# The modules in Source import each other by name, as they do when the program is run from there, so the tests put
+# Source on the path. Run them from the top folder with python -m unittest.
+
+import os
+import sys
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Source'))
+
+from GrammarCache import GrammarCache
+from LL1RecursiveDescentParser import LL1RecursiveDescentParser
+
+GrammarCache.enabled = False  # the tests build every grammar, instead of leaving cache files behind
+LL1RecursiveDescentParser.Language.language_files_folder = os.path.join(ROOT, 'RDCodeLanguages', '')
+
+
+def read_grammar(file_name: str) -> str:
+    with open(os.path.join(ROOT, 'Grammars', file_name), 'r') as f:
+        return f.read()
+
+
+def read_code(file_name: str) -> str:
+    with open(os.path.join(ROOT, 'ExampleCode', file_name), 'r') as f:
+        return f.read()
+
+
+def edits(code: str) -> list[str]:
+    # versions of code, each an edit of the last one, jumping back and forth through it
+    middle: int = code.index('\n', len(code) // 2) + 1
+    edited: list[str] = [code[:middle] + 'x := 1\n' + code[middle:]]
+    edited.append(edited[-1].replace('read A', 'read Apple', 1))
+    edited.append(edited[-1] + 'write x\n')
+    line: int = edited[-1].index('x := 1\n')
+    edited.append(edited[-1][:line] + edited[-1][line + 2:])  # ':= 1' is left, which doesn't parse
+    edited.append(edited[-1][:line] + 'y ' + edited[-1][line:])
+    edited.append(edited[-1].replace('sum/2', 'sum / 20', 1))
+    edited.append(edited[-1][5:])  # 'read' gone from the start
+    edited.append('')
+    edited.append(code)
+    return edited
@@ -0,0 +1,229 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import io
+import mmap
+import os
+import random
+import tempfile
+import unittest
+
+from Tests import ROOT, read_code, read_grammar
+from Tests.test_parser import tree_shape
+from Grammar import Grammar
+from LL1RecursiveDescentParser import LL1RecursiveDescentParser
+from LL1TableParser import LL1TableParser
+from SLRTableParser import SLRTableParser
+
+
+def reference_lexer(grammar: Grammar, code: str) -> list[tuple[str, str]]:
+    # the lexer from before the trie, as (name, image) pairs
+    def potential_tokens(tokens: list[str], prefix: str) -> list[str]:
+        return [token for token in tokens if token.startswith(prefix)]
+
+    result: list[tuple[str, str]] = []
+    counter: int = 0
+    current: str = ''
+    while counter < len(code):
+        if code[counter].isspace():
+            counter += 1
+        elif code[counter].isidentifier():
+            while counter < len(code) and (code[counter].isidentifier() or code[counter].isdigit()):
+                current += code[counter]
+                counter += 1
+            result.append((current, current) if current in grammar.tokens_list else ('identifier', current))
+            current = ''
+        elif code[counter].isdigit():
+            while counter < len(code) and code[counter].isdigit():
+                current += code[counter]
+                counter += 1
+            if counter < len(code) and code[counter].isalpha():
+                raise Grammar.LexingException(current + code[counter])
+            result.append(('number_lit', current))
+            current = ''
+        elif code[counter] == '"':
+            current += code[counter]
+            counter += 1
+            while counter < len(code):
+                if code[counter] == '\\' and counter < len(code) - 1:
+                    current += code[counter:counter + 2]
+                    counter += 2
+                elif code[counter] == '"':
+                    current += code[counter]
+                    counter += 1
+                    result.append(('string_lit', current))
+                    current = ''
+                    break
+                else:
+                    current += code[counter]
+                    counter += 1
+        elif code[counter] == "'":
+            current += code[counter]
+            counter += 1
+            if code[counter] == '\\':
+                current += code[counter]
+                counter += 1
+            current += code[counter:counter + 2]
+            counter += 2
+            if current[-1] != "'":
+                raise Grammar.LexingException(current)
+            result.append(('char_lit', current))
+            current = ''
+        else:
+            potential: list[str] = potential_tokens(grammar.tokens_list, current)
+            while counter < len(code) and \
+                    not (code[counter].isidentifier() or code[counter].isdigit() or code[counter].isspace()):
+                current += code[counter]
+                counter += 1
+                potential = potential_tokens(potential, current)
+                if not potential:
+                    raise Grammar.LexingException(current)
+                if current in potential and (counter >= len(code) or current + code[counter] not in
+                                             potential_tokens(potential, current + code[counter])):
+                    result.append((current, current))
+                    current = ''
+                    break
+    if current != '':
+        result.append((current, current))
+    result.append(('eof', 'eof'))
+    return result
+
+
+def lex(grammar: Grammar, code: str) -> list[tuple[str, str]] | str:
+    # the tokens, or the name of the exception
+    try:
+        return [(token.name, token.image) for token in grammar.tokens(code)]
+    except Exception as exception:
+        return type(exception).__name__
+
+
+def lex_with_reference(grammar: Grammar, code: str) -> list[tuple[str, str]] | str:
+    try:
+        return reference_lexer(grammar, code)
+    except Exception as exception:
+        return type(exception).__name__
+
+
+class TrieLexerTest(unittest.TestCase):
+    # the trie has to cut the code into the same tokens as the lexer it replaced, and fail on the same code
+    def test_example_code(self) -> None:
+        for grammar_file in sorted(os.listdir(os.path.join(ROOT, 'Grammars'))):
+            grammar: Grammar = Grammar(read_grammar(grammar_file))
+            if grammar.token_pattern is not None:
+                continue  # a grammar with token definitions is lexed with them instead
+            for code_file in sorted(os.listdir(os.path.join(ROOT, 'ExampleCode'))):
+                with self.subTest(grammar_file, code=code_file):
+                    code: str = read_code(code_file)
+                    self.assertEqual(lex(grammar, code), lex_with_reference(grammar, code))
+
+    def test_operator_soup(self) -> None:
+        # random runs of operators, which is where the longest match has to back off
+        grammar: Grammar = Grammar(read_grammar('BMinor-LL.gr'))
+        pieces: list[str] = grammar.tokens_list + ['x', '1', ' ', '\n', '"a\\"b"', "'c'", '@', '=', '+', '|', '&']
+        rng: random.Random = random.Random(3)
+        failures: int = 0
+        for _ in range(2000):
+            code: str = ''.join(rng.choice(pieces) for _ in range(rng.randrange(1, 12)))
+            expected: list[tuple[str, str]] | str = lex_with_reference(grammar, code)
+            failures += isinstance(expected, str)
+            self.assertEqual(lex(grammar, code), expected, repr(code))
+        self.assertGreater(failures, 0)  # some of them don't lex
+
+
+class ChunkedLexingTest(unittest.TestCase):
+    def test_comment_across_chunks(self) -> None:
+        # the comment starts before the last line break of the first chunk and ends in the next one
+        grammar: Grammar = Grammar(read_grammar('ANSI_C-LR.gr'))
+        lines: str = 'int x = 1;\n' * 6000
+        comment: str = '/* a comment\n over lines, int y = x / 2;\n' * 4 + ' */'
+        code: str = lines[:65500] + comment + ' int z;\n' + lines
+        expected: list[tuple[str, str]] = [(token.name, token.image) for token in grammar.tokens(code)]
+        self.assertNotIn(('identifier', 'y'), expected)
+        for chunk_size in (1 << 16, 1000, len(comment) + 1):
+            with self.subTest(chunk_size=chunk_size):
+                chunked: list[tuple[str, str]] = [
+                    (token.name, token.image) for token in grammar.tokens(io.BytesIO(code.encode()), chunk_size)
+                ]
+                self.assertEqual(chunked, expected)
+
+
+class CountingReader(io.BytesIO):
+    def __init__(self, data: bytes) -> None:
+        super().__init__(data)
+        self.bytes_read: int = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data: bytes = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class StreamedLexingTest(unittest.TestCase):
+    def test_same_tokens_as_a_str(self) -> None:
+        # chunks cut through tokens, and through the bytes of characters that take more than one
+        grammar: Grammar = Grammar(read_grammar('BMinor-LL.gr'))
+        code: str = read_code('SumAverage.bminor') * 20 + 'print "h\u00e9llo \u2603 \\" w\u00f6rld";\n'
+        expected: list[tuple[str, str]] = [(token.name, token.image) for token in grammar.tokens(code)]
+        for chunk_size in (1, 2, 3, 7, 64, 1 << 16):
+            with self.subTest(chunk_size=chunk_size):
+                for source in (io.BytesIO(code.encode()), io.StringIO(code)):
+                    self.assertEqual([(token.name, token.image) for token in grammar.tokens(source, chunk_size)],
+                                     expected)
+        with tempfile.TemporaryDirectory() as folder:
+            file_name: str = os.path.join(folder, 'code.bminor')
+            with open(file_name, 'w', encoding='utf-8') as f:
+                f.write(code)
+            with open(file_name, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                self.assertEqual([(token.name, token.image) for token in grammar.tokens(data, 1000)], expected)
+            with open(file_name, 'r', encoding='utf-8') as f:
+                self.assertEqual([(token.name, token.image) for token in grammar.tokens(f, 1000)], expected)
+
+    def test_tokens_are_read_as_needed(self) -> None:
+        grammar: Grammar = Grammar(read_grammar('BMinor-LL.gr'))
+        source: CountingReader = CountingReader(read_code('SumAverage.bminor').encode() * 1000)
+        tokens = grammar.tokens(source, 256)
+        for _ in range(10):
+            next(tokens)
+        self.assertLessEqual(source.bytes_read, 512)
+
+    def test_parsers_pull_tokens(self) -> None:
+        # parsing a file keeps a few tokens around, not the whole file
+        code: str = read_code('SumAverage.cl') * 50
+        for parser, grammar in ((LL1RecursiveDescentParser(), 'ExtendedCalculator-LL.gr'),
+                                (LL1TableParser(), 'ExtendedCalculator-LL.gr'),
+                                (SLRTableParser(), 'ExtendedCalculator-LR.gr')):
+            with self.subTest(type(parser).__name__):
+                parser.input_grammar(read_grammar(grammar))
+                parser.input_code(code)
+                parser.reset()
+                expected: tuple = tree_shape(parser.parse_all())
+                source: CountingReader = CountingReader(code.encode())
+                parser.input_code(source)
+                parser.reset()
+                most: int = 0
+                while not parser.finished_parsing:
+                    parser.step()
+                    most = max(most, len(parser.token_stream))
+                self.assertEqual(tree_shape(parser.tree), expected)
+                self.assertLessEqual(most, 4)
+                self.assertEqual(source.bytes_read, len(code))
+
+
+if __name__ == '__main__':
+    unittest.main()
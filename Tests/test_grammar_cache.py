@@ -0,0 +1,138 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+
+import importlib.util
+import os
+import pickle
+import py_compile
+import tempfile
+import unittest
+from unittest import mock
+
+from Tests import read_code, read_grammar
+from Tests.test_parser import tree_shape
+from GrammarCache import GrammarCache
+from LALRTableParser import LALRTableParser
+from LL1RecursiveDescentParser import LL1RecursiveDescentParser
+from LL1TableParser import LL1TableParser
+from LR1TableParser import LR1TableParser
+from Parser import Parser
+from SLRTableParser import SLRTableParser
+
+
+class GrammarCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        folder: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        GrammarCache.folder = folder.name + '/'
+        GrammarCache.enabled = True
+
+    def tearDown(self) -> None:
+        GrammarCache.enabled = False
+
+    @staticmethod
+    def parse(parser: Parser, code: str) -> tuple:
+        parser.input_code(code)
+        parser.reset()
+        return tree_shape(parser.parse_all())
+
+    def test_round_trip(self) -> None:
+        # a parser that gets its rules from the cache doesn't build anything, and parses the same
+        for parser_type, grammar, code in ((LL1RecursiveDescentParser, 'BMinor-LL.gr', 'SumAverage.bminor'),
+                                           (LL1TableParser, 'BMinor-LL.gr', 'SumAverage.bminor'),
+                                           (SLRTableParser, 'ExtendedCalculator-LR.gr', 'SumAverage.cl'),
+                                           (LALRTableParser, 'ANSI_C-LR.gr', ''),
+                                           (LR1TableParser, 'ExtendedCalculator-LR.gr', 'SumAverage.cl')):
+            with self.subTest(parser_type.__name__):
+                built: Parser = parser_type()
+                built.input_grammar(read_grammar(grammar))
+                loaded: Parser = parser_type()
+                with mock.patch.object(parser_type, 'generate_rules', side_effect=AssertionError):
+                    loaded.input_grammar(read_grammar(grammar))
+                self.assertEqual(loaded.conflicts, built.conflicts)
+                if isinstance(built, LL1RecursiveDescentParser):
+                    self.assertEqual(loaded.code, built.code)
+                else:
+                    self.assertEqual(list(map(list, loaded.get_table_body())),
+                                     list(map(list, built.get_table_body())))
+                if code:
+                    self.assertEqual(self.parse(loaded, read_code(code)), self.parse(built, read_code(code)))
+
+    def test_stale_files_are_rebuilt(self) -> None:
+        description: str = read_grammar('ExtendedCalculator-LR.gr')
+        expected: SLRTableParser = SLRTableParser()
+        expected.input_grammar(description)
+        file_name: str = GrammarCache.file_name(description, SLRTableParser().cache_name())
+        stale: dict[str, bytes] = {
+            'missing module': b'cno_such_module\nThing\n.',
+            'missing class': b'cbuiltins\nno_such_class\n.',
+            'bad arguments': b"cbuiltins\nlen\n(I1\nI2\ntR.",
+            'truncated': pickle.dumps({'symbols': expected.grammar.symbols.names})[:-5],
+            'missing key': pickle.dumps({'symbols': expected.grammar.symbols.names}),
+            'not a dict': pickle.dumps([1, 2, 3]),
+        }
+        code: str = read_code('SumAverage.cl')
+        for name, data in stale.items():
+            with self.subTest(name):
+                with open(file_name, 'wb') as f:
+                    f.write(data)
+                parser: SLRTableParser = SLRTableParser()
+                parser.input_grammar(description)
+                self.assertEqual(self.parse(parser, code), self.parse(expected, code))
+                self.assertIsNotNone(GrammarCache.load(description, parser.cache_name()))  # and written again
+
+    def test_modules_are_checked_against_their_hash(self) -> None:
+        source: str = 'VALUE = 1\n'
+        GrammarCache.save_module('grammar', 'algorithm', source)
+        self.assertEqual(GrammarCache.load_module('grammar', 'algorithm').VALUE, 1)
+
+        file_name: str = GrammarCache.file_name('grammar', 'algorithm', '.py')
+        with open(file_name, 'rb') as f:
+            header: bytes = f.readline()
+        # bytecode that wasn't compiled from the checked source is not run, the source is compiled again instead
+        with tempfile.TemporaryDirectory() as folder:
+            other: str = os.path.join(folder, 'other.py')
+            with open(other, 'wb') as f:
+                f.write(header + b'VALUE = 2\n')
+            for mode in py_compile.PycInvalidationMode:
+                py_compile.compile(other, importlib.util.cache_from_source(file_name), invalidation_mode=mode)
+                self.assertEqual(GrammarCache.load_module('grammar', 'algorithm').VALUE, 1, mode.name)
+
+        for name, data in (('changed', header + b'VALUE = 2\n'), ('no header', b'VALUE = 3\n'), ('empty', b'')):
+            with self.subTest(name):
+                with open(file_name, 'wb') as f:
+                    f.write(data)
+                self.assertIsNone(GrammarCache.load_module('grammar', 'algorithm'))
+
+    def test_compiled_engine_from_the_cache(self) -> None:
+        code: str = read_code('SumAverage.cl')
+        trees: list[tuple] = []
+        for _ in range(2):
+            SLRTableParser.engines.clear()
+            parser: SLRTableParser = SLRTableParser()
+            parser.compile_parser = True
+            parser.input_grammar(read_grammar('ExtendedCalculator-LR.gr'))
+            trees.append(self.parse(parser, code))
+        self.assertIsNotNone(GrammarCache.load_module(parser.grammar.description, parser.cache_name()))
+        self.assertEqual(trees[0], trees[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
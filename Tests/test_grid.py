@@ -0,0 +1,226 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import os
+import random
+import unittest
+
+from Tests import ROOT, read_code, read_grammar
+from Tests.test_tree_layout import comb, random_tree
+from Grid import Grid
+from LALRTableParser import LALRTableParser
+from LL1RecursiveDescentParser import LL1RecursiveDescentParser
+from LL1TableParser import LL1TableParser
+from LR1TableParser import LR1TableParser
+from Parser import Parser
+from SLRTableParser import SLRTableParser
+from Tree import Tree
+
+
+class ColumnGrid:
+    # Grid as it was before it was made sparse and its walks were made to keep their own stacks: a list of columns,
+    # searched through for every node. The layouts Grid makes have to stay the same as the ones this makes.
+    def __init__(self, tree: Tree, compact_tree: bool) -> None:
+        self.tree: Tree = tree
+        self.grid: list[list[Tree | None]] = [[self.tree]]
+        for child in self.tree:
+            self.place_tree_on_grid(child, compact_tree)
+        if self.tree.name == '':
+            self.nudge_nodes_up()
+
+    @property
+    def width(self) -> int:
+        return len(self.grid)
+
+    @property
+    def height(self) -> int:
+        return len(self.grid[-1])
+
+    def items(self) -> list[tuple[Tree, tuple[int, int]]]:
+        return [(cell, (x, y)) for x, column in enumerate(self.grid) for y, cell in enumerate(column)
+                if cell is not None]
+
+    def cell_is_empty(self, coords: tuple[int, int]) -> bool:
+        return self.get_node(coords) is None
+
+    def has_item(self, node: Tree) -> bool:
+        return self.get_coords(node) != (-1, -1)
+
+    def expand(self, new_width: int = 0, new_height: int = 0) -> None:
+        for column in self.grid:
+            column += [None] * (new_height-self.height+1)
+        self.grid += [[None] * self.height] * (new_width-self.width+1)
+
+    def place_node(self, coords: tuple[int, int], node: Tree | None) -> None:
+        self.expand(coords[0], coords[1])
+        self.grid[coords[0]][coords[1]] = node
+
+    def get_node(self, coords: tuple[int, int]) -> Tree | None:
+        return None if coords[0] >= self.width or coords[1] >= self.height else self.grid[coords[0]][coords[1]]
+
+    def get_coords(self, node: Tree) -> tuple[int, int]:
+        for x, row in enumerate(self.grid):
+            for y, cell in enumerate(row):
+                if cell is node:
+                    return x, y
+        return -1, -1
+
+    def get_x_coord(self, node: Tree) -> int:
+        return self.get_coords(node)[0]
+
+    def get_y_coord(self, node: Tree) -> int:
+        return self.get_coords(node)[1]
+
+    def move_node(self, old_coords: tuple[int, int], new_coords: tuple[int, int]) -> None:
+        self.place_node(new_coords, self.get_node(old_coords))
+        self.clear_space(old_coords)
+
+    def clear_space(self, coords: tuple[int, int]) -> None:
+        if coords[0] < self.width and coords[1] < self.height:
+            self.grid[coords[0]][coords[1]] = None
+
+    def rightmost_mode(self, y: int) -> int:
+        if y < self.height:
+            for x in reversed(range(self.width)):
+                if not self.cell_is_empty((x, y)):
+                    return x
+        return -1
+
+    def placed_children(self, node: Tree) -> int:
+        for i, child in enumerate(reversed(node.children)):
+            if self.has_item(child):
+                return len(node) - i
+        return 0
+
+    def nudge_node_left(self, node: Tree) -> None:
+        for child in node:
+            self.nudge_node_left(child)
+        self.move_node(self.get_coords(node), (self.get_x_coord(node)-1, self.get_y_coord(node)))
+
+    def nudge_nodes_up(self) -> None:
+        self.clear_space(self.get_coords(self.tree))
+        for x in range(self.width):
+            for y in range(self.height):
+                if self.get_node((x, y)) is not None:
+                    self.move_node((x, y), (x, y - 1))
+
+    def place_tree_on_grid(self, node: Tree, compact_tree: bool) -> None:
+        self.place_node((
+            max(self.rightmost_mode(self.get_y_coord(node.parent)+1)+1, self.get_x_coord(node.parent)),
+            self.get_y_coord(node.parent)+1
+        ), node)
+        for child in node:
+            self.place_tree_on_grid(child, compact_tree)
+            if compact_tree:
+                self.fix_node_x_position(node)
+            if self.should_nudge_children(node, compact_tree) and self.can_nudge_children(node):
+                for child_to_nudge in node:
+                    if self.has_item(child_to_nudge):
+                        self.nudge_node_left(child_to_nudge)
+            if not compact_tree:
+                self.fix_node_x_position(node)
+
+    def should_nudge_children(self, node: Tree, compact_tree: bool) -> bool:
+        return (self.placed_children(node) > 1 and
+                ((self.placed_children(node) % 2 == 0 and compact_tree) or
+                 (self.placed_children(node) % 2 == 1 and not compact_tree)))
+
+    def can_nudge_children(self, node: Tree) -> bool:
+        for y, x in enumerate(self.leftmost_children(node, [], 0)):
+            if x < 1 or not self.cell_is_empty((x-1, y+1+self.get_y_coord(node))):
+                return False
+        return True
+
+    def leftmost_children(self, node: Tree, curr_list: list[int], level: int) -> list[int]:
+        curr_list += [self.width] * (level-len(curr_list)+1)
+        for child in node:
+            curr_list[level] = min(curr_list[level], self.get_x_coord(child), key=lambda x: self.width if x < 0 else x)
+            self.leftmost_children(child, curr_list, level+1)
+        return curr_list
+
+    def fix_node_x_position(self, node: Tree) -> None:
+        if (self.get_x_coord(node) != self.node_x_position(node) and
+                self.cell_is_empty((self.node_x_position(node), self.get_y_coord(node)))):
+            self.move_node(self.get_coords(node), (self.node_x_position(node), self.get_y_coord(node)))
+            if node.parent is not None:
+                self.fix_node_x_position(node.parent)
+
+    def node_x_position(self, node: Tree) -> int:
+        return ((self.get_x_coord(node[self.placed_children(node)-1])-self.get_x_coord(node[0])) // 2
+                + self.get_x_coord(node[0]))
+
+
+class GridTest(unittest.TestCase):
+    def check_same(self, tree: Tree, compact_tree: bool) -> None:
+        grid: Grid = Grid(tree, compact_tree)
+        columns: ColumnGrid = ColumnGrid(tree, compact_tree)
+        self.assertEqual(list(grid.items()), columns.items())
+        self.assertEqual((grid.width, grid.height), (columns.width, columns.height))
+        for node in tree.preorder():
+            self.assertEqual(grid.get_coords(node), columns.get_coords(node))
+
+    def test_random_trees(self) -> None:
+        rng: random.Random = random.Random(4)
+        for i in range(300):
+            tree: Tree = random_tree(rng, 2)  # five levels at most, the old grid searches it for every node
+            if rng.random() < 0.3:
+                tree.name = ''  # laid out with the root hidden, like an LR parser's
+            for compact_tree in (False, True):
+                with self.subTest(i, compact_tree=compact_tree):
+                    self.check_same(tree, compact_tree)
+
+    def check_parser(self, parser: Parser, example: str, every_step: bool) -> None:
+        parser.input_code(read_code(example))
+        parser.reset()
+        while not parser.finished_parsing:
+            parser.step()
+            if parser.tree is not None and (every_step or parser.finished_parsing):
+                for compact_tree in (False, True):
+                    self.check_same(parser.tree, compact_tree)
+
+    def test_examples(self) -> None:
+        # the tree after every step of SumAverage.cl, and the finished trees of the other examples
+        grammars: dict[str, tuple[str, ...]] = {
+            '.cl': ('ExtendedCalculator-LL.gr', 'ExtendedCalculator-LR.gr'), '.bminor': ('BMinor-LL.gr',)}
+        for example in sorted(os.listdir(os.path.join(ROOT, 'ExampleCode'))):
+            for grammar in grammars[os.path.splitext(example)[1]]:
+                parser_types: tuple[type[Parser], ...] = \
+                    (LL1RecursiveDescentParser, LL1TableParser) if grammar.endswith('-LL.gr') else \
+                    (SLRTableParser, LALRTableParser, LR1TableParser)
+                for parser_type in parser_types:
+                    with self.subTest(example, grammar=grammar, parser=parser_type.__name__):
+                        parser: Parser = parser_type()
+                        parser.input_grammar(read_grammar(grammar))
+                        self.check_parser(parser, example, example == 'SumAverage.cl')
+
+    def test_deep_trees(self) -> None:
+        # as deep as the recursion limit lets the old grid go, and then past the limit
+        for length in (200, 3000):
+            for side in (0, 1):
+                tree: Tree = comb(length, side)
+                with self.subTest(length=length, side=side):
+                    if length < 1000:
+                        self.check_same(tree, False)
+                    grid: Grid = Grid(tree, False)
+                    self.assertEqual(len(list(grid.items())), 2 * length + 1)
+                    self.assertEqual(grid.height, length + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import contextlib
+import io
+import tempfile
+import unittest
+
+from Tests import read_code, read_grammar
+from Tests.test_parser import tree_shape
+from GrammarCache import GrammarCache
+from LALRTableParser import LALRTableParser
+from LR1TableParser import LR1TableParser
+from SLRTableParser import SLRTableParser
+
+
+# the assignment grammar from the dragon book, which is LALR(1) but not SLR(1)
+ASSIGNMENTS: str = '''\
+<S> ::= <A> "eof"
+<A> ::= <L> "=" <R> | <R>
+<L> ::= "*" <R> | "identifier"
+<R> ::= <L>'''
+
+# LR(1) but not LALR(1): merging the states after "a e" and "b e" mixes up the lookaheads of <E> and <F>
+MERGED_LOOKAHEADS: str = '''\
+<S> ::= <A> "eof"
+<A> ::= "a" <E> "c" | "a" <F> "d" | "b" <F> "c" | "b" <E> "d"
+<E> ::= "e"
+<F> ::= "e"'''
+
+
+class ActionGotoTest(unittest.TestCase):
+    def test_highlighted_cell_is_the_move(self) -> None:
+        # every step highlights the cell it used, in the goto columns for a reduced nonterminal and in the action
+        # columns for a token, and the input is only ever read forward
+        parser: SLRTableParser = SLRTableParser()
+        parser.input_grammar(read_grammar('ExtendedCalculator-LR.gr'))
+        parser.input_code(read_code('SumAverage.cl'))
+        parser.reset()
+        header: list[str] = list(parser.get_table_top_row())
+        body: list[list[str]] = [list(row) for row in parser.get_table_body()]
+        nonterminals: set[str] = set(parser.grammar.rule_names_list)
+        for row in body:
+            for name, cell in zip(header, row):
+                if name in nonterminals:
+                    self.assertIn(cell[:1], ('', 's', 'b'))
+
+        moves: set[str] = set()
+        while not parser.finished_parsing:
+            goto: SLRTableParser.Production | None = parser.goto_symbol
+            lookahead: str = goto.name if goto is not None else parser.token_stream.peek().name
+            position: int = parser.token_stream.position
+            depth: int = len(parser.parse_stack)
+            parser.step()
+            if parser.curr_highlighted_row < 0:
+                continue
+            cell: str = body[parser.curr_highlighted_row][parser.curr_highlighted_col]
+            self.assertEqual(header[parser.curr_highlighted_col], lookahead)
+            self.assertEqual(parser.token_stream.position, position + (goto is None and cell[0] in 'sb'))
+            if cell[0] == 's':
+                self.assertEqual(len(parser.parse_stack), depth + 1)
+                self.assertEqual(parser.parse_stack[-1].state, int(cell[1:]))
+            else:
+                self.assertEqual(parser.goto_symbol, parser.production_list[int(cell[1:]) - 1])
+                self.assertEqual(parser.tree[-1].name, parser.goto_symbol.name)
+            moves.add(cell[0] + ('' if goto is None else ' goto'))
+        self.assertFalse(parser.parse_error)
+        self.assertEqual(moves, {'s', 'r', 'b', 's goto', 'b goto'})
+
+
+class LALRTableTest(unittest.TestCase):
+    def test_fewer_conflicts_than_slr(self) -> None:
+        slr: SLRTableParser = SLRTableParser()
+        lalr: LALRTableParser = LALRTableParser()
+        slr.input_grammar(ASSIGNMENTS)
+        lalr.input_grammar(ASSIGNMENTS)
+        self.assertEqual(slr.conflicts, ['shift/reduce conflict in state 2 on ='])
+        self.assertEqual(lalr.conflicts, [])
+        # the same LR(0) states, only the lookaheads differ
+        self.assertEqual(lalr.action_table.height, slr.action_table.height)
+
+        description: str = read_grammar('ANSI_C-LR.gr')
+        slr.input_grammar(description)
+        lalr.input_grammar(description)
+        self.assertEqual(len(slr.conflicts), 13)
+        self.assertEqual(lalr.conflicts, ['shift/reduce conflict in state 178 on else'])
+
+    def test_same_tree_as_slr(self) -> None:
+        # both build the same tree for a grammar that SLR has no conflicts for
+        code: str = read_code('SumAverage.cl')
+        trees: list[tuple] = []
+        for parser in (SLRTableParser(), LALRTableParser()):
+            parser.input_grammar(read_grammar('ExtendedCalculator-LR.gr'))
+            self.assertEqual(parser.conflicts, [])
+            parser.input_code(code)
+            parser.reset()
+            trees.append(tree_shape(parser.parse_all()))
+        self.assertEqual(trees[0], trees[1])
+
+        lalr: LALRTableParser = LALRTableParser()
+        lalr.input_grammar(ASSIGNMENTS)
+        lalr.input_code('* x = y')
+        lalr.reset()
+        identifier: tuple = ('L', (('identifier', ()),))
+        self.assertEqual(tree_shape(lalr.parse_all()), ('', (('S', (
+            ('A', (('L', (('*', ()), ('R', (identifier,)))), ('=', ()), ('R', (identifier,)))), ('eof', ()))),)))
+
+    def test_conflicts_are_not_printed(self) -> None:
+        # they are kept in conflicts, for the window to show, when the tables are built and when they are loaded
+        with tempfile.TemporaryDirectory() as folder:
+            GrammarCache.folder = folder + '/'
+            GrammarCache.enabled = True
+            try:
+                for _ in range(2):
+                    parser: SLRTableParser = SLRTableParser()
+                    with contextlib.redirect_stdout(io.StringIO()) as output:
+                        parser.input_grammar(ASSIGNMENTS)
+                    self.assertEqual(output.getvalue(), '')
+                    self.assertEqual(len(parser.conflicts), 1)
+            finally:
+                GrammarCache.enabled = False
+
+
+class LR1TableTest(unittest.TestCase):
+    def test_no_conflicts_where_lalr_has_them(self) -> None:
+        lalr: LALRTableParser = LALRTableParser()
+        lalr.input_grammar(MERGED_LOOKAHEADS)
+        self.assertEqual(lalr.conflicts, ['reduce/reduce conflict in state 6 on c',
+                                          'reduce/reduce conflict in state 6 on d'])
+        for merge in (False, True):
+            with self.subTest(merge=merge):
+                parser: LR1TableParser = LR1TableParser(merge)
+                parser.input_grammar(MERGED_LOOKAHEADS)
+                self.assertEqual(parser.conflicts, [])
+                self.assertGreater(parser.action_table.height, lalr.action_table.height)
+                for code in ('a e c', 'a e d', 'b e c', 'b e d'):
+                    parser.input_code(code)
+                    parser.reset()
+                    parser.parse_all()
+                    self.assertFalse(parser.parse_error, code)
+
+        lalr.input_code('a e d')
+        lalr.reset()
+        with self.assertRaises(LALRTableParser.ParsingException):
+            lalr.parse_all()
+
+    def test_merged_states_on_ansi_c(self) -> None:
+        # merging gets LALR sized tables without the conflicts of LALR
+        description: str = read_grammar('ANSI_C-LR.gr')
+        lalr: LALRTableParser = LALRTableParser()
+        lalr.input_grammar(description)
+        canonical: LR1TableParser = LR1TableParser()
+        canonical.input_grammar(description)
+        merged: LR1TableParser = LR1TableParser(True)
+        merged.input_grammar(description)
+        self.assertGreater(canonical.action_table.height, 4 * lalr.action_table.height)
+        self.assertEqual(merged.action_table.height, lalr.action_table.height)
+        self.assertEqual(merged.conflicts, lalr.conflicts)
+        self.assertEqual([conflict.split()[-1] for conflict in canonical.conflicts], ['else', 'else'])
+
+    def test_same_tree_as_slr(self) -> None:
+        code: str = read_code('SumAverage.cl')
+        trees: list[tuple] = []
+        for parser in (SLRTableParser(), LR1TableParser(), LR1TableParser(True)):
+            parser.input_grammar(read_grammar('ExtendedCalculator-LR.gr'))
+            parser.input_code(code)
+            parser.reset()
+            trees.append(tree_shape(parser.parse_all()))
+        self.assertEqual(trees[1], trees[0])
+        self.assertEqual(trees[2], trees[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+
+import random
+import unittest
+
+from Tests import read_code, read_grammar
+from Tests.test_parser import tree_shape
+from LALRTableParser import LALRTableParser
+from LL1TableParser import LL1TableParser
+from ParseTable import ParseTable
+
+
+class ParseTableTest(unittest.TestCase):
+    def test_compress_keeps_every_cell(self) -> None:
+        rng: random.Random = random.Random(7)
+        for height, width, density in ((1, 1, 1.0), (5, 0, 0.0), (40, 30, 0.05), (100, 80, 0.2), (20, 10, 1.0)):
+            with self.subTest(height=height, width=width, density=density):
+                table: ParseTable = ParseTable(height, width, 0)
+                for row in range(height):
+                    for col in range(width):
+                        if rng.random() < density:
+                            table.set(row, col, rng.randrange(1, 1000))
+                rows: list[list[int]] = list(table.rows())
+                table.compress()
+                self.assertTrue(table.compressed)
+                self.assertEqual(list(table.rows()), rows)
+                self.assertEqual([[table.get(row, col) for col in range(width)] for row in range(height)], rows)
+                with self.assertRaises(ValueError):
+                    table.set(0, 0, 1)
+
+    def test_compress_shrinks_sparse_tables(self) -> None:
+        table: ParseTable = ParseTable(200, 100, -1)
+        for row in range(200):
+            table.set(row, row % 100, row)
+        size: int = table.byte_size()
+        table.compress()
+        self.assertLess(table.byte_size() * 10, size)
+        self.assertEqual(table.get(150, 50), 150)
+        self.assertEqual(table.get(150, 51), -1)
+
+    def test_compressed_parsers(self) -> None:
+        # the parsers show and parse with a compressed table the same as with a full one
+        for parser_type, option, grammar, code in (
+                (LL1TableParser, 'compress_table', 'BMinor-LL.gr', 'SumAverage.bminor'),
+                (LALRTableParser, 'compress_tables', 'ExtendedCalculator-LR.gr', 'SumAverage.cl')):
+            results: list[tuple] = []
+            for compress in (False, True):
+                parser: LL1TableParser | LALRTableParser = parser_type()
+                setattr(parser, option, compress)
+                parser.input_grammar(read_grammar(grammar))
+                tables: list[ParseTable] = [parser.table] if isinstance(parser, LL1TableParser) else \
+                    [parser.action_table, parser.goto_table]
+                self.assertEqual([table.compressed for table in tables], [compress] * len(tables))
+                parser.input_code(read_code(code))
+                parser.reset()
+                results.append((list(map(list, parser.get_table_body())), tree_shape(parser.parse_all())))
+            self.assertEqual(results[0], results[1], parser_type.__name__)
+
+
+if __name__ == '__main__':
+    unittest.main()
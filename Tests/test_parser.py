@@ -0,0 +1,291 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import os
+import tempfile
+import unittest
+
+from Tests import edits, read_code, read_grammar
+from LALRTableParser import LALRTableParser
+from LL1RecursiveDescentParser import LL1RecursiveDescentParser
+from LL1TableParser import LL1TableParser
+from LR1TableParser import LR1TableParser
+from Parser import Parser
+from ParseRecords import ParseRecords
+from SLRTableParser import SLRTableParser
+from Tree import Tree
+
+
+def tree_shape(tree: Tree) -> tuple:
+    return tree.name, tuple(map(tree_shape, tree.children))
+
+
+def node_path(node: Tree | None) -> list[int] | None:
+    # the child indexes from the root down to the node
+    if node is None:
+        return None
+    path: list[int] = []
+    while node.parent is not None:
+        path.append(next(i for i, child in enumerate(node.parent.children) if child == node))
+        node = node.parent
+    return path[::-1]
+
+
+def parser_state(parser: Parser) -> tuple:
+    stack: list[tuple] = [
+        (node_path(frame.node), {name: value for name, value in vars(frame).items() if name != 'node'})
+        for frame in parser.parse_stack
+    ]
+    return (tree_shape(parser.tree) if parser.tree is not None else None, parser.parse_error, parser.finished_parsing,
+            parser.token_stream.position, node_path(parser.current_node), stack, parser.parse_stack_to_str())
+
+
+def records_state(parser: Parser) -> tuple:
+    records: ParseRecords = parser.records
+    return ([node.name for node in records.nodes], records.starts.tolist(), records.ends.tolist(),
+            records.keys.tolist(), records.firsts.tolist())
+
+
+def step_to_end(parser: Parser) -> tuple:
+    while not parser.finished_parsing:
+        parser.step()
+    return tree_shape(parser.tree)
+
+
+class StreamedInputTest(unittest.TestCase):
+    def test_reset_after_stepping_a_file(self) -> None:
+        code: str = read_code('SumAverage.cl') * 20
+        with tempfile.TemporaryDirectory() as folder:
+            file_name: str = os.path.join(folder, 'code.cl')
+            with open(file_name, 'w') as f:
+                f.write(code)
+            for parser, grammar in ((LL1TableParser(), 'ExtendedCalculator-LL.gr'),
+                                    (SLRTableParser(), 'ExtendedCalculator-LR.gr')):
+                with self.subTest(type(parser).__name__):
+                    parser.input_grammar(read_grammar(grammar))
+                    parser.input_code(code)
+                    parser.reset()
+                    expected: tuple = step_to_end(parser)
+                    with open(file_name, 'rb') as f:
+                        parser.input_code(f)
+                        parser.reset()
+                        self.assertEqual(step_to_end(parser), expected)
+                        self.assertGreater(parser.token_stream.start, 0)  # the stream let go of the tokens it read
+                        parser.reset()
+                        self.assertEqual(step_to_end(parser), expected)
+                        parser.reset()
+                        self.assertEqual(step_to_end(parser), expected)
+
+
+class LL1ConflictTest(unittest.TestCase):
+    # BMinor-LL isn't LL(1), both LL(1) parsers have to resolve its conflicts the same way and get to the end
+    def test_bminor_under_both_ll_parsers(self) -> None:
+        grammar: str = read_grammar('BMinor-LL.gr')
+        for file_name in ('SumAverage.bminor', 'PrintNumbers.bminor'):
+            code: str = read_code(file_name)
+            results: list[tuple] = []
+            for parser in (LL1RecursiveDescentParser(), LL1TableParser()):
+                with self.subTest(type(parser).__name__, code=file_name):
+                    parser.input_grammar(grammar)
+                    parser.input_code(code)
+                    parser.reset()
+                    steps: int = 0
+                    while not parser.finished_parsing and steps < 10000:
+                        parser.step()
+                        steps += 1
+                    self.assertTrue(parser.finished_parsing)
+                    self.assertFalse(parser.parse_error)
+                    self.assertIn('LL(1) conflict for unary_expr_tail on identifier', parser.conflicts)
+                    results.append((tree_shape(parser.tree), parser.conflicts))
+            self.assertEqual(results[0], results[1])
+
+    def test_rule_rows_choose_the_rule_the_linear_search_did(self) -> None:
+        # next_rule() used to take the first alternative whose predict set has the lookahead, rule_rows has to agree
+        # with that for every nonterminal and every token
+        for grammar in ('PL0-LL.gr', 'SimpleCalculator-LL.gr', 'ExtendedCalculator-LL.gr', 'BMinor-LL.gr'):
+            parser: LL1RecursiveDescentParser = LL1RecursiveDescentParser()
+            parser.input_grammar(read_grammar(grammar))
+            symbols = parser.grammar.symbols
+            for name, symbol_id in symbols.nonterminal_ids.items():
+                for token, token_id in symbols.terminal_ids.items():
+                    with self.subTest(grammar, nonterminal=name, token=token):
+                        expected: LL1RecursiveDescentParser.Rule | None = next(
+                            filter(lambda rule: token in rule, parser.rules[name]), None)
+                        self.assertIs(parser.rule_rows[symbol_id].get(token_id), expected)
+
+    def test_ll1_grammar_has_no_conflicts(self) -> None:
+        for parser in (LL1RecursiveDescentParser(), LL1TableParser()):
+            parser.input_grammar(read_grammar('PL0-LL.gr'))
+            self.assertEqual(parser.conflicts, [])
+
+
+class ParseAllTest(unittest.TestCase):
+    # parse_all() has to leave the parser as stepping to the end does, on code with and without parse errors
+    def check_parser(self, parser: Parser, grammar: str) -> None:
+        parser.input_grammar(read_grammar(grammar))
+        code: str = read_code('SumAverage.cl')
+        for name, variant in (('valid', code), ('cut short', code[:len(code) // 2]), ('extra tokens', code + ' ) (')):
+            for steps_first in (0, 25):
+                with self.subTest(type(parser).__name__, code=name, steps_first=steps_first):
+                    parser.input_code(variant)
+                    parser.reset()
+                    while not parser.finished_parsing:
+                        parser.step()
+                    stepped: tuple = parser_state(parser), records_state(parser)
+                    parser.reset()
+                    for _ in range(steps_first):
+                        if not parser.finished_parsing:
+                            parser.step()
+                    try:
+                        parser.parse_all()
+                    except Parser.ParsingException:
+                        pass
+                    self.assertEqual((parser_state(parser), records_state(parser)), stepped)
+                    self.assertEqual(parser.parse_error, name != 'valid')
+
+    def test_file_longer_than_a_read(self) -> None:
+        # parse_all() reads the tokens of a file in batches, and lets go of the ones behind it between them
+        code: str = read_code('SumAverage.cl') * 200
+        with tempfile.TemporaryDirectory() as folder:
+            file_name: str = os.path.join(folder, 'code.cl')
+            with open(file_name, 'w') as f:
+                f.write(code)
+            for parser, grammar in ((LL1RecursiveDescentParser(), 'ExtendedCalculator-LL.gr'),
+                                    (LL1TableParser(), 'ExtendedCalculator-LL.gr'),
+                                    (SLRTableParser(), 'ExtendedCalculator-LR.gr')):
+                with self.subTest(type(parser).__name__):
+                    parser.input_grammar(read_grammar(grammar))
+                    parser.input_code(code)
+                    parser.reset()
+                    while not parser.finished_parsing:
+                        parser.step()
+                    # walked without recursion, the tree is deeper than the recursion limit
+                    expected: tuple = [(node.name, len(node)) for node in parser.tree.preorder()], records_state(parser)
+                    with open(file_name, 'rb') as f:
+                        parser.input_code(f)
+                        parser.reset()
+                        tree: Tree = parser.parse_all()
+                        self.assertEqual(([(node.name, len(node)) for node in tree.preorder()], records_state(parser)),
+                                         expected)
+                        self.assertGreater(parser.token_stream.start, 0)
+
+    def test_recursive_descent(self) -> None:
+        for compile_parser in (False, True):
+            parser: LL1RecursiveDescentParser = LL1RecursiveDescentParser()
+            parser.compile_parser = compile_parser
+            self.check_parser(parser, 'ExtendedCalculator-LL.gr')
+
+    def test_ll1_table(self) -> None:
+        self.check_parser(LL1TableParser(), 'ExtendedCalculator-LL.gr')
+
+    def test_lr_tables(self) -> None:
+        for parser_type in (SLRTableParser, LALRTableParser, LR1TableParser):
+            for compile_parser in (False, True):
+                parser: SLRTableParser = parser_type()
+                parser.compile_parser = compile_parser
+                self.check_parser(parser, 'ExtendedCalculator-LR.gr')
+
+
+class IncrementalParseTest(unittest.TestCase):
+    # after an edit the parse that reuses the subtrees of the last one has to end as a parse from scratch does
+    @staticmethod
+    def parse(parser: Parser) -> tuple:
+        try:
+            return tree_shape(parser.parse_all()), None
+        except Parser.ParsingException as error:
+            return tree_shape(parser.tree), error.position
+
+    def check_parser(self, parser_type: type[Parser], grammar: str, compile_parser: bool = False) -> None:
+        code: str = read_code('SumAverage.cl') * 20
+        parser: Parser = parser_type()
+        parser.compile_parser = compile_parser
+        self.assertTrue(parser.reuse_subtrees)
+        parser.input_grammar(read_grammar(grammar))
+        parser.input_code(code)
+        parser.reset()
+        parser.parse_all()
+        fresh: Parser = parser_type()
+        fresh.reuse_subtrees = False
+        fresh.input_grammar(read_grammar(grammar))
+        last: str = code
+        for edited in edits(code):
+            with self.subTest(parser_type.__name__, compile_parser=compile_parser, code=edited[:20]):
+                old_nodes: set[int] = set(map(id, parser.tree.preorder()))
+                parser.edit_code(edited)
+                parser.reset()
+                result: tuple = self.parse(parser)
+                fresh.input_code(edited)
+                fresh.reset()
+                self.assertEqual(result, self.parse(fresh))
+                if result[1] is None and edited and last:
+                    self.assertTrue(any(id(node) in old_nodes for node in parser.tree.preorder()))
+                last = edited
+
+    def test_ll1_table(self) -> None:
+        self.check_parser(LL1TableParser, 'ExtendedCalculator-LL.gr')
+
+    def test_lr_tables(self) -> None:
+        for parser_type in (SLRTableParser, LALRTableParser, LR1TableParser):
+            for compile_parser in (False, True):
+                self.check_parser(parser_type, 'ExtendedCalculator-LR.gr', compile_parser)
+
+    def test_compiled_engine_after_stepping_onto_a_reused_subtree(self) -> None:
+        # the goto of a reused subtree has a Production of its own that isn't in production_list
+        code: str = read_code('SumAverage.cl') * 20
+        edited: str = edits(code)[0]
+        parser: SLRTableParser = SLRTableParser()
+        parser.input_grammar(read_grammar('ExtendedCalculator-LR.gr'))
+        parser.input_code(code)
+        parser.reset()
+        parser.parse_all()
+        parser.edit_code(edited)
+        parser.reset()
+        while parser.goto_symbol is None or parser.goto_symbol in parser.production_index:
+            parser.step()
+        parser.compile_parser = True
+        fresh: SLRTableParser = SLRTableParser()
+        fresh.input_grammar(read_grammar('ExtendedCalculator-LR.gr'))
+        fresh.input_code(edited)
+        fresh.reset()
+        self.assertEqual(self.parse(parser), self.parse(fresh))
+        self.assertEqual(records_state(parser), records_state(fresh))
+
+    def test_edits_before_parsing_again(self) -> None:
+        # edits made without parsing in between are combined into one change
+        code: str = read_code('SumAverage.cl') * 20
+        for parser_type, grammar in ((LL1TableParser, 'ExtendedCalculator-LL.gr'),
+                                     (SLRTableParser, 'ExtendedCalculator-LR.gr')):
+            with self.subTest(parser_type.__name__):
+                parser: Parser = parser_type()
+                parser.input_grammar(read_grammar(grammar))
+                parser.input_code(code)
+                parser.reset()
+                parser.parse_all()
+                for edited in edits(code)[:3]:
+                    parser.edit_code(edited)
+                parser.reset()
+                fresh: Parser = parser_type()
+                fresh.input_grammar(read_grammar(grammar))
+                fresh.input_code(edits(code)[2])
+                fresh.reset()
+                self.assertEqual(self.parse(parser), self.parse(fresh))
+
+
+if __name__ == '__main__':
+    unittest.main()
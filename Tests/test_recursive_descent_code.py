@@ -0,0 +1,107 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import io
+import unittest
+
+from Tests import read_grammar
+from LL1RecursiveDescentParser import LL1RecursiveDescentParser
+
+
+GRAMMARS: tuple[str, ...] = ('SimpleCalculator-LL.gr', 'ExtendedCalculator-LL.gr', 'PL0-LL.gr', 'BMinor-LL.gr')
+
+
+def action_lines(parser: LL1RecursiveDescentParser) -> list[int]:
+    return [action.code_line for action in parser.actions_in_code_order()]
+
+
+class RecursiveDescentCodeTest(unittest.TestCase):
+    def setUp(self) -> None:
+        LL1RecursiveDescentParser.listings.clear()
+
+    def test_languages_are_read_when_first_used(self) -> None:
+        parser: LL1RecursiveDescentParser = LL1RecursiveDescentParser()
+        self.assertEqual([language.loaded for language in parser.languages], [False] * len(parser.languages))
+        parser.input_grammar(read_grammar('ExtendedCalculator-LL.gr'))
+        self.assertEqual(parser.languages[0].name, 'Pseudocode')
+        self.assertEqual([language.loaded for language in parser.languages],
+                         [True] + [False] * (len(parser.languages) - 1))
+        parser.make_code(1)
+        self.assertTrue(parser.languages[1].loaded)
+
+    def test_cached_code_is_the_code_written_again(self) -> None:
+        # switching back to a language takes its code from listings, it has to be what writing it again gives
+        for grammar in GRAMMARS:
+            parser: LL1RecursiveDescentParser = LL1RecursiveDescentParser()
+            parser.input_grammar(read_grammar(grammar))
+            written: list[tuple[list[str], list[int]]] = []
+            for i in range(len(parser.languages)):
+                parser.make_code(i)
+                written.append((parser.code, action_lines(parser)))
+            for i in reversed(range(len(parser.languages))):
+                with self.subTest(grammar, language=parser.languages[i].name):
+                    parser.make_code(i)
+                    self.assertEqual((parser.code, action_lines(parser)), written[i])
+                    code_lines: dict[LL1RecursiveDescentParser.Action, int] = {}
+                    code: list[str] = parser.languages[i].make_code(parser.rules, parser.start_rule, code_lines)
+                    self.assertEqual(code, parser.code)
+                    self.assertEqual([code_lines[action] for action in parser.actions_in_code_order()],
+                                     action_lines(parser))
+
+    def test_code_lines_point_at_their_actions(self) -> None:
+        for grammar in GRAMMARS:
+            parser: LL1RecursiveDescentParser = LL1RecursiveDescentParser()
+            parser.input_grammar(read_grammar(grammar))
+            for i, language in enumerate(parser.languages):
+                with self.subTest(grammar, language=language.name):
+                    parser.make_code(i)
+                    for action in parser.actions_in_code_order():
+                        self.assertIn(action.name, parser.code[action.code_line])
+
+    def test_listings_are_shared_by_grammar(self) -> None:
+        parsers: list[LL1RecursiveDescentParser] = [LL1RecursiveDescentParser(), LL1RecursiveDescentParser()]
+        for parser in parsers:
+            parser.input_grammar(read_grammar('PL0-LL.gr'))
+        self.assertIs(parsers[0].code, parsers[1].code)
+        self.assertEqual(len(LL1RecursiveDescentParser.listings), 1)
+
+    def test_export_writes_the_code_as_it_streams(self) -> None:
+        for grammar in GRAMMARS:
+            parser: LL1RecursiveDescentParser = LL1RecursiveDescentParser()
+            parser.input_grammar(read_grammar(grammar))
+            for i, language in enumerate(parser.languages):
+                with self.subTest(grammar, language=language.name):
+                    listings: int = len(LL1RecursiveDescentParser.listings)
+                    lines: list[str] = []
+
+                    class LineFile(io.StringIO):
+                        def write(self, text: str) -> int:
+                            lines.append(text)
+                            return super().write(text)
+
+                    file: LineFile = LineFile()
+                    parser.export_code(file, i)
+                    self.assertEqual(len(LL1RecursiveDescentParser.listings), listings)  # nothing kept
+                    self.assertEqual(file.getvalue(), ''.join(line + '\n' for line in
+                                                              language.make_code(parser.rules, parser.start_rule)))
+                    self.assertEqual(len(lines), file.getvalue().count('\n'))  # a write per line
+
+
+if __name__ == '__main__':
+    unittest.main()
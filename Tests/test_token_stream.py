@@ -0,0 +1,163 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+
+import unittest
+from unittest import mock
+
+from Tests import edits, read_code, read_grammar
+from Tests.test_parser import tree_shape
+from Grammar import Grammar
+from LL1TableParser import LL1TableParser
+from TokenStream import TokenStream
+
+
+class TokenStreamTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.grammar: Grammar = Grammar(read_grammar('ExtendedCalculator-LL.gr'))
+        self.code: str = read_code('SumAverage.cl')
+        self.images: list[str] = [token.image for token in self.grammar.tokens(self.code)]
+
+    def test_cursor(self) -> None:
+        stream: TokenStream = TokenStream(self.grammar.tokens(self.code))
+        self.assertEqual(stream.peek().image, self.images[0])
+        self.assertEqual(stream.peek(3).image, self.images[3])
+        self.assertEqual(stream.position, 0)
+        self.assertEqual([stream.advance().image for _ in range(5)], self.images[:5])
+        stream.skip(10)
+        self.assertEqual(stream.position, 15)
+        self.assertEqual(stream.peek().image, self.images[15])
+        self.assertEqual([token.image for token in stream.remaining()], self.images[15:len(stream)])
+        stream.skip(len(self.images))
+        self.assertEqual(stream.position, len(self.images))
+        self.assertIsNone(stream.peek())
+        with self.assertRaises(IndexError):
+            stream.advance()
+
+    def test_mark_and_rewind(self) -> None:
+        stream: TokenStream = TokenStream(self.grammar.tokens(self.code))
+        stream.skip(4)
+        mark: int = stream.mark()
+        read: list[str] = [stream.advance().image for _ in range(6)]
+        stream.rewind(mark)
+        self.assertEqual([stream.advance().image for _ in range(6)], read)
+        stream.release(mark)
+        stream.rewind()
+        self.assertEqual([token.image for token in stream.remaining()], self.images[:len(stream)])
+        stream.read()
+        self.assertEqual(len(stream), len(self.images))
+
+    def test_forgets_what_is_read_unless_marked(self) -> None:
+        stream: TokenStream = TokenStream(self.grammar.tokens(self.code * 10), keep_read=False)
+        stream.skip(5)
+        mark: int = stream.mark()
+        for _ in range(100):
+            stream.advance()
+        self.assertGreaterEqual(len(stream), 100)  # everything from the mark on is kept
+        stream.rewind(mark)
+        self.assertEqual(stream.advance().image, self.images[5])
+        stream.release(mark)
+        for _ in range(100):
+            stream.advance()
+        self.assertLessEqual(len(stream), 4)
+        with self.assertRaises(ValueError):
+            stream.rewind(mark)
+
+    def test_reset_rewinds_without_lexing(self) -> None:
+        parser: LL1TableParser = LL1TableParser()
+        parser.input_grammar(read_grammar('ExtendedCalculator-LL.gr'))
+        parser.input_code(self.code)
+        parser.reset()
+        expected: tuple = tree_shape(parser.parse_all())
+        stream: TokenStream = parser.token_stream
+        with mock.patch.object(Grammar, 'tokens', side_effect=AssertionError):
+            parser.reset()
+            self.assertEqual(tree_shape(parser.parse_all()), expected)
+        self.assertIs(parser.token_stream, stream)
+
+
+class TokenSpanTest(unittest.TestCase):
+    def test_tokens_point_into_the_code(self) -> None:
+        grammar: Grammar = Grammar(read_grammar('BMinor-LL.gr'))
+        code: str = read_code('SumAverage.bminor')
+        stream: TokenStream = TokenStream(grammar.tokens(code), code=code)
+        stream.read()
+        self.assertIs(stream.token(0).text, code)
+        for index in range(len(stream) - 1):  # the eof token at the end has no span
+            token: Grammar.Token = stream.token(index)
+            self.assertIs(token.text, code)
+            self.assertEqual(token.image, code[token.start:token.end])
+            self.assertEqual(token.symbol_id, grammar.symbols.terminal_ids[token.name])
+        self.assertEqual(stream.token(len(stream) - 1).name, 'eof')
+        self.assertFalse(hasattr(stream.token(0), '__dict__'))
+
+    def test_positions_in_error_messages(self) -> None:
+        # the token a parse stops at can be found in the code from its span
+        grammar: Grammar = Grammar(read_grammar('BMinor-LL.gr'))
+        code: str = 'x: integer = 1;\ny: integer = ) 2;\n'
+        token: Grammar.Token = [token for token in grammar.tokens(code) if token.name == ')'][0]
+        self.assertEqual(code.count('\n', 0, token.start) + 1, 2)
+        self.assertEqual(token.start - code.rindex('\n', 0, token.start), 14)
+
+
+class TokenEditTest(unittest.TestCase):
+    def test_edit_matches_lexing_again(self) -> None:
+        grammar: Grammar = Grammar(read_grammar('ExtendedCalculator-LL.gr'))
+        code: str = read_code('SumAverage.cl') * 20
+        stream: TokenStream = TokenStream(grammar.tokens(code), code=code)
+        stream.read()
+        for edited in edits(code):
+            old: list[tuple] = [self.token_fields(token) for token in stream.remaining()]
+            first, end, shift = stream.edit(grammar, edited)
+            expected: TokenStream = TokenStream(grammar.tokens(edited), code=edited)
+            expected.read()
+            new: list[tuple] = [self.token_fields(token) for token in stream.remaining()]
+            self.assertEqual(new, [self.token_fields(token) for token in expected.remaining()])
+            self.assertEqual(stream.position, 0)
+            self.assertEqual(new[:first], old[:first])
+            # the tokens behind the change are the old ones, moved by the change in length
+            self.assertEqual([token[:2] for token in new[end:-1]], [token[:2] for token in old[end - shift:-1]])
+
+    def test_edit_only_lexes_around_the_change(self) -> None:
+        grammar: Grammar = Grammar(read_grammar('ExtendedCalculator-LL.gr'))
+        code: str = read_code('SumAverage.cl') * 200
+        stream: TokenStream = TokenStream(grammar.tokens(code), code=code)
+        stream.read()
+        lexed: list[Grammar.Token] = []
+        tokens = grammar.tokens
+
+        def counting_tokens(*args, **kwargs):
+            for token in tokens(*args, **kwargs):
+                lexed.append(token)
+                yield token
+
+        for edited in edits(code)[:6]:
+            lexed.clear()
+            with mock.patch.object(grammar, 'tokens', counting_tokens):
+                first, end, shift = stream.edit(grammar, edited)
+            self.assertLess(len(lexed), 20)
+            self.assertLessEqual(end - first, len(lexed))
+
+    @staticmethod
+    def token_fields(token: Grammar.Token) -> tuple:
+        return token.name, token.image, token.symbol_id, token.start, token.end
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import random
+import unittest
+
+from Tests import edits, read_code, read_grammar
+from Tests.test_parser import parser_state, records_state, tree_shape
+from LALRTableParser import LALRTableParser
+from LL1RecursiveDescentParser import LL1RecursiveDescentParser
+from LL1TableParser import LL1TableParser
+from LR1TableParser import LR1TableParser
+from Parser import Parser
+from SLRTableParser import SLRTableParser
+from Tree import Tree
+from TreeArena import TreeArena
+
+
+class TreeArenaTest(unittest.TestCase):
+    def test_nodes_have_no_dict(self) -> None:
+        for node in (Tree('root'), TreeArena().add_root('root')):
+            with self.subTest(type(node).__name__):
+                self.assertFalse(hasattr(node, '__dict__'))
+
+    def test_parse_into_arena(self) -> None:
+        parser: LL1TableParser = LL1TableParser()
+        parser.input_grammar(read_grammar('ExtendedCalculator-LL.gr'))
+        parser.input_code(read_code('SumAverage.cl'))
+        parser.reset()
+        expected: tuple = tree_shape(parser.parse_all())
+        parser.arena_trees = True
+        parser.reset()
+        self.assertEqual(tree_shape(parser.parse_all()), expected)
+
+    def test_children_work_like_a_list(self) -> None:
+        # the same changes made to the children of a Tree and to those of a node in an arena, with new nodes each time
+        rng: random.Random = random.Random(6)
+        tree: Tree = Tree('root')
+        arena: TreeArena = TreeArena()
+        root: TreeArena.Node = arena.add_root('root')
+        made: int = 0
+
+        def new_nodes() -> tuple[Tree, TreeArena.Node]:
+            nonlocal made
+            made += 1
+            return Tree(str(made)), arena.new_node(str(made))
+
+        for i in range(400):
+            plain: list[Tree] = tree.children
+            view: TreeArena.Children = root.children
+            move: int = rng.randrange(9)
+            length: int = len(plain)
+            index: int = rng.randint(-length - 2, length + 2)
+            start, stop = sorted((rng.randint(-length - 1, length + 1), rng.randint(-length - 1, length + 1)))
+            with self.subTest(i, move=move, index=index):
+                if move == 0:
+                    plain_node, arena_node = new_nodes()
+                    plain.append(plain_node)
+                    view.append(arena_node)
+                elif move == 1:
+                    plain_node, arena_node = new_nodes()
+                    plain.insert(index, plain_node)
+                    view.insert(index, arena_node)
+                elif move == 2 and -length <= index < length:
+                    plain_node, arena_node = new_nodes()
+                    plain[index] = plain_node
+                    view[index] = arena_node
+                elif move == 3 and -length <= index < length:
+                    del plain[index]
+                    del view[index]
+                elif move == 4:
+                    del plain[start:stop]
+                    del view[start:stop]
+                elif move == 5:
+                    made_nodes: list[tuple[Tree, TreeArena.Node]] = [new_nodes() for _ in range(rng.randrange(3))]
+                    plain[start:stop] = [plain_node for plain_node, _ in made_nodes]
+                    view[start:stop] = [arena_node for _, arena_node in made_nodes]
+                elif move == 6 and plain:
+                    self.assertEqual(view.pop(index % length).name, plain.pop(index % length).name)
+                elif move == 7:
+                    plain.reverse()
+                    view.reverse()
+                elif move == 8 and plain:
+                    self.assertEqual(view.index(view[index % length]), index % length)
+                    self.assertIn(view[index % length], view)
+                    self.assertEqual([node.name for node in view[start:stop:2]],
+                                     [node.name for node in plain[start:stop:2]])
+                names: list[str] = [node.name for node in plain]
+                self.assertEqual([node.name for node in view], names)
+                self.assertEqual([node.name for node in reversed(view)], names[::-1])
+                self.assertEqual([view[j].name for j in range(-len(names), len(names))], names * 2)
+                self.assertEqual((len(view), len(root), root.number_of_children), (len(names),) * 3)
+                self.assertTrue(all(node.parent == root for node in view))
+        self.assertEqual(tree_shape(root), tree_shape(tree))
+
+    def test_putting_a_node_in_moves_it(self) -> None:
+        arena: TreeArena = TreeArena()
+        root: TreeArena.Node = arena.add_root('root')
+        left: TreeArena.Node = root.add_child('left')
+        right: TreeArena.Node = root.add_child('right')
+        leaf: TreeArena.Node = left.add_child('leaf')
+        right.children.append(leaf)
+        self.assertEqual((len(left), leaf.parent), (0, right))
+        root.children[0] = leaf
+        self.assertEqual(([node.name for node in root], len(right), leaf.parent), (['leaf', 'right'], 0, root))
+        self.assertIsNone(left.parent)
+        right.replace_with(left)
+        self.assertEqual([node.name for node in root], ['leaf', 'left'])
+        right.children = [leaf, left]
+        self.assertEqual(([node.name for node in right], len(root)), (['leaf', 'left'], 0))
+
+    def test_only_nodes_of_the_arena_go_in(self) -> None:
+        arena: TreeArena = TreeArena()
+        root: TreeArena.Node = arena.add_root('root')
+        child: TreeArena.Node = root.add_child('child')
+        other: TreeArena.Node = TreeArena().add_root('other')
+        for put in (lambda node: root.add_child('parent', children_list=[node]), root.children.append,
+                    lambda node: root.children.insert(0, node), lambda node: root.children.__setitem__(0, node),
+                    root.add_subtree, child.replace_with, lambda node: arena.new_node('parent', None, [node])):
+            with self.assertRaises(TypeError):
+                put(Tree('tree'))
+            with self.assertRaises(ValueError):
+                put(other)
+        self.assertEqual(tree_shape(root), ('root', (('child', ()),)))
+        self.assertEqual(len(arena), 2)
+
+    @staticmethod
+    def run_parser(parser: Parser, code: str) -> list[tuple]:
+        # the parser after each step through the code, and after each edit run with parse_all() reusing subtrees
+        parser.input_code(code)
+        parser.reset()
+        states: list[tuple] = []
+        while not parser.finished_parsing:
+            parser.step()
+            states.append(parser_state(parser))
+        for edited in edits(code):
+            parser.edit_code(edited)
+            parser.reset()
+            try:
+                parser.parse_all()
+            except Parser.ParsingException:
+                pass
+            states.append((parser.reusable, parser_state(parser), records_state(parser)))
+        return states
+
+    def check_parser(self, parser: Parser, grammar: str) -> None:
+        code: str = read_code('SumAverage.cl') * 4
+        parser.input_grammar(read_grammar(grammar))
+        expected: list[tuple] = self.run_parser(parser, code)
+        parser.arena_trees = True
+        states: list[tuple] = self.run_parser(parser, code)
+        self.assertIsInstance(parser.tree, TreeArena.Node)
+        self.assertEqual(len(states), len(expected))
+        for i, (state, expected_state) in enumerate(zip(states, expected)):
+            self.assertEqual(state, expected_state, f"state {i}")
+
+    def test_parsers_build_the_same_tree_in_an_arena(self) -> None:
+        # stepping, parse_all(), the compiled parsers and reusing subtrees all have to work on trees in an arena
+        for parser_type, grammar in ((LL1RecursiveDescentParser, 'ExtendedCalculator-LL.gr'),
+                                     (LL1TableParser, 'ExtendedCalculator-LL.gr'),
+                                     (SLRTableParser, 'ExtendedCalculator-LR.gr'),
+                                     (LALRTableParser, 'ExtendedCalculator-LR.gr'),
+                                     (LR1TableParser, 'ExtendedCalculator-LR.gr')):
+            for compile_parser in (False, True):
+                with self.subTest(parser_type.__name__, compile_parser=compile_parser):
+                    parser: Parser = parser_type()
+                    parser.compile_parser = compile_parser
+                    self.check_parser(parser, grammar)
+
+
+if __name__ == '__main__':
+    unittest.main()
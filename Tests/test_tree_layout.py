@@ -0,0 +1,255 @@
+"""
+Parse Tree Visualizer
+Copyright (C) 2024-2025 Leon Zeltser (leonzeltser at gmail dot com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import os
+import random
+import unittest
+from unittest import mock
+
+from Tests import ROOT, read_code, read_grammar
+from Grammar import Grammar
+from LALRTableParser import LALRTableParser
+from LL1RecursiveDescentParser import LL1RecursiveDescentParser
+from LL1TableParser import LL1TableParser
+from LR1TableParser import LR1TableParser
+from Parser import Parser
+from SLRTableParser import SLRTableParser
+from Tree import Tree
+from TreeLayout import TreeLayout
+
+
+def random_tree(rng: random.Random, depth: int = 0) -> Tree:
+    return Tree('n', None, [random_tree(rng, depth + 1) for _ in range(rng.randint(0, 4) if depth < 6 else 0)])
+
+
+def mirrored(tree: Tree) -> Tree:
+    return Tree(tree.name, None, [mirrored(child) for child in reversed(tree.children)])
+
+
+def comb(length: int, side: int) -> Tree:
+    # a node with two children, one of which is the next node, which is what recursive rules make out of long input
+    root: Tree = Tree('r')
+    node: Tree = root
+    for _ in range(length):
+        node.children = [Tree('a', node), Tree('b', node)]
+        node = node.children[side]
+    return root
+
+
+class TreeLayoutTest(unittest.TestCase):
+    # a layout updated after every step has to come out the same as one made from scratch
+    def check_steps(self, parser: Parser, compact_tree: bool) -> None:
+        parser.reset()
+        layout: TreeLayout | None = None
+        last: dict[Tree, tuple[tuple[float, int], Tree | None]] = {}
+        steps: int = 0
+        while not parser.finished_parsing:
+            parser.step()
+            steps += 1
+            if parser.tree is None:
+                continue
+            if layout is None:
+                layout = TreeLayout(parser.tree, compact_tree)
+            else:
+                if layout.tree is not parser.tree:
+                    last = {}  # a new tree is laid out from scratch, and the window draws it from scratch
+                layout.update(parser.tree)
+            # what the update says it moved and removed is what the window redraws, so it has to be all of it
+            drawn: dict[Tree, tuple[tuple[float, int], Tree | None]] = {
+                node: (coords, node.parent) for node, coords in layout.coords.items()}
+            self.assertEqual(layout.moved, {node for node in drawn if last.get(node) != drawn[node]}, f"step {steps}")
+            self.assertEqual(set(layout.removed), set(last) - set(drawn), f"step {steps}")
+            last = drawn
+            full: TreeLayout = TreeLayout(parser.tree, compact_tree)
+            self.assertEqual((dict(layout.items()), layout.width, layout.height),
+                             (dict(full.items()), full.width, full.height), f"step {steps}")
+            self.assertEqual(len(layout.nodes), sum(1 for _ in parser.tree.preorder()), f"step {steps}")
+
+    def check_parser(self, parser: Parser, grammar: str) -> None:
+        parser.input_grammar(read_grammar(grammar))
+        code: str = read_code('SumAverage.cl') * 2
+        for compact_tree in (False, True):
+            for name, variant in (('valid', code), ('cut short', code[:len(code) // 2])):
+                with self.subTest(type(parser).__name__, compact_tree=compact_tree, code=name):
+                    parser.input_code(variant)
+                    self.check_steps(parser, compact_tree)
+
+    def test_ll_parsers(self) -> None:
+        for parser in (LL1RecursiveDescentParser(), LL1TableParser()):
+            self.check_parser(parser, 'ExtendedCalculator-LL.gr')
+
+    def test_lr_parsers(self) -> None:
+        for parser in (SLRTableParser(), LALRTableParser(), LR1TableParser()):
+            self.check_parser(parser, 'ExtendedCalculator-LR.gr')
+
+    def test_every_example(self) -> None:
+        # each example with each grammar of its language, in every parser that takes the grammar
+        grammars: dict[str, tuple[str, ...]] = {
+            '.cl': ('SimpleCalculator-LL.gr', 'SimpleCalculator-LR.gr', 'ExtendedCalculator-LL.gr',
+                    'ExtendedCalculator-LR.gr'),
+            '.bminor': ('BMinor-LL.gr', 'BMinor-SLR.gr')}
+        for example in sorted(os.listdir(os.path.join(ROOT, 'ExampleCode'))):
+            for grammar in grammars[os.path.splitext(example)[1]]:
+                parser_types: tuple[type[Parser], ...] = \
+                    (LL1RecursiveDescentParser, LL1TableParser) if grammar.endswith('-LL.gr') else \
+                    (SLRTableParser, LALRTableParser, LR1TableParser)
+                for parser_type in parser_types:
+                    parser: Parser = parser_type()
+                    parser.input_grammar(read_grammar(grammar))
+                    for compact_tree in (False, True):
+                        with self.subTest(example, grammar=grammar, parser=parser_type.__name__,
+                                          compact_tree=compact_tree):
+                            try:
+                                parser.input_code(read_code(example))
+                            except Grammar.LexingException:
+                                self.skipTest("the simple calculator doesn't have comparisons")
+                            self.check_steps(parser, compact_tree)
+
+    def test_reused_subtrees(self) -> None:
+        # the subtrees of the last parse get put into the new tree whole
+        for parser, grammar in ((LL1TableParser(), 'ExtendedCalculator-LL.gr'),
+                                (SLRTableParser(), 'ExtendedCalculator-LR.gr')):
+            with self.subTest(type(parser).__name__):
+                parser.reuse_subtrees = True
+                parser.input_grammar(read_grammar(grammar))
+                code: str = read_code('SumAverage.cl') * 2
+                parser.input_code(code)
+                parser.reset()
+                parser.parse_all()
+                middle: int = code.index('\n', len(code) // 2) + 1
+                parser.edit_code(code[:middle] + 'x := 1\n' + code[middle:])
+                self.check_steps(parser, False)
+
+
+class TidyLayoutTest(unittest.TestCase):
+    # what Walker's layout promises about the drawing, whichever way the tree was built
+    def check_tidy(self, tree: Tree, compact_tree: bool) -> None:
+        layout: TreeLayout = TreeLayout(tree, compact_tree)
+        hidden: int = 1 if tree.name == '' else 0
+        rows: list[list[Tree]] = []
+        depths: dict[Tree, int] = {tree: 0}
+        for node in tree.level_order():  # each row comes out left to right
+            for child in node.children:
+                depths[child] = depths[node] + 1
+            if depths[node] < hidden:
+                self.assertEqual(layout.get_coords(node), (-1, -1))
+                continue
+            x, y = layout.get_coords(node)
+            self.assertEqual(y, depths[node] - hidden)
+            if node.children:
+                first: float = layout.get_coords(node.children[0])[0]
+                last: float = layout.get_coords(node.children[-1])[0]
+                self.assertAlmostEqual(x, (first + last) / 2)
+            if y == len(rows):
+                rows.append([])
+            rows[y].append(node)
+
+        xs: list[float] = [x for _, (x, _) in layout.items()]
+        self.assertAlmostEqual(min(xs), 0)
+        self.assertEqual(layout.width, int(max(xs) + 1e-9) + 1)
+        self.assertEqual(layout.height, len(rows))
+        self.assertEqual(len(xs), sum(map(len, rows)))
+        for row in rows:
+            for left, right in zip(row, row[1:]):
+                apart: int = 1 if compact_tree or left.parent is right.parent else 2
+                self.assertGreaterEqual(layout.get_coords(right)[0] - layout.get_coords(left)[0], apart - 1e-9)
+
+    def test_known_layouts(self) -> None:
+        # the leaves between the two wide subtrees are spread out evenly, not pushed against the left one
+        tree: Tree = Tree('r', None, [Tree('a', None, [Tree('a1'), Tree('a2'), Tree('a3')]), Tree('b'), Tree('c'),
+                                      Tree('d', None, [Tree('d1'), Tree('d2'), Tree('d3')])])
+        expected: dict[bool, dict[str, tuple[float, int]]] = {
+            False: {'r': (3, 0), 'a': (1, 1), 'b': (7 / 3, 1), 'c': (11 / 3, 1), 'd': (5, 1),
+                    'a1': (0, 2), 'a2': (1, 2), 'a3': (2, 2), 'd1': (4, 2), 'd2': (5, 2), 'd3': (6, 2)},
+            True: {'r': (2.5, 0), 'a': (1, 1), 'b': (2, 1), 'c': (3, 1), 'd': (4, 1),
+                   'a1': (0, 2), 'a2': (1, 2), 'a3': (2, 2), 'd1': (3, 2), 'd2': (4, 2), 'd3': (5, 2)}}
+        for compact_tree, coords in expected.items():
+            with self.subTest(compact_tree=compact_tree):
+                layout: TreeLayout = TreeLayout(tree, compact_tree)
+                for node, (x, y) in layout.items():
+                    self.assertAlmostEqual(x, coords[node.name][0], msg=node.name)
+                    self.assertEqual(y, coords[node.name][1], node.name)
+                self.assertEqual((layout.width, layout.height), (7 if not compact_tree else 6, 3))
+
+    def test_random_trees(self) -> None:
+        rng: random.Random = random.Random(5)
+        for i in range(200):
+            tree: Tree = random_tree(rng)
+            for compact_tree in (False, True):
+                with self.subTest(i, compact_tree=compact_tree):
+                    self.check_tidy(tree, compact_tree)
+
+    def test_parse_trees(self) -> None:
+        code: str = read_code('SumAverage.cl') * 2
+        for parser, grammar in ((LL1TableParser(), 'ExtendedCalculator-LL.gr'),
+                                (SLRTableParser(), 'ExtendedCalculator-LR.gr')):
+            parser.input_grammar(read_grammar(grammar))
+            parser.input_code(code)
+            parser.reset()
+            parser.parse_all()
+            for compact_tree in (False, True):
+                with self.subTest(type(parser).__name__, compact_tree=compact_tree):
+                    self.check_tidy(parser.tree, compact_tree)
+
+    def test_mirrored_trees_get_mirrored_layouts(self) -> None:
+        rng: random.Random = random.Random(11)
+        for i in range(200):
+            tree: Tree = random_tree(rng)
+            mirror: Tree = mirrored(tree)
+            for compact_tree in (False, True):
+                with self.subTest(i, compact_tree=compact_tree):
+                    layout: TreeLayout = TreeLayout(tree, compact_tree)
+                    mirror_layout: TreeLayout = TreeLayout(mirror, compact_tree)
+                    right: float = max(x for _, (x, _) in mirror_layout.items())
+                    pairs: list[tuple[Tree, Tree]] = [(tree, mirror)]
+                    while pairs:
+                        node, mirror_node = pairs.pop()
+                        x, y = layout.get_coords(node)
+                        mirror_x, mirror_y = mirror_layout.get_coords(mirror_node)
+                        self.assertAlmostEqual(x, right - mirror_x)
+                        self.assertEqual(y, mirror_y)
+                        pairs += zip(node.children, reversed(mirror_node.children))
+
+    def test_contours_are_walked_in_linear_time(self) -> None:
+        # Each step along a contour while subtrees are pushed apart asks a node for the next one down. Without the
+        # threads and the ancestors the algorithm keeps, combs walk the whole contour for every node, so this would
+        # grow with the square of the nodes.
+        steps: list[int] = [0]
+        next_left, next_right = TreeLayout.Node.next_left, TreeLayout.Node.next_right
+
+        def counted(step):
+            def next_node(node: TreeLayout.Node) -> TreeLayout.Node | None:
+                steps[0] += 1
+                return step(node)
+            return next_node
+
+        rng: random.Random = random.Random(2)
+        trees: list[Tree] = [comb(10000, 0), comb(10000, 1)] + [random_tree(rng) for _ in range(20)]
+        with mock.patch.object(TreeLayout.Node, 'next_left', counted(next_left)), \
+                mock.patch.object(TreeLayout.Node, 'next_right', counted(next_right)):
+            for i, tree in enumerate(trees):
+                with self.subTest(i):
+                    steps[0] = 0
+                    layout: TreeLayout = TreeLayout(tree, False)
+                    self.assertLessEqual(steps[0], 4 * len(layout.nodes))
+                    self.check_tidy(tree, False)
+
+
+if __name__ == '__main__':
+    unittest.main()